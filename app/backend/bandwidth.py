@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from tortoise import timezone
+
+from app.backend.config import cfg
+from app.backend.schemas import ActiveStream, StreamStats
+
+
+class StreamRejected(Exception):
+    """Лимит одновременных потоков исчерпан: ответить 503 с Retry-After."""
+
+
+class TokenBucket:
+    """
+    Ведро токенов на rate байт в секунду с запасом на одну секунду.
+    rate <= 0 означает отсутствие ограничения.
+    """
+
+    def __init__(self, rate: float = 0) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = rate
+        self.tokens = min(self.tokens, rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: int) -> float:
+        """Забирает amount токенов (допуская долг) и возвращает задержку в секундах."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+@dataclass(eq=False)
+class _Client:
+    bucket: TokenBucket = field(default_factory=TokenBucket)
+    streams: int = 0
+
+
+@dataclass(eq=False)
+class StreamSession:
+    """Один активный поток: учитывает отправленные байты и выдерживает лимиты."""
+
+    scheduler: "BandwidthScheduler"
+    id: int
+    client: str
+    video_id: int
+    started_at: datetime = field(default_factory=timezone.now)
+    started: float = field(default_factory=time.monotonic)
+    bytes_sent: int = 0
+    closed: bool = False
+
+    async def consume(self, amount: int) -> None:
+        """Ждёт, пока лимиты клиента и общий лимит позволят отправить amount байт."""
+        self.bytes_sent += amount
+        delay = self.scheduler.reserve(self.client, amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.scheduler.release(self)
+
+
+class BandwidthScheduler:
+    """
+    Планировщик полосы для отдачи видео в пределах процесса uvicorn.
+
+    Общая скорость STREAM_GLOBAL_RATE делится поровну между клиентами
+    с активными потоками (доля не больше STREAM_CLIENT_RATE), потоки одного
+    клиента делят его долю. Новые потоки сверх STREAM_MAX_ACTIVE или
+    STREAM_MAX_PER_CLIENT отклоняются.
+
+    Состояние у каждого процесса своё: все лимиты действуют на один процесс,
+    и на сервер с N процессами приходится в N раз больше потоков и полосы.
+    Клиент, чьи запросы попали в разные процессы, получает долю в каждом.
+
+    Потоки, отданные nginx (X-Accel-Redirect), учитываются арендой на пару
+    (клиент, видео): конца такого потока бэкенд не видит, поэтому аренда
+    продлевается каждым запросом этого видео и истекает через
+    STREAM_OFFLOAD_LEASE секунд после последнего.
+    """
+
+    def __init__(self) -> None:
+        self.global_bucket = TokenBucket()
+        self.clients: dict[str, _Client] = {}
+        self.sessions: dict[int, StreamSession] = {}
+        # (клиент, видео) -> момент истечения аренды потока через nginx
+        self.offloaded: dict[tuple[str, int], float] = {}
+        self.rejected = 0
+        self._ids = itertools.count(1)
+
+    def _expire_offloaded(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, until in self.offloaded.items() if until <= now]
+        for key in expired:
+            del self.offloaded[key]
+            self._drop_stream(key[0])
+        if expired:
+            self._rebalance()
+
+    @property
+    def throttled(self) -> bool:
+        """Заданы ли лимиты скорости: без них сессия только считает байты."""
+        return cfg.STREAM_GLOBAL_RATE > 0 or cfg.STREAM_CLIENT_RATE > 0
+
+    def client_rate(self) -> float:
+        """
+        Текущая доля полосы одного клиента (0 — без ограничения): клиенты
+        с потоками через nginx тоже учитываются.
+        """
+        rate = cfg.STREAM_CLIENT_RATE if cfg.STREAM_CLIENT_RATE > 0 else math.inf
+        if cfg.STREAM_GLOBAL_RATE > 0:
+            rate = min(rate, cfg.STREAM_GLOBAL_RATE / max(len(self.clients), 1))
+        return 0 if rate == math.inf else rate
+
+    def _rebalance(self) -> None:
+        self.global_bucket.set_rate(cfg.STREAM_GLOBAL_RATE)
+        rate = self.client_rate()
+        for client in self.clients.values():
+            client.bucket.set_rate(rate)
+
+    def _admit(self, client: str) -> None:
+        """
+        Учитывает новый поток клиента.
+
+        Raises:
+            StreamRejected: Если превышен общий или клиентский лимит потоков.
+        """
+        self._expire_offloaded()
+        state = self.clients.get(client)
+        active = len(self.sessions) + len(self.offloaded)
+        if (cfg.STREAM_MAX_ACTIVE > 0 and active >= cfg.STREAM_MAX_ACTIVE) or (
+            cfg.STREAM_MAX_PER_CLIENT > 0
+            and state is not None
+            and state.streams >= cfg.STREAM_MAX_PER_CLIENT
+        ):
+            self.rejected += 1
+            raise StreamRejected()
+        if state is None:
+            state = self.clients[client] = _Client()
+        state.streams += 1
+
+    def _drop_stream(self, client: str) -> None:
+        state = self.clients.get(client)
+        if state is not None:
+            state.streams -= 1
+            if state.streams <= 0:
+                del self.clients[client]
+
+    def open(self, client: str, video_id: int) -> StreamSession:
+        """
+        Регистрирует новый поток клиента.
+
+        Raises:
+            StreamRejected: Если превышен общий или клиентский лимит потоков.
+        """
+        self._admit(client)
+        session = StreamSession(self, next(self._ids), client, video_id)
+        self.sessions[session.id] = session
+        self._rebalance()
+        return session
+
+    def open_offloaded(self, client: str, video_id: int) -> float:
+        """
+        Регистрирует или продлевает поток клиента, который отдаёт nginx.
+        Возвращает долю полосы клиента для X-Accel-Limit-Rate (0 — без
+        ограничения).
+
+        Raises:
+            StreamRejected: Если превышен общий или клиентский лимит потоков.
+        """
+        self._expire_offloaded()
+        key = (client, video_id)
+        if key not in self.offloaded:
+            self._admit(client)
+            self._rebalance()
+        self.offloaded[key] = time.monotonic() + cfg.STREAM_OFFLOAD_LEASE
+        return self.client_rate()
+
+    def release(self, session: StreamSession) -> None:
+        self.sessions.pop(session.id, None)
+        self._drop_stream(session.client)
+        self._rebalance()
+
+    def reserve(self, client: str, amount: int) -> float:
+        state = self.clients.get(client)
+        client_delay = state.bucket.reserve(amount) if state else 0.0
+        return max(client_delay, self.global_bucket.reserve(amount))
+
+    def stats(self) -> StreamStats:
+        self._expire_offloaded()
+        now = time.monotonic()
+        return StreamStats(
+            active=len(self.sessions),
+            offloaded=len(self.offloaded),
+            clients=len(self.clients),
+            rejected=self.rejected,
+            client_rate=self.client_rate(),
+            streams=[
+                ActiveStream(
+                    client=session.client,
+                    video_id=session.video_id,
+                    started_at=session.started_at,
+                    bytes_sent=session.bytes_sent,
+                    bytes_per_second=round(
+                        session.bytes_sent / max(now - session.started, 1e-3)
+                    ),
+                )
+                for session in self.sessions.values()
+            ],
+        )
+
+
+scheduler = BandwidthScheduler()
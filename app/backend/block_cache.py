@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from app.backend import mp4
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats
+
+logger = logging.getLogger(__name__)
+
+# Сколько файлов помнить вместе с их «горячими» областями
+MAX_REGION_ENTRIES = 4096
+
+Region = tuple[int, int]
+
+
+def _read_block(path: Path, offset: int, size: int) -> bytes:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.pread(fd, size, offset)
+    finally:
+        os.close(fd)
+
+
+def _find_hot_regions(path: Path, file_size: int) -> list[Region]:
+    """
+    Области файла, нужные для старта воспроизведения: первые
+    BLOCK_CACHE_HEAD_BYTES и, для MP4, бокс moov (часто в конце файла).
+    Границы выровнены по блокам; области — полуоткрытые [start, end).
+    """
+    block = cfg.BLOCK_CACHE_BLOCK_SIZE
+    regions = [(0, min(cfg.BLOCK_CACHE_HEAD_BYTES, file_size))]
+    try:
+        with open(path, "rb") as f:
+            if mp4.is_mp4(f.read(8)):
+                for box_type, box_start, _, box_end in mp4.iter_boxes(f, 0, file_size):
+                    if box_type != b"moov":
+                        continue
+                    if box_end - box_start <= cfg.BLOCK_CACHE_INDEX_MAX_BYTES:
+                        regions.append((box_start, box_end))
+                    break
+    except OSError as e:
+        logger.warning(f"Cannot read '{path}' for block cache: {e}")
+
+    aligned: list[Region] = []
+    for start, end in sorted(regions):
+        start = start // block * block
+        end = min(-(-end // block) * block, file_size)
+        if aligned and start <= aligned[-1][1]:
+            aligned[-1] = (aligned[-1][0], max(aligned[-1][1], end))
+        elif start < end:
+            aligned.append((start, end))
+    return aligned
+
+
+class BlockCache:
+    """
+    Кэш блоков начала видео и индекса MP4 (moov) в памяти процесса.
+
+    Блоки по BLOCK_CACHE_BLOCK_SIZE хранятся по ключу (ETag файла, номер
+    блока), поэтому заменённый файл не может получить чужие данные.
+    Общий объём ограничен BLOCK_CACHE_BYTES, вытесняются давно
+    не читавшиеся блоки. Одновременные зрители одного файла ждут одно
+    и то же чтение с диска.
+    """
+
+    def __init__(self) -> None:
+        self._blocks: OrderedDict[tuple[str, int], bytes] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[tuple[str, int], asyncio.Future[bytes]] = {}
+        self._regions: OrderedDict[str, list[Region]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return cfg.BLOCK_CACHE_BYTES > 0
+
+    async def hot_regions(self, key: str, path: Path, file_size: int) -> list[Region]:
+        regions = self._regions.get(key)
+        if regions is None:
+            loop = asyncio.get_running_loop()
+            regions = await loop.run_in_executor(
+                None, _find_hot_regions, path, file_size
+            )
+            self._regions[key] = regions
+            while len(self._regions) > MAX_REGION_ENTRIES:
+                self._regions.popitem(last=False)
+        self._regions.move_to_end(key)
+        return regions
+
+    async def read(self, key: str, path: Path, index: int) -> bytes:
+        """Возвращает блок номер index файла с ключом key."""
+        block_key = (key, index)
+        data = self._blocks.get(block_key)
+        if data is not None:
+            self.hits += 1
+            self._blocks.move_to_end(block_key)
+            return data
+
+        self.misses += 1
+        future = self._inflight.get(block_key)
+        if future is None:
+            size = cfg.BLOCK_CACHE_BLOCK_SIZE
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(
+                loop.run_in_executor(None, _read_block, path, index * size, size)
+            )
+            self._inflight[block_key] = future
+            future.add_done_callback(lambda f: self._store(block_key, f))
+        # Отключение одного зрителя не должно отменять чтение для остальных
+        return await asyncio.shield(future)
+
+    def _store(self, block_key: tuple[str, int], future: asyncio.Future) -> None:
+        self._inflight.pop(block_key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        data = future.result()
+        self._blocks[block_key] = data
+        self._bytes += len(data)
+        while self._bytes > cfg.BLOCK_CACHE_BYTES and self._blocks:
+            _, evicted = self._blocks.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._blocks),
+            bytes=self._bytes,
+            evictions=self.evictions,
+        )
+
+
+block_cache = BlockCache()
@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from app.backend import crud
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats
+
+# Сколько вариантов снимка (набор полей, сжатие) держать в памяти процесса
+MAX_ENTRIES = 8
+
+# Ключ снимка: поля сводки видео и сжат ли он gzip
+SnapshotKey = tuple[tuple[str, ...], bool]
+
+
+def accepts_gzip(headers: Mapping[str, str]) -> bool:
+    """Разрешает ли Accept-Encoding ответ в gzip (gzip или * с q > 0)."""
+    for item in headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip().lower().removeprefix("q=")
+        try:
+            return not params.strip() or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def variant_tag(fields: Sequence[str], compress: bool) -> str:
+    """
+    Суффикс ETag варианта снимка: короткий хеш набора полей и -gz у сжатого.
+    """
+    digest = hashlib.blake2b(",".join(fields).encode(), digest_size=4).hexdigest()
+    return f"-{digest}-gz" if compress else f"-{digest}"
+
+
+def encode_snapshot(snapshot: dict[str, Any], compress: bool) -> bytes:
+    """Компактный JSON снимка (без пробелов), при compress — сжатый gzip."""
+    body = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode()
+    if compress:
+        body = gzip.compress(
+            body, compresslevel=cfg.CATALOG_SNAPSHOT_GZIP_LEVEL, mtime=0
+        )
+    return body
+
+
+class SnapshotCache:
+    """
+    Готовые тела снимка каталога одного процесса uvicorn.
+
+    Снимок читается из БД, кодируется и сжимается один раз на поколение
+    каталога: следующие клиенты того же поколения получают те же байты.
+    Одновременные промахи по одному варианту ждут одну сборку, поэтому
+    ответ может оказаться на поколение старше запрошенного — клиент
+    догонит его через /catalog/changes.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[SnapshotKey, tuple[int, bytes]] = OrderedDict()
+        self._building: dict[SnapshotKey, asyncio.Future[tuple[int, bytes]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self, version: int, fields: Sequence[str], compress: bool
+    ) -> tuple[int, bytes]:
+        """
+        Снимок поколения не старше version: (поколение снимка, тело ответа).
+        """
+        key = (tuple(fields), compress)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        future = self._building.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._build(fields, compress))
+            self._building[key] = future
+            future.add_done_callback(lambda f: self._store(key, f))
+        return await asyncio.shield(future)
+
+    async def _build(self, fields: Sequence[str], compress: bool) -> tuple[int, bytes]:
+        snapshot = await crud.get_catalog_snapshot(fields)
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, encode_snapshot, snapshot, compress)
+        return snapshot["version"], body
+
+    def _store(self, key: SnapshotKey, future: asyncio.Future) -> None:
+        self._building.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._entries[key] = future.result()
+        self._entries.move_to_end(key)
+        while len(self._entries) > MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            bytes=sum(len(body) for _, body in self._entries.values()),
+        )
+
+
+snapshot_cache = SnapshotCache()
@@ -17,6 +17,91 @@ class ConfigBase(BaseSettings):
     VIDEOS_DIR: str = "videos"
     TRANSCRIPTIONS_DIR: str = "transcriptions"
     SECRET_KEY: str
+    # Размер пачки записей при пакетной загрузке видео сканером
+    SCAN_BATCH_SIZE: int = 1000
+    # Количество потоков, параллельно читающих директории при обходе VIDEOS_DIR
+    SCAN_WALK_WORKERS: int = 8
+    # Количество процессов для пробы заголовков контейнеров (длительность, кодеки)
+    PROBE_WORKERS: int = 2
+    # Количество потоков, считающих отпечатки файлов для поиска перемещений
+    FINGERPRINT_WORKERS: int = 4
+    # Наблюдение за VIDEOS_DIR (inotify) с точечным обновлением БД
+    WATCH_VIDEOS: bool = False
+    # Сколько секунд файл должен не меняться, прежде чем попасть в БД
+    WATCH_STABLE_SECONDS: float = 5.0
+    # Опрос вместо inotify (сетевые ФС, где события inotify не приходят)
+    WATCH_FORCE_POLLING: bool = False
+    # Размер блока, которым читается видео при отдаче без sendfile (байты)
+    STREAM_CHUNK_SIZE: int = 1024 * 1024
+    # Количество потоков, читающих видео для отдачи
+    STREAM_READ_WORKERS: int = 16
+    # MP4 с moov в конце отдаются в виртуальной раскладке faststart (moov вперёд)
+    STREAM_FASTSTART: bool = False
+    # Отдача видео через nginx (X-Accel-Redirect): бэкенд только проверяет доступ
+    STREAM_OFFLOAD: bool = False
+    # Внутренний location nginx, отображающий VIDEOS_DIR
+    STREAM_OFFLOAD_PREFIX: str = "/protected-videos/"
+    # Адреса и подсети обратных прокси через запятую: только их X-Real-IP
+    # считается адресом клиента и только им отвечается X-Accel-Redirect
+    # (STREAM_OFFLOAD); у остальных запросов клиент — адрес соединения
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
+    # Лимиты отдачи видео (0 — без ограничения): одновременные потоки всего
+    # и на клиента, общая скорость и скорость клиента (байт/с); общая скорость
+    # делится поровну между активными клиентами. Каждый процесс uvicorn
+    # (workers=4) считает свои потоки сам, так что на весь сервер лимиты
+    # вчетверо больше, а поровну полоса делится только внутри процесса
+    STREAM_MAX_ACTIVE: int = 0
+    STREAM_MAX_PER_CLIENT: int = 0
+    STREAM_GLOBAL_RATE: int = 0
+    STREAM_CLIENT_RATE: int = 0
+    # Поток, отданный через nginx (STREAM_OFFLOAD), считается активным столько
+    # секунд после последнего запроса клиента к этому видео
+    STREAM_OFFLOAD_LEASE: float = 60.0
+    # Значение Retry-After (секунды) для отклонённых потоков
+    STREAM_RETRY_AFTER: int = 5
+    # Сколько видео держать в кэше метаданных для стриминга и сколько секунд
+    STREAM_CACHE_SIZE: int = 1024
+    STREAM_CACHE_TTL: float = 30.0
+    # Кэш блоков начала видео и индекса MP4 (moov): общий объём (0 — выключен),
+    # размер блока, сколько байт начала файла кэшировать и предел размера moov
+    BLOCK_CACHE_BYTES: int = 256 * 1024 * 1024
+    BLOCK_CACHE_BLOCK_SIZE: int = 256 * 1024
+    BLOCK_CACHE_HEAD_BYTES: int = 4 * 1024 * 1024
+    BLOCK_CACHE_INDEX_MAX_BYTES: int = 16 * 1024 * 1024
+    # Объём переписанных moov в кэше раскладок faststart (байты на процесс)
+    FASTSTART_CACHE_BYTES: int = 64 * 1024 * 1024
+    # Поиск: размер страницы по умолчанию и наибольший допустимый
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_MAX_PAGE_SIZE: int = 100
+    # Кэш страниц поиска: число записей и время жизни (секунды)
+    SEARCH_CACHE_SIZE: int = 256
+    SEARCH_CACHE_TTL: float = 300.0
+    # Сколько секунд браузер и nginx могут отдавать JSON каталога (списки
+    # и карточки видео и плейлистов) без перепроверки ETag (0 — всегда проверять)
+    CATALOG_CACHE_MAX_AGE: int = 5
+    # Сколько дней хранить журнал изменений каталога для /catalog/changes
+    # (0 — без срока); клиент, отставший сильнее, получает полный снимок
+    CATALOG_CHANGES_RETENTION_DAYS: int = 30
+    # Уровень сжатия gzip снимка каталога (/catalog/snapshot)
+    CATALOG_SNAPSHOT_GZIP_LEVEL: int = 6
+    # Подсказки к строке поиска: число по умолчанию и наибольшее, как часто
+    # сверять префиксный индекс с каталогом (секунды) и с какой длины запроса
+    # искать нечёткие совпадения по триграммам
+    SUGGEST_LIMIT: int = 8
+    SUGGEST_MAX_LIMIT: int = 20
+    SUGGEST_REFRESH_SECONDS: float = 2.0
+    SUGGEST_FUZZY_MIN_CHARS: int = 3
+    # HLS: целевая длительность сегмента в секундах (режется по ключевым кадрам)
+    HLS_SEGMENT_SECONDS: float = 6.0
+    # Сколько разобранных индексов MP4 (таблиц сэмплов) держать в памяти процесса
+    # и их общий объём в байтах: таблицы занимают около 32 байт на сэмпл, так что
+    # многочасовой файл с сотнями тысяч сэмплов — десятки мегабайт
+    HLS_INDEX_CACHE_SIZE: int = 16
+    HLS_INDEX_CACHE_BYTES: int = 128 * 1024 * 1024
+    # Сколько дней хранить записи пропавших файлов (0 — удалять сразу)
+    PRUNE_RETENTION_DAYS: int = 0
+    # Размер пачки при удалении записей пропавших файлов
+    PRUNE_BATCH_SIZE: int = 5000
 
     @property
     def videos_dir_absolute(self) -> Path:
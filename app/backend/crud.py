@@ -1,44 +1,198 @@
 import logging
-import re
+from collections.abc import Iterable, Sequence
+from datetime import timedelta
+from pathlib import Path
 from typing import Any
 
-from tortoise import Tortoise
-from tortoise.functions import Count
+from tortoise import Tortoise, timezone
+from tortoise.exceptions import IntegrityError
 
 from app.backend.auth import hash_password
-from app.backend.models import Playlist, User, Video
+from app.backend.config import cfg
+from app.backend.models import (
+    Playlist,
+    ScanJob,
+    User,
+    Video,
+    VideoKeyframeIndex,
+)
 from app.backend.schemas import (
     PlaylistCreate,
     PlaylistInDB,
     PlaylistUpdate,
+    ScanReport,
+    ScanStatus,
     VideoCreate,
     VideoUpdate,
 )
+from app.backend.stream_cache import stream_cache
 
 logger = logging.getLogger(__name__)
 
+# Колонки манифеста сканера: по ним определяется, изменился ли файл на диске
+MANIFEST_FIELDS = (
+    "file_size",
+    "file_mtime_ns",
+    "file_inode",
+    "transcription_size",
+    "transcription_mtime_ns",
+)
+# Колонки, заполняемые пробой контейнера
+PROBE_FIELDS = (
+    "duration_seconds",
+    "width",
+    "height",
+    "video_codec",
+    "audio_codec",
+    "bitrate",
+    "probe_version",
+)
+# Колонки, которые сканер записывает при пакетной загрузке видео
+VIDEO_INGEST_FIELDS = (
+    "title",
+    "filepath",
+    "transcription",
+    "playlist_id",
+    *MANIFEST_FIELDS,
+    *PROBE_FIELDS,
+    "fingerprint",
+)
+
 
-def natural_sort_key(s: str):
-    """Сортировка строк по натуральному порядку."""
-    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", s)]
+def _live_videos():
+    """Видео без пометки об удалении (файл найден при последнем сканировании)."""
+    return Video.filter(deleted_at__isnull=True)
 
 
 async def get_video(video_id: int) -> Video | None:
-    return await Video.filter(id=video_id).first()
+    return await _live_videos().filter(id=video_id).first()
 
 
 async def get_video_by_filepath(filepath: str) -> Video | None:
-    return await Video.filter(filepath=filepath).first()
+    return await _live_videos().filter(filepath=filepath).first()
 
 
 async def get_videos(skip: int = 0, limit: int = 100) -> list[Video]:
-    return await Video.all().offset(skip).limit(limit).order_by("id")
+    return await _live_videos().offset(skip).limit(limit).order_by("id")
+
+
+# Поля VideoSummary и их выражения SQL: списки читают только эти колонки
+VIDEO_SUMMARY_COLUMNS = {
+    "id": "id",
+    "title": "title",
+    "filepath": "filepath",
+    "duration_seconds": "duration_seconds",
+    "playlist_id": "playlist_id",
+    "width": "width",
+    "height": "height",
+    "video_codec": "video_codec",
+    "audio_codec": "audio_codec",
+    "bitrate": "bitrate",
+    "has_transcription": "transcription IS NOT NULL",
+}
+
+
+# Колонки PlaylistInDB (псевдоним p): число видео — только живые видео
+_PLAYLIST_COLUMNS = """
+    p.id,
+    p.name,
+    p.folder_path,
+    p.description,
+    (
+        SELECT count(*) FROM videos v
+        WHERE v.playlist_id = p.id AND v.deleted_at IS NULL
+    ) AS video_count
+"""
+
+
+def _summary_select(fields: Iterable[str]) -> str:
+    return ", ".join(f"{VIDEO_SUMMARY_COLUMNS[name]} AS {name}" for name in fields)
+
+
+async def get_video_summaries(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Sequence[str] = tuple(VIDEO_SUMMARY_COLUMNS),
+    after: int | None = None,
+) -> tuple[list[dict[str, Any]], int | None]:
+    """
+    Страница живых видео в порядке id: только поля fields из
+    VIDEO_SUMMARY_COLUMNS.
+
+    С after страница начинается после этого id — просмотр диапазона
+    первичного ключа, сколько бы страниц ни было до неё, skip не учитывается.
+    Без after страница отсчитывается с начала через skip (OFFSET; оставлен
+    для старых клиентов). Возвращает строки и after следующей страницы (None,
+    если страница последняя).
+    """
+    columns = list(fields) if "id" in fields else [*fields, "id"]
+    select = f"SELECT {_summary_select(columns)} FROM videos"
+    connection = Tortoise.get_connection("default")
+    if after is not None:
+        rows = await connection.execute_query_dict(
+            f"""
+            {select}
+            WHERE deleted_at IS NULL AND id > $1
+            ORDER BY id
+            LIMIT $2
+            """,
+            [after, limit + 1],
+        )
+    else:
+        rows = await connection.execute_query_dict(
+            f"""
+            {select}
+            WHERE deleted_at IS NULL
+            ORDER BY id
+            OFFSET $1 LIMIT $2
+            """,
+            [skip, limit + 1],
+        )
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1]["id"]
+    if "id" not in fields:
+        for row in rows:
+            del row["id"]
+    return rows, next_after
+
+
+async def get_video_summary(
+    video_id: int, fields: Sequence[str] = tuple(VIDEO_SUMMARY_COLUMNS)
+) -> dict[str, Any] | None:
+    connection = Tortoise.get_connection("default")
+    rows = await connection.execute_query_dict(
+        f"""
+        SELECT {_summary_select(fields)} FROM videos
+        WHERE id = $1 AND deleted_at IS NULL
+        """,
+        [video_id],
+    )
+    return rows[0] if rows else None
 
 
-async def get_videos_by_playlist(playlist_id: int) -> list[Video]:
-    videos = await Video.filter(playlist_id=playlist_id).all()
-    videos.sort(key=lambda v: natural_sort_key(v.title))
-    return videos
+async def get_playlist_video_summaries(
+    playlist_id: int, fields: Sequence[str] = tuple(VIDEO_SUMMARY_COLUMNS)
+) -> list[dict[str, Any]]:
+    """
+    Видео плейлиста в естественном порядке названий (по индексу
+    playlist_id, sort_key, id): только поля fields.
+    """
+    connection = Tortoise.get_connection("default")
+    return await connection.execute_query_dict(
+        f"""
+        SELECT {_summary_select(fields)} FROM videos
+        WHERE playlist_id = $1 AND deleted_at IS NULL
+        ORDER BY sort_key, id
+        """,
+        [playlist_id],
+    )
+
+
+async def get_video_transcription(video_id: int) -> dict[str, Any] | None:
+    """Текст транскрипции видео ({"transcription": ...}) или None, если видео нет."""
+    return await _live_videos().filter(id=video_id).first().values("transcription")
 
 
 async def create_video(video: VideoCreate) -> Video:
@@ -51,6 +205,7 @@ async def update_video(video_id: int, video: VideoUpdate) -> Video | None:
         update_data = video.model_dump(exclude_none=True)
         await db_video.update_from_dict(update_data)
         await db_video.save()
+        stream_cache.invalidate(video_id)
     return db_video
 
 
@@ -58,43 +213,591 @@ async def delete_video(video_id: int) -> Video | None:
     db_video = await get_video(video_id)
     if db_video:
         await db_video.delete()
+        stream_cache.invalidate(video_id)
     return db_video
 
 
-async def search_videos_by_transcription(query: str) -> list[dict[str, Any]]:
-    # raw SQL approach, identical to previous implementation but executed through the
-    # underlying connection object. This keeps the full‑text search logic unchanged.
-    search_query = """
-        SELECT
-            id,
-            title,
-            filepath,
-            ts_headline('russian', transcription, plainto_tsquery('russian', $1),
-                        'StartSel=<b>,StopSel=</b>,MaxFragments=1,FragmentDelimiter=...,MaxWords=30,MinWords=15') AS snippet
-        FROM videos
-        WHERE search_vector::tsvector @@ plainto_tsquery('russian', $1)
-        ORDER BY ts_rank_cd(search_vector::tsvector, plainto_tsquery('russian', $1)) DESC;
+async def get_video_manifest(
+    paths: list[str] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Возвращает сигнатуры файлов, результаты пробы и отпечатки всех видео
+    (или видео с указанными путями), индексированные по filepath.
+    """
+    query = Video.all() if paths is None else Video.filter(filepath__in=paths)
+    rows = await query.values(
+        "id",
+        "filepath",
+        "playlist_id",
+        "deleted_at",
+        "fingerprint",
+        *MANIFEST_FIELDS,
+        *PROBE_FIELDS,
+    )
+    return {row["filepath"]: row for row in rows}
+
+
+async def bulk_upsert_videos(rows: list[dict[str, Any]]) -> int:
+    """
+    Записывает пачку новых и изменённых видео за одну транзакцию.
+
+    Строки загружаются через COPY во временную staging-таблицу, затем одним
+    INSERT ... ON CONFLICT (filepath) вставляются или обновляются в videos.
+    Видео, помеченные как удалённые, при повторном появлении файла
+    восстанавливаются с прежним id.
+    """
+    if not rows:
+        return 0
+    columns = ", ".join(VIDEO_INGEST_FIELDS)
+    updates = ", ".join(
+        f"{name} = EXCLUDED.{name}"
+        for name in VIDEO_INGEST_FIELDS
+        if name != "filepath"
+    )
+    connection = Tortoise.get_connection("default")
+    async with connection.acquire_connection() as conn, conn.transaction():
+        await conn.execute(
+            f"CREATE TEMP TABLE videos_staging ON COMMIT DROP AS "
+            f"SELECT {columns} FROM videos WITH NO DATA"
+        )
+        await conn.copy_records_to_table(
+            "videos_staging",
+            records=[tuple(row[name] for name in VIDEO_INGEST_FIELDS) for row in rows],
+            columns=VIDEO_INGEST_FIELDS,
+        )
+        await conn.execute(
+            f"INSERT INTO videos ({columns}) "
+            f"SELECT {columns} FROM videos_staging "
+            f"ON CONFLICT (filepath) DO UPDATE SET {updates}, deleted_at = NULL"
+        )
+    stream_cache.invalidate()
+    return len(rows)
+
+
+def _batches(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def prune_videos(video_ids: list[int]) -> int:
+    """
+    Убирает видео, чьих файлов больше нет на диске, пачками по PRUNE_BATCH_SIZE.
+
+    При PRUNE_RETENTION_DAYS > 0 записи только помечаются удалёнными (deleted_at)
+    и окончательно удаляются purge_deleted_videos по истечении срока хранения;
+    иначе удаляются сразу. Возвращает число затронутых строк.
+    """
+    connection = Tortoise.get_connection("default")
+    if cfg.PRUNE_RETENTION_DAYS > 0:
+        query = """
+            UPDATE videos SET deleted_at = $2
+            WHERE id = ANY($1::int[]) AND deleted_at IS NULL
+            """
+        extra = [timezone.now()]
+    else:
+        query = "DELETE FROM videos WHERE id = ANY($1::int[])"
+        extra = []
+    pruned = 0
+    for batch in _batches(video_ids, cfg.PRUNE_BATCH_SIZE):
+        affected, _ = await connection.execute_query(query, [batch, *extra])
+        pruned += affected
+    stream_cache.invalidate()
+    return pruned
+
+
+async def purge_deleted_videos() -> int:
+    """Окончательно удаляет видео, помеченные удалёнными дольше срока хранения."""
+    cutoff = timezone.now() - timedelta(days=cfg.PRUNE_RETENTION_DAYS)
+    connection = Tortoise.get_connection("default")
+    purged = 0
+    while True:
+        affected, _ = await connection.execute_query(
+            """
+            DELETE FROM videos WHERE id IN (
+                SELECT id FROM videos WHERE deleted_at < $1 LIMIT $2
+            )
+            """,
+            [cutoff, cfg.PRUNE_BATCH_SIZE],
+        )
+        purged += affected
+        if affected < cfg.PRUNE_BATCH_SIZE:
+            return purged
+
+
+async def delete_empty_playlists() -> int:
+    """
+    Удаляет плейлисты папок (folder_path внутри VIDEOS_DIR), в которых не
+    осталось живых видео. Плейлисты, созданные вручную с другим folder_path,
+    не трогаются.
+
+    Помеченные удалёнными видео такого плейлиста отвязываются от него
+    (playlist_id = NULL), а не удаляются каскадом: они доживают до
+    purge_deleted_videos и при возвращении файла получат плейлист заново.
+    """
+    roots = sorted({str(Path(cfg.VIDEOS_DIR)), str(cfg.videos_dir_absolute)})
+    patterns = [
+        root.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "/%"
+        for root in roots
+    ]
+    connection = Tortoise.get_connection("default")
+    async with connection.acquire_connection() as conn, conn.transaction():
+        empty = await conn.fetch(
+            """
+            SELECT p.id FROM playlists p
+            WHERE (
+                p.folder_path = ANY($1::varchar[])
+                OR p.folder_path LIKE ANY ($2::varchar[])
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM videos v
+                WHERE v.playlist_id = p.id AND v.deleted_at IS NULL
+            )
+            FOR UPDATE OF p
+            """,
+            roots,
+            patterns,
+        )
+        playlist_ids = [row["id"] for row in empty]
+        if not playlist_ids:
+            return 0
+        await conn.execute(
+            """
+            UPDATE videos SET playlist_id = NULL
+            WHERE playlist_id = ANY($1::int[]) AND deleted_at IS NOT NULL
+            """,
+            playlist_ids,
+        )
+        # Живое видео, появившееся в плейлисте за это время, его сохраняет
+        status = await conn.execute(
+            """
+            DELETE FROM playlists p
+            WHERE p.id = ANY($1::int[])
+              AND NOT EXISTS (SELECT 1 FROM videos v WHERE v.playlist_id = p.id)
+            """,
+            playlist_ids,
+        )
+    return int(status.split()[-1])
+
+
+async def get_videos_by_path(paths: list[str]) -> list[dict[str, Any]]:
+    """
+    Возвращает манифест (id, размер, отпечаток) видео с указанными путями,
+    а также всех видео внутри папок с этими путями.
+    """
+    if not paths:
+        return []
+    connection = Tortoise.get_connection("default")
+    return await connection.execute_query_dict(
+        """
+        SELECT id, filepath, file_size, fingerprint, deleted_at FROM videos
+        WHERE filepath = ANY($1::varchar[])
+           OR filepath LIKE ANY (
+                SELECT replace(replace(replace(p, '\\', '\\\\'), '%', '\\%'), '_', '\\_')
+                       || '/%'
+                FROM unnest($1::varchar[]) AS p
+           )
+        """,
+        [paths],
+    )
+
+
+async def get_cue_manifest(paths: list[str] | None = None) -> list[dict[str, Any]]:
+    """
+    Сигнатуры загруженных субтитров живых видео (все или с указанными путями).
+    """
+    connection = Tortoise.get_connection("default")
+    query = """
+        SELECT id, filepath, cues_size, cues_mtime_ns FROM videos
+        WHERE deleted_at IS NULL
+        """
+    if paths is None:
+        return await connection.execute_query_dict(query)
+    return await connection.execute_query_dict(
+        query + " AND filepath = ANY($1::varchar[])", [paths]
+    )
+
+
+async def replace_video_cues(
+    items: list[tuple[int, int | None, int | None, list[tuple[float, float, str]]]],
+) -> int:
+    """
+    Заменяет реплики субтитров пачки видео за одну транзакцию: старые
+    удаляются, новые (начало, конец, текст) загружаются через COPY,
+    сигнатуры файлов .vtt (размер, mtime_ns; None — файла нет) записываются
+    в videos. Возвращает число обновлённых видео.
+    """
+    if not items:
+        return 0
+    ids = [video_id for video_id, _, _, _ in items]
+    connection = Tortoise.get_connection("default")
+    async with connection.acquire_connection() as conn, conn.transaction():
+        await conn.execute(
+            "DELETE FROM video_cues WHERE video_id = ANY($1::int[])", ids
+        )
+        await conn.copy_records_to_table(
+            "video_cues",
+            records=[
+                (video_id, *cue) for video_id, _, _, cues in items for cue in cues
+            ],
+            columns=["video_id", "start_seconds", "end_seconds", "text"],
+        )
+        await conn.execute(
+            """
+            UPDATE videos v
+            SET cues_size = u.size, cues_mtime_ns = u.mtime_ns
+            FROM unnest($1::int[], $2::bigint[], $3::bigint[])
+                AS u(id, size, mtime_ns)
+            WHERE v.id = u.id
+            """,
+            ids,
+            [size for _, size, _, _ in items],
+            [mtime_ns for _, _, mtime_ns, _ in items],
+        )
+    return len(items)
+
+
+async def move_videos(moves: dict[int, str]) -> set[int]:
+    """
+    Переносит записи видео на новые пути с сохранением id.
+    Путь, уже занятый другой записью, пропускается.
+    Возвращает id перенесённых записей.
+    """
+    if not moves:
+        return set()
+    connection = Tortoise.get_connection("default")
+    rows = await connection.execute_query_dict(
+        """
+        UPDATE videos v SET filepath = m.filepath
+        FROM unnest($1::int[], $2::varchar[]) AS m(id, filepath)
+        WHERE v.id = m.id
+          AND NOT EXISTS (SELECT 1 FROM videos o WHERE o.filepath = m.filepath)
+        RETURNING v.id
+        """,
+        [list(moves), list(moves.values())],
+    )
+    stream_cache.invalidate()
+    return {row["id"] for row in rows}
+
+
+async def get_catalog_version() -> int:
+    """
+    Поколение каталога: меняется триггерами при любой записи в videos
+    и playlists (они же заполняют журнал catalog_changes).
+    """
+    connection = Tortoise.get_connection("default")
+    rows = await connection.execute_query_dict(
+        "SELECT version FROM catalog_state WHERE id = 1"
+    )
+    return rows[0]["version"] if rows else 0
+
+
+async def get_catalog_snapshot(
+    fields: Sequence[str] = tuple(VIDEO_SUMMARY_COLUMNS),
+) -> dict[str, Any]:
+    """
+    Весь каталог одним снимком: поколение, сводки живых видео в порядке id
+    (поля fields и всегда id) и плейлисты в естественном порядке названий.
+    Всё читается в одной транзакции REPEATABLE READ, так что строки
+    в точности соответствуют поколению.
+    """
+    columns = list(fields) if "id" in fields else ["id", *fields]
+    connection = Tortoise.get_connection("default")
+    async with (
+        connection.acquire_connection() as conn,
+        conn.transaction(isolation="repeatable_read", readonly=True),
+    ):
+        version = await conn.fetchval("SELECT version FROM catalog_state WHERE id = 1")
+        videos = await conn.fetch(
+            f"""
+            SELECT {_summary_select(columns)} FROM videos
+            WHERE deleted_at IS NULL
+            ORDER BY id
+            """
+        )
+        playlists = await conn.fetch(
+            f"SELECT {_PLAYLIST_COLUMNS} FROM playlists p ORDER BY p.sort_key, p.id"
+        )
+    return {
+        "version": version or 0,
+        "videos": [dict(row) for row in videos],
+        "playlists": [dict(row) for row in playlists],
+    }
+
+
+async def get_catalog_changes(
+    since: int, fields: Sequence[str] = tuple(VIDEO_SUMMARY_COLUMNS)
+) -> dict[str, Any] | None:
+    """
+    Изменения каталога после поколения since по журналу catalog_changes
+    (миграция 0014): текущие строки изменившихся живых видео (поля fields
+    и всегда id) и плейлистов, id удалённых видео (в том числе помеченных
+    удалёнными) и плейлистов.
+
+    Возвращает None, если журнал не покрывает since (старые записи удалены,
+    таблицы очищались или since из другой БД): клиенту нужен полный снимок.
+    """
+    columns = list(fields) if "id" in fields else ["id", *fields]
+    connection = Tortoise.get_connection("default")
+    async with (
+        connection.acquire_connection() as conn,
+        conn.transaction(isolation="repeatable_read", readonly=True),
+    ):
+        state = await conn.fetchrow(
+            "SELECT version, changes_floor FROM catalog_state WHERE id = 1"
+        )
+        if state is None or not state["changes_floor"] <= since <= state["version"]:
+            return None
+        changed = await conn.fetch(
+            "SELECT DISTINCT kind, item_id FROM catalog_changes WHERE version > $1",
+            since,
+        )
+        video_ids = [row["item_id"] for row in changed if row["kind"] == "video"]
+        playlist_ids = [row["item_id"] for row in changed if row["kind"] == "playlist"]
+        videos = await conn.fetch(
+            f"""
+            SELECT {_summary_select(columns)} FROM videos
+            WHERE id = ANY($1::int[]) AND deleted_at IS NULL
+            ORDER BY id
+            """,
+            video_ids,
+        )
+        playlists = await conn.fetch(
+            f"""
+            SELECT {_PLAYLIST_COLUMNS} FROM playlists p
+            WHERE p.id = ANY($1::int[])
+            ORDER BY p.sort_key, p.id
+            """,
+            playlist_ids,
+        )
+    live_videos = {row["id"] for row in videos}
+    live_playlists = {row["id"] for row in playlists}
+    return {
+        "version": state["version"],
+        "videos": [dict(row) for row in videos],
+        "playlists": [dict(row) for row in playlists],
+        "deleted_videos": sorted(set(video_ids) - live_videos),
+        "deleted_playlists": sorted(set(playlist_ids) - live_playlists),
+    }
+
+
+async def prune_catalog_changes() -> int:
+    """
+    Удаляет записи журнала изменений старше CATALOG_CHANGES_RETENTION_DAYS
+    и поднимает changes_floor до последнего удалённого поколения: клиенты
+    с более старым поколением получат полный снимок. Возвращает число
+    удалённых записей.
+    """
+    if cfg.CATALOG_CHANGES_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = timezone.now() - timedelta(days=cfg.CATALOG_CHANGES_RETENTION_DAYS)
+    connection = Tortoise.get_connection("default")
+    async with connection.acquire_connection() as conn, conn.transaction():
+        floor = await conn.fetchval(
+            "SELECT max(version) FROM catalog_changes WHERE changed_at < $1",
+            cutoff,
+        )
+        if floor is None:
+            return 0
+        await conn.execute(
+            """
+            UPDATE catalog_state SET changes_floor = greatest(changes_floor, $1)
+            WHERE id = 1
+            """,
+            floor,
+        )
+        status = await conn.execute(
+            "DELETE FROM catalog_changes WHERE version <= $1", floor
+        )
+    return int(status.split()[-1])
+
+
+async def get_suggest_titles() -> list[dict[str, Any]]:
+    """Названия живых видео и плейлистов (kind, id, title) для индекса подсказок."""
+    connection = Tortoise.get_connection("default")
+    return await connection.execute_query_dict(
+        """
+        SELECT 'video' AS kind, id, title FROM videos WHERE deleted_at IS NULL
+        UNION ALL
+        SELECT 'playlist', id, name FROM playlists
+        """
+    )
+
+
+async def get_suggest_changes(since: int) -> tuple[int, list[dict[str, Any]]] | None:
+    """
+    Названия видео и плейлистов, изменившихся после поколения since,
+    по журналу catalog_changes: (текущее поколение, строки kind, id, title),
+    у удалённых title — NULL. None, если журнал не покрывает since.
+    """
+    connection = Tortoise.get_connection("default")
+    async with (
+        connection.acquire_connection() as conn,
+        conn.transaction(isolation="repeatable_read", readonly=True),
+    ):
+        state = await conn.fetchrow(
+            "SELECT version, changes_floor FROM catalog_state WHERE id = 1"
+        )
+        if state is None or not state["changes_floor"] <= since <= state["version"]:
+            return None
+        rows = await conn.fetch(
+            """
+            SELECT c.kind, c.item_id AS id, coalesce(v.title, p.name) AS title
+            FROM (
+                SELECT DISTINCT kind, item_id FROM catalog_changes
+                WHERE version > $1
+            ) c
+            LEFT JOIN videos v
+                ON c.kind = 'video' AND v.id = c.item_id AND v.deleted_at IS NULL
+            LEFT JOIN playlists p ON c.kind = 'playlist' AND p.id = c.item_id
+            """,
+            since,
+        )
+    return state["version"], [dict(row) for row in rows]
+
+
+async def suggest_titles_fuzzy(query: str, limit: int) -> list[dict[str, Any]]:
+    """
+    Названия видео и плейлистов, похожие на query с опечатками: по сходству
+    слов pg_trgm (оператор <%, GIN-индексы триграмм), похожие первыми.
+    """
+    connection = Tortoise.get_connection("default")
+    return await connection.execute_query_dict(
         """
+        SELECT kind, id, title FROM (
+            SELECT 'video' AS kind, id, title, word_similarity($1, title) AS score
+            FROM videos
+            WHERE $1 <% title AND deleted_at IS NULL
+            UNION ALL
+            SELECT 'playlist', id, name, word_similarity($1, name)
+            FROM playlists
+            WHERE $1 <% name
+        ) s
+        ORDER BY score DESC, title
+        LIMIT $2
+        """,
+        [query, limit],
+    )
+
+
+# Запрос страницы поиска: $1 — текст запроса, $2-$4 — курсор (rank, id, cue_id)
+# или NULL, $5 — размер страницы. Его план проверяет tests/test_search_index.py.
+# q не материализуется: иначе планировщик не видит tsquery и сравнивает
+# search_vector с ним построчно, мимо GIN-индекса
+SEARCH_QUERY = """
+    WITH q AS NOT MATERIALIZED (SELECT plainto_tsquery('russian', $1) AS query),
+    ranked AS (
+        SELECT c.video_id AS id, c.id AS cue_id, c.start_seconds,
+               ts_rank_cd(c.search_vector, q.query) AS rank
+        FROM video_cues c
+        JOIN videos v ON v.id = c.video_id
+        CROSS JOIN q
+        WHERE c.search_vector @@ q.query
+          AND v.deleted_at IS NULL
+        UNION ALL
+        SELECT v.id, 0, NULL, ts_rank_cd(v.search_vector, q.query)
+        FROM videos v, q
+        WHERE v.search_vector @@ q.query
+          AND v.deleted_at IS NULL
+          AND (v.cues_size IS NULL OR to_tsvector('russian', v.title) @@ q.query)
+    ),
+    page AS (
+        SELECT id, cue_id, start_seconds, rank
+        FROM ranked
+        WHERE $2::real IS NULL
+           OR (rank, id, cue_id) < ($2::real, $3::int, $4::bigint)
+        ORDER BY rank DESC, id DESC, cue_id DESC
+        LIMIT $5
+    )
+    SELECT
+        t.total,
+        p.id,
+        p.cue_id,
+        p.start_seconds,
+        p.rank,
+        v.title,
+        v.filepath,
+        ts_headline('russian',
+                    CASE WHEN p.cue_id = 0 THEN v.transcription ELSE c.text END,
+                    q.query,
+                    'StartSel=<b>,StopSel=</b>,MaxFragments=1,FragmentDelimiter=...,MaxWords=30,MinWords=15') AS snippet
+    FROM (SELECT count(*) AS total FROM ranked) t
+    CROSS JOIN q
+    LEFT JOIN page p ON true
+    LEFT JOIN videos v ON v.id = p.id
+    LEFT JOIN video_cues c ON c.id = p.cue_id
+    ORDER BY p.rank DESC, p.id DESC, p.cue_id DESC;
+    """
+
+
+async def search_videos_by_transcription(
+    query: str, limit: int, after: tuple[float, int, int] | None = None
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Страница результатов поиска, лучшие совпадения первыми.
+
+    Совпадения ищутся по GIN-индексам: в репликах субтитров (video_cues,
+    результат с началом реплики start_seconds) и в видео без субтитров —
+    по названию (вес A) и транскрипции (вес B); у видео с субтитрами
+    отдельным результатом находится только название. Все совпадения
+    ранжируются, затем берётся страница из limit строк после курсора
+    after = (rank, id, cue_id), и лишь для неё строится ts_headline.
+
+    Returns:
+        Строки страницы (с rank и cue_id; на одну больше limit, если есть
+        следующая) и общее число совпадений.
+    """
+    after_rank, after_id, after_cue = after if after is not None else (None,) * 3
     try:
         connection = Tortoise.get_connection("default")
-        rows = await connection.execute_query_dict(search_query, [query])
-        return [
-            {
-                "id": r["id"],
-                "title": r["title"],
-                "filepath": r["filepath"],
-                "snippet": r["snippet"],
-            }
-            for r in rows
-        ]
+        rows = await connection.execute_query_dict(
+            SEARCH_QUERY, [query, after_rank, after_id, after_cue, limit + 1]
+        )
     except Exception as e:
         logger.exception(f"Error during search for query '{query}': {e}")
         raise
+    total = rows[0]["total"] if rows else 0
+    results = [
+        {
+            "id": r["id"],
+            "title": r["title"],
+            "filepath": r["filepath"],
+            "snippet": r["snippet"],
+            "start_seconds": r["start_seconds"],
+            "rank": r["rank"],
+            "cue_id": r["cue_id"],
+        }
+        for r in rows
+        if r["id"] is not None
+    ]
+    return results, total
 
 
 async def clear_database() -> None:
     """Удаляет все записи из таблицы videos."""
     await Video.all().delete()
+    stream_cache.invalidate()
+
+
+async def get_keyframe_index(video_id: int) -> VideoKeyframeIndex | None:
+    return await VideoKeyframeIndex.get_or_none(video_id=video_id)
+
+
+async def save_keyframe_index(
+    video_id: int, etag: str, timescale: int, duration: int, keyframes: bytes
+) -> None:
+    """Сохраняет индекс ключевых кадров видео, заменяя устаревший."""
+    values = {
+        "etag": etag,
+        "timescale": timescale,
+        "duration": duration,
+        "keyframes": keyframes,
+    }
+    try:
+        await VideoKeyframeIndex.update_or_create(defaults=values, video_id=video_id)
+    except IntegrityError:
+        # Тот же индекс одновременно сохранил другой процесс
+        # или видео уже удалено
+        logger.debug(f"Keyframe index for video {video_id} was not saved")
 
 
 # Playlist CRUD operations
@@ -108,13 +811,77 @@ async def get_playlist_by_folder(folder_path: str) -> Playlist | None:
     return await Playlist.filter(folder_path=folder_path).first()
 
 
-async def get_playlists(skip: int = 0, limit: int = 100) -> list[PlaylistInDB]:
-    playlists = (
-        await Playlist.annotate(video_count=Count("videos")).offset(skip).limit(limit)
+async def get_playlist_ids_by_folder() -> dict[str, int]:
+    """Возвращает идентификаторы всех плейлистов, индексированные по папке."""
+    rows = await Playlist.all().values_list("folder_path", "id")
+    return dict(rows)
+
+
+async def bulk_create_playlists(playlists: list[PlaylistCreate]) -> dict[str, int]:
+    """
+    Создаёт плейлисты одним запросом, пропуская уже существующие папки.
+    Возвращает идентификаторы плейлистов по папке для всех переданных папок.
+    """
+    if not playlists:
+        return {}
+    connection = Tortoise.get_connection("default")
+    await connection.execute_query(
+        """
+        INSERT INTO playlists (name, folder_path, description)
+        SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::text[])
+        ON CONFLICT (folder_path) DO NOTHING
+        """,
+        [
+            [p.name for p in playlists],
+            [p.folder_path for p in playlists],
+            [p.description for p in playlists],
+        ],
     )
-    playlists_in_db = [PlaylistInDB.model_validate(p) for p in playlists]
-    playlists_in_db.sort(key=lambda p: natural_sort_key(p.name))
-    return playlists_in_db
+    rows = await Playlist.filter(
+        folder_path__in=[p.folder_path for p in playlists]
+    ).values_list("folder_path", "id")
+    return dict(rows)
+
+
+async def get_playlists(
+    skip: int = 0, limit: int = 100, after: tuple[str, int] | None = None
+) -> tuple[list[PlaylistInDB], tuple[str, int] | None]:
+    """
+    Страница плейлистов в естественном порядке названий.
+
+    Порядок задаёт генерируемая колонка sort_key (миграция 0013), страница
+    начинается после ключа after = (sort_key, id) последней строки
+    предыдущей — просмотр диапазона индекса idx_playlists_sort_key на любой
+    глубине, skip при этом не учитывается. Без after страница отсчитывается
+    с начала через skip (OFFSET; оставлен для старых клиентов). Возвращает
+    плейлисты и after следующей страницы (None, если страница последняя).
+    """
+    select = f"SELECT {_PLAYLIST_COLUMNS}, p.sort_key FROM playlists p"
+    connection = Tortoise.get_connection("default")
+    if after is not None:
+        rows = await connection.execute_query_dict(
+            f"""
+            {select}
+            WHERE (p.sort_key, p.id) > ($1::text COLLATE "C", $2::int)
+            ORDER BY p.sort_key, p.id
+            LIMIT $3
+            """,
+            [*after, limit + 1],
+        )
+    else:
+        rows = await connection.execute_query_dict(
+            f"""
+            {select}
+            ORDER BY p.sort_key, p.id
+            OFFSET $1 LIMIT $2
+            """,
+            [skip, limit + 1],
+        )
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1]["sort_key"], rows[-1]["id"])
+    return [PlaylistInDB.model_validate(row) for row in rows], next_after
 
 
 async def create_playlist(playlist: PlaylistCreate) -> Playlist:
@@ -135,10 +902,81 @@ async def update_playlist(
 async def delete_playlist(playlist_id: int) -> Playlist | None:
     db_playlist = await get_playlist(playlist_id)
     if db_playlist:
+        # Видео плейлиста удаляются каскадно
         await db_playlist.delete()
+        stream_cache.invalidate()
     return db_playlist
 
 
+# Scan job operations
+
+SCAN_REPORT_FIELDS = (
+    "added",
+    "changed",
+    "unchanged",
+    "removed",
+    "moved",
+    "db_writes",
+)
+
+
+def _scan_report_columns(report: ScanReport) -> dict[str, int]:
+    return {name: getattr(report, name) for name in SCAN_REPORT_FIELDS}
+
+
+async def count_videos() -> int:
+    return await _live_videos().count()
+
+
+async def create_scan_job(files_expected: int) -> ScanJob:
+    return await ScanJob.create(
+        status=ScanStatus.RUNNING,
+        files_expected=files_expected,
+        started_at=timezone.now(),
+    )
+
+
+async def get_scan_job(job_id: int) -> ScanJob | None:
+    return await ScanJob.filter(id=job_id).first()
+
+
+async def get_running_scan_job() -> ScanJob | None:
+    return await ScanJob.filter(status=ScanStatus.RUNNING).order_by("-id").first()
+
+
+async def update_scan_job_progress(job_id: int, report: ScanReport) -> bool:
+    """Сохраняет прогресс задания. Возвращает True, если запрошена его отмена."""
+    await ScanJob.filter(id=job_id).update(**_scan_report_columns(report))
+    return await ScanJob.filter(id=job_id, cancel_requested=True).exists()
+
+
+async def finish_scan_job(
+    job_id: int, status: ScanStatus, report: ScanReport, error: str | None = None
+) -> None:
+    await ScanJob.filter(id=job_id).update(
+        status=status,
+        error=error,
+        finished_at=timezone.now(),
+        **_scan_report_columns(report),
+    )
+
+
+async def interrupt_running_scan_jobs() -> int:
+    """Помечает как прерванные задания, оставшиеся от упавших процессов."""
+    return await ScanJob.filter(status=ScanStatus.RUNNING).update(
+        status=ScanStatus.FAILED,
+        error="Interrupted",
+        finished_at=timezone.now(),
+    )
+
+
+async def request_scan_job_cancel(job_id: int) -> ScanJob | None:
+    await ScanJob.filter(id=job_id, status=ScanStatus.RUNNING).update(
+        cancel_requested=True
+    )
+    return await get_scan_job(job_id)
+
+
 async def get_user_by_name(user_name: str) -> User | None:
     return await User.filter(username=user_name).first()
 
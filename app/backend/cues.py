@@ -0,0 +1,150 @@
+import asyncio
+import html
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.backend import crud
+from app.backend.config import cfg
+from app.backend.walker import FileSignature, stat_file
+
+logger = logging.getLogger(__name__)
+
+# Субтитры лежат в TRANSCRIPTIONS_DIR по тому же относительному пути, что и видео
+CUES_SUFFIX = ".vtt"
+
+_TIMING = re.compile(
+    r"^\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})"
+)
+_BLOCK_SEPARATOR = re.compile(r"\r?\n[ \t]*\r?\n")
+_TAG = re.compile(r"<[^>]*>")
+
+
+@dataclass(frozen=True, slots=True)
+class Cue:
+    start: float
+    end: float
+    text: str
+
+
+def _parse_time(value: str) -> float:
+    seconds = 0.0
+    for part in value.replace(",", ".").split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_vtt(text: str) -> list[Cue]:
+    """
+    Разбирает WebVTT: блоки, разделённые пустой строкой, со строкой времени
+    "00:01.000 --> 00:04.000" (перед ней может быть идентификатор реплики).
+    Блоки NOTE, STYLE и REGION пропускаются, теги разметки удаляются.
+    """
+    cues: list[Cue] = []
+    for block in _BLOCK_SEPARATOR.split(text.lstrip("﻿")):
+        lines = block.strip().splitlines()
+        for index, line in enumerate(lines[:2]):
+            match = _TIMING.match(line)
+            if match is None:
+                continue
+            body = " ".join(
+                html.unescape(_TAG.sub("", body_line)).strip()
+                for body_line in lines[index + 1 :]
+            ).strip()
+            if body:
+                cues.append(Cue(_parse_time(match[1]), _parse_time(match[2]), body))
+            break
+    return cues
+
+
+def cues_path(filepath: str) -> Path | None:
+    """Путь к субтитрам видео или None, если видео лежит вне VIDEOS_DIR."""
+    try:
+        relative = Path(filepath).resolve().relative_to(cfg.videos_dir_absolute)
+    except (ValueError, OSError):
+        return None
+    return cfg.transcriptions_dir_absolute / relative.with_suffix(CUES_SUFFIX)
+
+
+def _stat_cues(
+    filepaths: list[str],
+) -> tuple[list[Path | None], list[FileSignature | None]]:
+    """
+    Пути к субтитрам видео и их сигнатуры. resolve() в cues_path тоже ходит
+    в ФС, поэтому пути строятся здесь, в пуле потоков.
+    """
+    paths = [cues_path(filepath) for filepath in filepaths]
+    return paths, [stat_file(path) if path is not None else None for path in paths]
+
+
+def _read_cues(paths: list[Path | None]) -> list[list[Cue] | None]:
+    """Читает субтитры пачки; None — файл не прочитался (повторим в следующий раз)."""
+    results: list[list[Cue] | None] = []
+    for path in paths:
+        if path is None:
+            results.append([])
+            continue
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                results.append(parse_vtt(f.read()))
+        except OSError as e:
+            logger.warning(f"Cannot read subtitles '{path}': {e}")
+            results.append(None)
+    return results
+
+
+async def sync_cues(videos: list[dict[str, Any]]) -> int:
+    """
+    Приводит реплики субтитров видео в соответствие с файлами .vtt.
+
+    Для каждой записи (id, filepath, cues_size, cues_mtime_ns) сигнатура
+    файла субтитров сравнивается с сохранённой; перечитываются только новые,
+    изменившиеся и пропавшие файлы, реплики записываются пачками по
+    SCAN_BATCH_SIZE видео. Возвращает число видео с обновлёнными репликами.
+    """
+    if not videos:
+        return 0
+    if not cfg.transcriptions_dir_absolute.is_dir():
+        # Неподключённый том не должен стирать уже загруженные реплики
+        logger.warning(
+            f"Transcriptions directory '{cfg.TRANSCRIPTIONS_DIR}' not found, "
+            f"skipping subtitle sync"
+        )
+        return 0
+    loop = asyncio.get_running_loop()
+    paths, signatures = await loop.run_in_executor(
+        None, _stat_cues, [row["filepath"] for row in videos]
+    )
+    changed = [
+        (row, path if signature else None, signature)
+        for row, path, signature in zip(videos, paths, signatures)
+        if ((signature.size, signature.mtime_ns) if signature else (None, None))
+        != (row["cues_size"], row["cues_mtime_ns"])
+    ]
+
+    updated = 0
+    for start in range(0, len(changed), cfg.SCAN_BATCH_SIZE):
+        batch = changed[start : start + cfg.SCAN_BATCH_SIZE]
+        parsed = await loop.run_in_executor(
+            None, _read_cues, [path for _, path, _ in batch]
+        )
+        items = [
+            (
+                row["id"],
+                signature.size if signature else None,
+                signature.mtime_ns if signature else None,
+                [(cue.start, cue.end, cue.text) for cue in cues],
+            )
+            for (row, _, signature), cues in zip(batch, parsed)
+            if cues is not None
+        ]
+        try:
+            updated += await crud.replace_video_cues(items)
+        except Exception:
+            # Например, видео удалено во время синхронизации: пачка повторится позже
+            logger.exception("Failed to store subtitle cues")
+    if updated:
+        logger.info(f"Subtitle cues updated for {updated} videos")
+    return updated
@@ -0,0 +1,207 @@
+import asyncio
+import io
+import logging
+import struct
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from app.backend import mp4
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats
+
+logger = logging.getLogger(__name__)
+
+# moov больше этого размера не переносим: файл отдаётся как есть
+MAX_MOOV_BYTES = 16 * 1024 * 1024
+# Сколько раскладок помнить (в том числе отрицательных результатов);
+# объём переписанных moov ограничен FASTSTART_CACHE_BYTES
+MAX_ENTRIES = 1024
+
+# Боксы, внутри которых лежат таблицы смещений чанков
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+@dataclass(frozen=True, slots=True)
+class VirtualLayout:
+    """
+    Файл MP4 в раскладке faststart: moov перед mdat.
+
+    Куски виртуального файла идут подряд: (длина, источник), где источник —
+    смещение в исходном файле или байты переписанного moov. Размер
+    виртуального файла равен размеру исходного.
+    """
+
+    size: int
+    pieces: tuple[tuple[int, int | bytes], ...]
+
+    @property
+    def moov_bytes(self) -> int:
+        """Объём переписанного moov, хранящегося в памяти."""
+        return sum(
+            len(source) for _, source in self.pieces if isinstance(source, bytes)
+        )
+
+    def map(self, start: int, length: int) -> Iterator[tuple[int | bytes, int]]:
+        """
+        Переводит диапазон [start, start + length) виртуального файла в куски:
+        (смещение в файле, длина) или (байты, длина).
+        """
+        end = start + length
+        pos = 0
+        for piece_length, source in self.pieces:
+            piece_end = pos + piece_length
+            lo, hi = max(start, pos), min(end, piece_end)
+            if lo < hi:
+                if isinstance(source, bytes):
+                    yield source[lo - pos : hi - pos], hi - lo
+                else:
+                    yield source + lo - pos, hi - lo
+            pos = piece_end
+            if pos >= end:
+                return
+
+
+def faststart_etag(etag: str) -> str:
+    """ETag виртуальной раскладки: её байты отличаются от байтов файла."""
+    return etag[:-1] + '-fs"'
+
+
+def _shift_chunk_offsets(
+    f: BinaryIO, moov: bytearray, start: int, end: int, lo: int, hi: int, shift: int
+) -> bool:
+    """
+    Сдвигает на shift смещения чанков stco/co64, попадающие в [lo, hi).
+    Боксы читаются из f, новые смещения пишутся в moov (те же позиции).
+    Возвращает False, если смещение не помещается в 32 бита stco.
+    """
+    for box_type, _, data_start, box_end in mp4.iter_boxes(f, start, end):
+        if box_type in CONTAINER_BOXES:
+            if not _shift_chunk_offsets(f, moov, data_start, box_end, lo, hi, shift):
+                return False
+        elif box_type in (b"stco", b"co64"):
+            fmt = ">I" if box_type == b"stco" else ">Q"
+            size = struct.calcsize(fmt)
+            (count,) = struct.unpack_from(">I", moov, data_start + 4)
+            pos = data_start + 8
+            for _ in range(min(count, (box_end - pos) // size)):
+                (offset,) = struct.unpack_from(fmt, moov, pos)
+                if lo <= offset < hi:
+                    offset += shift
+                    if box_type == b"stco" and offset > 0xFFFFFFFF:
+                        return False
+                    struct.pack_into(fmt, moov, pos, offset)
+                pos += size
+    return True
+
+
+def build_layout(path: Path, file_size: int) -> VirtualLayout | None:
+    """
+    Строит раскладку faststart для MP4, у которого moov записан после mdat.
+    Возвращает None, если файл не MP4, moov уже в начале или не может
+    быть перенесён (слишком большой, смещения не помещаются в stco).
+    """
+    with open(path, "rb") as f:
+        if not mp4.is_mp4(f.read(8)):
+            return None
+        first_mdat = moov = None
+        for box_type, box_start, _, box_end in mp4.iter_boxes(f, 0, file_size):
+            if box_type == b"mdat" and first_mdat is None:
+                first_mdat = box_start
+            elif box_type == b"moov":
+                moov = (box_start, box_end)
+                break
+        if first_mdat is None or moov is None or moov[0] < first_mdat:
+            return None
+        moov_start, moov_end = moov
+        if moov_end - moov_start > MAX_MOOV_BYTES:
+            return None
+        data = bytearray(mp4.read_payload(f, moov_start, moov_end))
+
+    moov_length = len(data)
+    if moov_length != moov_end - moov_start:
+        return None
+    reader = io.BytesIO(data)
+    # Всё между началом mdat и moov сдвигается вперёд на длину moov
+    if not _shift_chunk_offsets(
+        reader, data, 0, moov_length, first_mdat, moov_start, moov_length
+    ):
+        logger.info(f"'{path}' needs co64 offsets for faststart, serving as is")
+        return None
+    pieces: list[tuple[int, int | bytes]] = [
+        (first_mdat, 0),
+        (moov_length, bytes(data)),
+        (moov_start - first_mdat, first_mdat),
+    ]
+    if moov_end < file_size:
+        pieces.append((file_size - moov_end, moov_end))
+    return VirtualLayout(size=file_size, pieces=tuple(p for p in pieces if p[0]))
+
+
+class LayoutCache:
+    """
+    LRU-кэш раскладок faststart по ETag файла: не больше MAX_ENTRIES записей
+    и FASTSTART_CACHE_BYTES байт переписанных moov. Раскладка, которая
+    одна больше бюджета, отдаётся, но не кэшируется. Отрицательный результат
+    (файл уже faststart или не MP4) тоже кэшируется.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, VirtualLayout | None] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[VirtualLayout | None]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str, path: Path, file_size: int) -> VirtualLayout | None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(
+                loop.run_in_executor(None, build_layout, path, file_size)
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._store(key, f))
+        try:
+            return await asyncio.shield(future)
+        except (OSError, struct.error) as e:
+            logger.warning(f"Cannot read '{path}' for faststart: {e}")
+            return None
+
+    def _store(self, key: str, future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        layout = future.result()
+        size = layout.moov_bytes if layout is not None else 0
+        if size > cfg.FASTSTART_CACHE_BYTES:
+            return
+        self._entries[key] = layout
+        self.bytes += size
+        while (
+            len(self._entries) > MAX_ENTRIES or self.bytes > cfg.FASTSTART_CACHE_BYTES
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            if evicted is not None:
+                self.bytes -= evicted.moov_bytes
+            self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            bytes=self.bytes,
+            evictions=self.evictions,
+        )
+
+
+layout_cache = LayoutCache()
@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app.backend.config import cfg
+
+# Размер одного читаемого блока: начало, середина и конец файла
+SAMPLE_SIZE = 64 * 1024
+
+
+def fingerprint_file(path: str) -> str | None:
+    """
+    Быстрый отпечаток содержимого: размер файла и хеш трёх блоков
+    (начало, середина, конец). Читает не больше 3 * SAMPLE_SIZE байт,
+    поэтому годится для поиска перемещённых файлов, а не для проверки
+    целостности. Возвращает None, если файл не читается.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+            if size <= 3 * SAMPLE_SIZE:
+                digest.update(f.read())
+            else:
+                for offset in (0, (size - SAMPLE_SIZE) // 2, size - SAMPLE_SIZE):
+                    f.seek(offset)
+                    digest.update(f.read(SAMPLE_SIZE))
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+_executor: ThreadPoolExecutor | None = None
+
+
+async def fingerprint_files(paths: list[str]) -> list[str | None]:
+    """Считает отпечатки параллельно в пуле потоков (FINGERPRINT_WORKERS)."""
+    global _executor
+    if not paths:
+        return []
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=cfg.FINGERPRINT_WORKERS, thread_name_prefix="fingerprint"
+        )
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(loop.run_in_executor(_executor, fingerprint_file, path) for path in paths)
+    )
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
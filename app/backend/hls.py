@@ -0,0 +1,590 @@
+import asyncio
+import io
+import itertools
+import logging
+import math
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from app.backend import crud, mp4
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats
+from app.backend.stream_cache import StreamInfo
+
+logger = logging.getLogger(__name__)
+
+# Предел размера moov, который разбираем в памяти
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+
+# Флаги сэмплов trun: ключевой кадр и кадр, зависящий от других
+SYNC_SAMPLE_FLAGS = 0x02000000
+NON_SYNC_SAMPLE_FLAGS = 0x01010000
+
+# trun: data-offset, длительность, размер, флаги и смещение CTS каждого сэмпла
+TRUN_FLAGS = 0x000001 | 0x000100 | 0x000200 | 0x000400 | 0x000800
+# tfhd: смещения данных отсчитываются от начала moof
+TFHD_DEFAULT_BASE_IS_MOOF = 0x020000
+
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_MEDIA_TYPE = "video/mp4"
+
+
+class HlsUnavailable(Exception):
+    """Файл нельзя упаковать в HLS без перекодирования (не MP4, нет индекса)."""
+
+
+# Примерный размер в памяти одного ключевого кадра: кортеж и два int
+KEYFRAME_OBJECT_BYTES = 120
+
+
+@dataclass(slots=True)
+class Track:
+    """Таблицы сэмплов одной дорожки MP4, развёрнутые в массивы."""
+
+    track_id: int
+    handler: bytes
+    timescale: int
+    # Исходные боксы, из которых собирается init-сегмент
+    tkhd: bytes
+    mdhd: bytes
+    hdlr: bytes
+    media_header: bytes
+    dinf: bytes
+    stsd: bytes
+    offsets: array
+    sizes: array
+    # DTS сэмплов; последний элемент — конец дорожки
+    dts: array
+    cts_offsets: array
+    # Номера ключевых сэмплов с нуля; None — ключевые все
+    sync: array | None
+
+    @property
+    def nbytes(self) -> int:
+        """Примерный объём таблиц и боксов дорожки в памяти."""
+        tables = [self.offsets, self.sizes, self.dts, self.cts_offsets, self.sync]
+        boxes = [self.tkhd, self.mdhd, self.hdlr, self.media_header, self.dinf]
+        return sum(t.itemsize * len(t) for t in tables if t is not None) + sum(
+            len(box) for box in [*boxes, self.stsd]
+        )
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.sizes)
+
+    def keyframes(self) -> list[tuple[int, int]]:
+        samples = range(self.sample_count) if self.sync is None else self.sync
+        return [(sample, self.dts[sample]) for sample in samples]
+
+
+@dataclass(slots=True)
+class KeyframeIndex:
+    """Ключевые кадры видеодорожки: (номер сэмпла, DTS) в единицах timescale."""
+
+    timescale: int
+    duration: int
+    keyframes: list[tuple[int, int]]
+
+    def pack(self) -> bytes:
+        flat = list(itertools.chain.from_iterable(self.keyframes))
+        return struct.pack(f"<{len(flat)}q", *flat)
+
+    @classmethod
+    def unpack(cls, timescale: int, duration: int, data: bytes) -> "KeyframeIndex":
+        flat = struct.unpack(f"<{len(data) // 8}q", data)
+        return cls(timescale, duration, list(zip(flat[::2], flat[1::2])))
+
+    def segments(self) -> list[tuple[int, int, int]]:
+        """
+        Границы сегментов: (первый сэмпл, начало, конец) в единицах timescale.
+        Сегмент начинается с ключевого кадра и длится не меньше
+        HLS_SEGMENT_SECONDS, если ключевые кадры позволяют.
+        """
+        target = cfg.HLS_SEGMENT_SECONDS * self.timescale
+        starts = [(0, 0)]
+        for sample, dts in self.keyframes:
+            if sample > 0 and dts - starts[-1][1] >= target:
+                starts.append((sample, dts))
+        ends = [dts for _, dts in starts[1:]] + [self.duration]
+        return [(sample, start, end) for (sample, start), end in zip(starts, ends)]
+
+
+@dataclass(slots=True)
+class MediaIndex:
+    """Разобранный moov: всё, что нужно для init-сегмента и фрагментов."""
+
+    mvhd: bytes
+    video: Track
+    audio: Track | None
+    keyframes: KeyframeIndex
+
+    @property
+    def tracks(self) -> list[Track]:
+        return [self.video] if self.audio is None else [self.video, self.audio]
+
+    @property
+    def nbytes(self) -> int:
+        """Примерный объём индекса в памяти (ключевой кадр — кортеж из двух int)."""
+        keyframes = len(self.keyframes.keyframes) * KEYFRAME_OBJECT_BYTES
+        return len(self.mvhd) + keyframes + sum(t.nbytes for t in self.tracks)
+
+
+# Разбор MP4: moov/trak/mdia/minf/stbl/{stsd, stts, ctts, stsc, stsz, stco, stss}
+
+
+def _children(f: BinaryIO, start: int, end: int) -> dict[bytes, tuple[int, int, int]]:
+    """Первые вложенные боксы каждого типа: тип -> (начало, начало данных, конец)."""
+    boxes: dict[bytes, tuple[int, int, int]] = {}
+    for box_type, box_start, data_start, box_end in mp4.iter_boxes(f, start, end):
+        boxes.setdefault(box_type, (box_start, data_start, box_end))
+    return boxes
+
+
+def _raw(f: BinaryIO, box: tuple[int, int, int]) -> bytes:
+    return mp4.read_payload(f, box[0], box[2])
+
+
+def _payload(f: BinaryIO, box: tuple[int, int, int]) -> bytes:
+    return mp4.read_payload(f, box[1], box[2])
+
+
+def _table(data: bytes, fmt: str, offset: int = 8) -> list[tuple]:
+    """Записи таблицы полного бокса: счётчик в data[4:8], записи с offset."""
+    (count,) = struct.unpack_from(">I", data, 4)
+    size = struct.calcsize(fmt)
+    return list(struct.iter_unpack(fmt, data[offset : offset + count * size]))
+
+
+def _expand(entries: list[tuple[int, int]]) -> array:
+    """Разворачивает пары (количество, значение) в массив значений."""
+    values = array("q")
+    for count, value in entries:
+        values.extend(array("q", [value]) * count)
+    return values
+
+
+def _parse_track(f: BinaryIO, start: int, end: int) -> Track | None:
+    trak = _children(f, start, end)
+    mdia = trak.get(b"mdia")
+    if b"tkhd" not in trak or mdia is None:
+        return None
+    mdia_boxes = _children(f, mdia[1], mdia[2])
+    minf = mdia_boxes.get(b"minf")
+    if b"mdhd" not in mdia_boxes or b"hdlr" not in mdia_boxes or minf is None:
+        return None
+    minf_boxes = _children(f, minf[1], minf[2])
+    stbl = minf_boxes.get(b"stbl")
+    media_header = minf_boxes.get(b"vmhd") or minf_boxes.get(b"smhd")
+    if stbl is None or media_header is None or b"dinf" not in minf_boxes:
+        return None
+    stbl_boxes = _children(f, stbl[1], stbl[2])
+    chunk_type = b"co64" if b"co64" in stbl_boxes else b"stco"
+    for required in (b"stsd", b"stts", b"stsc", b"stsz"):
+        if required not in stbl_boxes:
+            # stz2 и фрагментированные файлы без таблиц сэмплов не поддерживаем
+            return None
+    if chunk_type not in stbl_boxes:
+        return None
+
+    tkhd = _payload(f, trak[b"tkhd"])
+    track_id_offset = 20 if tkhd[0] == 1 else 12
+    (track_id,) = struct.unpack_from(">I", tkhd, track_id_offset)
+    mdhd = _payload(f, mdia_boxes[b"mdhd"])
+    (timescale,) = struct.unpack_from(">I", mdhd, 20 if mdhd[0] == 1 else 12)
+    handler = _payload(f, mdia_boxes[b"hdlr"])[8:12]
+
+    stsz = _payload(f, stbl_boxes[b"stsz"])
+    sample_size, sample_count = struct.unpack_from(">II", stsz, 4)
+    if sample_size:
+        sizes = array("q", [sample_size]) * sample_count
+    else:
+        sizes = array("q", struct.unpack_from(f">{sample_count}I", stsz, 12))
+
+    durations = _expand(_table(_payload(f, stbl_boxes[b"stts"]), ">II"))
+    dts = array("q", itertools.accumulate(durations, initial=0))
+    cts_offsets = array("q")
+    if b"ctts" in stbl_boxes:
+        ctts = _payload(f, stbl_boxes[b"ctts"])
+        cts_offsets = _expand(_table(ctts, ">Ii" if ctts[0] == 1 else ">II"))
+
+    chunk_data = _payload(f, stbl_boxes[chunk_type])
+    chunk_format = ">Q" if chunk_type == b"co64" else ">I"
+    chunk_offsets = [offset for (offset,) in _table(chunk_data, chunk_format)]
+    chunk_runs = _table(_payload(f, stbl_boxes[b"stsc"]), ">III")
+    offsets = array("q")
+    sample = 0
+    for i, (first_chunk, per_chunk, _) in enumerate(chunk_runs):
+        last_chunk = (
+            chunk_runs[i + 1][0] - 1 if i + 1 < len(chunk_runs) else len(chunk_offsets)
+        )
+        for chunk in range(first_chunk - 1, min(last_chunk, len(chunk_offsets))):
+            pos = chunk_offsets[chunk]
+            for _ in range(min(per_chunk, sample_count - sample)):
+                offsets.append(pos)
+                pos += sizes[sample]
+                sample += 1
+
+    sync = None
+    if b"stss" in stbl_boxes:
+        sync = array(
+            "q", (n - 1 for (n,) in _table(_payload(f, stbl_boxes[b"stss"]), ">I"))
+        )
+
+    # Таблицы повреждённого файла могут расходиться: берём общую часть
+    count = min(len(sizes), len(offsets), len(durations))
+    if count == 0 or not timescale:
+        return None
+    if cts_offsets and len(cts_offsets) < count:
+        cts_offsets.extend(array("q", [0]) * (count - len(cts_offsets)))
+    if sync is not None:
+        sync = array("q", (n for n in sync if 0 <= n < count))
+    return Track(
+        track_id=track_id,
+        handler=handler,
+        timescale=timescale,
+        tkhd=_raw(f, trak[b"tkhd"]),
+        mdhd=_raw(f, mdia_boxes[b"mdhd"]),
+        hdlr=_raw(f, mdia_boxes[b"hdlr"]),
+        media_header=_raw(f, media_header),
+        dinf=_raw(f, minf_boxes[b"dinf"]),
+        stsd=_raw(f, stbl_boxes[b"stsd"]),
+        offsets=offsets[:count],
+        sizes=sizes[:count],
+        dts=dts[: count + 1],
+        cts_offsets=cts_offsets[:count],
+        sync=sync,
+    )
+
+
+def parse_media_index(path: Path) -> MediaIndex:
+    """
+    Читает moov файла одним чтением и разворачивает таблицы сэмплов
+    первой видео- и первой аудиодорожки.
+
+    Raises:
+        HlsUnavailable: Если файл не MP4 или в нём нет пригодной видеодорожки.
+    """
+    with open(path, "rb") as f:
+        if not mp4.is_mp4(f.read(8)):
+            raise HlsUnavailable("not an MP4 file")
+        file_size = os.fstat(f.fileno()).st_size
+        moov = next(
+            (
+                (box_start, box_end)
+                for box_type, box_start, _, box_end in mp4.iter_boxes(f, 0, file_size)
+                if box_type == b"moov"
+            ),
+            None,
+        )
+        if moov is None or moov[1] - moov[0] > MAX_MOOV_BYTES:
+            raise HlsUnavailable("moov box is missing or too large")
+        data = mp4.read_payload(f, *moov)
+
+    f = io.BytesIO(data)
+    boxes = _children(f, 0, len(data))
+    if b"moov" not in boxes:
+        raise HlsUnavailable("moov box is truncated")
+    _, moov_start, moov_end = boxes[b"moov"]
+    mvhd = None
+    video = audio = None
+    for box_type, box_start, data_start, box_end in mp4.iter_boxes(
+        f, moov_start, moov_end
+    ):
+        if box_type == b"mvhd":
+            mvhd = mp4.read_payload(f, box_start, box_end)
+        elif box_type == b"trak":
+            try:
+                track = _parse_track(f, data_start, box_end)
+            except (struct.error, IndexError) as e:
+                raise HlsUnavailable(f"malformed sample tables: {e}") from e
+            if track is None:
+                continue
+            if track.handler == b"vide" and video is None:
+                video = track
+            elif track.handler == b"soun" and audio is None:
+                audio = track
+    if mvhd is None or video is None:
+        raise HlsUnavailable("no video track with sample tables")
+    keyframes = KeyframeIndex(video.timescale, video.dts[-1], video.keyframes())
+    return MediaIndex(mvhd=mvhd, video=video, audio=audio, keyframes=keyframes)
+
+
+# Сборка fMP4
+
+
+def _box(box_type: bytes, *payload: bytes) -> bytes:
+    data = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(data), box_type) + data
+
+
+def _full_box(box_type: bytes, version: int, flags: int, *payload: bytes) -> bytes:
+    return _box(box_type, struct.pack(">I", version << 24 | flags), *payload)
+
+
+def build_init_segment(index: MediaIndex) -> bytes:
+    """ftyp и moov без сэмплов: исходные описания дорожек и mvex."""
+    empty_table = struct.pack(">I", 0)
+    traks = []
+    for track in index.tracks:
+        stbl = _box(
+            b"stbl",
+            track.stsd,
+            _full_box(b"stts", 0, 0, empty_table),
+            _full_box(b"stsc", 0, 0, empty_table),
+            _full_box(b"stsz", 0, 0, struct.pack(">II", 0, 0)),
+            _full_box(b"stco", 0, 0, empty_table),
+        )
+        minf = _box(b"minf", track.media_header, track.dinf, stbl)
+        traks.append(
+            _box(b"trak", track.tkhd, _box(b"mdia", track.mdhd, track.hdlr, minf))
+        )
+    mvex = _box(
+        b"mvex",
+        *(
+            _full_box(b"trex", 0, 0, struct.pack(">IIIII", track.track_id, 1, 0, 0, 0))
+            for track in index.tracks
+        ),
+    )
+    ftyp = _box(b"ftyp", b"iso6", struct.pack(">I", 0), b"iso6mp41isom")
+    return ftyp + _box(b"moov", index.mvhd, *traks, mvex)
+
+
+def _track_window(track: Track, start: int, end: int, timescale: int) -> range:
+    """Сэмплы дорожки с DTS в [start, end) (время в единицах timescale)."""
+    count = track.sample_count
+    first = bisect_left(track.dts, start * track.timescale // timescale, 0, count)
+    last = bisect_left(track.dts, end * track.timescale // timescale, 0, count)
+    return range(first, last)
+
+
+def _traf(track: Track, samples: range, data_offset: int) -> bytes:
+    keyframes: set[int] | None = None
+    if track.sync is not None:
+        lo = bisect_left(track.sync, samples.start)
+        hi = bisect_left(track.sync, samples.stop)
+        keyframes = set(track.sync[lo:hi])
+    values: list[int] = []
+    for sample in samples:
+        is_sync = keyframes is None or sample in keyframes
+        values += (
+            track.dts[sample + 1] - track.dts[sample],
+            track.sizes[sample],
+            SYNC_SAMPLE_FLAGS if is_sync else NON_SYNC_SAMPLE_FLAGS,
+            track.cts_offsets[sample] if track.cts_offsets else 0,
+        )
+    trun = _full_box(
+        b"trun",
+        1,
+        TRUN_FLAGS,
+        struct.pack(">Ii", len(samples), data_offset),
+        struct.pack(">" + "IIIi" * len(samples), *values),
+    )
+    return _box(
+        b"traf",
+        _full_box(
+            b"tfhd", 0, TFHD_DEFAULT_BASE_IS_MOOF, struct.pack(">I", track.track_id)
+        ),
+        _full_box(b"tfdt", 1, 0, struct.pack(">Q", track.dts[samples.start])),
+        trun,
+    )
+
+
+def _read_spans(path: Path, spans: list[tuple[int, int]]) -> bytes:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        parts = []
+        for offset, length in spans:
+            data = os.pread(fd, length, offset)
+            if len(data) < length:
+                raise HlsUnavailable("file is shorter than its sample tables")
+            parts.append(data)
+        return b"".join(parts)
+    finally:
+        os.close(fd)
+
+
+async def build_segment(index: MediaIndex, path: Path, number: int) -> bytes:
+    """
+    Фрагмент fMP4 (moof + mdat) сегмента number: сэмплы видео между
+    соседними границами и аудио за то же время, скопированные без изменений.
+
+    Raises:
+        IndexError: Если сегмента с таким номером нет.
+    """
+    segments = index.keyframes.segments()
+    first_sample, start, end = segments[number]
+    video = index.video
+    last_sample = (
+        segments[number + 1][0] if number + 1 < len(segments) else video.sample_count
+    )
+    windows = [(video, range(first_sample, last_sample))]
+    if index.audio is not None:
+        audio = index.audio
+        window = _track_window(audio, start, end, video.timescale)
+        if number + 1 == len(segments):
+            window = range(window.start, audio.sample_count)
+        windows.append((audio, window))
+    windows = [(track, samples) for track, samples in windows if samples]
+
+    # Смежные сэмплы (один чанк файла) читаются одним pread
+    spans: list[tuple[int, int]] = []
+    track_bytes = []
+    for track, samples in windows:
+        total = 0
+        for sample in samples:
+            offset, size = track.offsets[sample], track.sizes[sample]
+            total += size
+            if spans and spans[-1][0] + spans[-1][1] == offset:
+                spans[-1] = (spans[-1][0], spans[-1][1] + size)
+            else:
+                spans.append((offset, size))
+        track_bytes.append(total)
+
+    mfhd = _full_box(b"mfhd", 0, 0, struct.pack(">I", number + 1))
+    # Размер moof не зависит от значений смещений: считаем его с нулями
+    moof_size = len(_box(b"moof", mfhd, *(_traf(t, s, 0) for t, s in windows)))
+    data_offset = moof_size + 8
+    trafs = []
+    for (track, samples), size in zip(windows, track_bytes):
+        trafs.append(_traf(track, samples, data_offset))
+        data_offset += size
+    moof = _box(b"moof", mfhd, *trafs)
+
+    loop = asyncio.get_running_loop()
+    payload = await loop.run_in_executor(None, _read_spans, path, spans)
+    return moof + struct.pack(">I4s", 8 + len(payload), b"mdat") + payload
+
+
+def build_playlist(keyframes: KeyframeIndex) -> str:
+    """Медиаплейлист VOD: init-сегмент и сегменты по границам ключевых кадров."""
+    durations = [
+        (end - start) / keyframes.timescale for _, start, end in keyframes.segments()
+    ]
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{max(1, math.ceil(max(durations)))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        '#EXT-X-MAP:URI="init.mp4"',
+    ]
+    for number, duration in enumerate(durations):
+        lines += [f"#EXTINF:{duration:.6f},", f"{number}.m4s"]
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+class MediaIndexCache:
+    """
+    LRU-кэш разобранных индексов MP4: не больше HLS_INDEX_CACHE_SIZE файлов
+    и HLS_INDEX_CACHE_BYTES байт (по оценке MediaIndex.nbytes: таблицы
+    сэмплов многочасового файла занимают десятки мегабайт). Последний
+    разобранный индекс остаётся в кэше, даже если один больше бюджета,
+    иначе каждый его сегмент разбирал бы moov заново.
+
+    Ключ — ETag файла, поэтому изменённый файл разбирается заново.
+    Одновременные запросы одного файла ждут один разбор; вместе
+    с индексом хранится готовый init-сегмент.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[MediaIndex, bytes]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[MediaIndex]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def peek(self, key: str) -> MediaIndex | None:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    async def get(self, key: str, path: Path) -> tuple[MediaIndex, bytes]:
+        """
+        Raises:
+            HlsUnavailable: Если файл нельзя упаковать в HLS.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(
+                loop.run_in_executor(None, parse_media_index, path)
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        index = await asyncio.shield(future)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = (index, build_init_segment(index))
+            self._entries[key] = entry
+            self.bytes += self._entry_bytes(entry)
+            while len(self._entries) > 1 and (
+                len(self._entries) > max(cfg.HLS_INDEX_CACHE_SIZE, 1)
+                or self.bytes > cfg.HLS_INDEX_CACHE_BYTES
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= self._entry_bytes(evicted)
+                self.evictions += 1
+        return entry
+
+    @staticmethod
+    def _entry_bytes(entry: tuple[MediaIndex, bytes]) -> int:
+        index, init_segment = entry
+        return index.nbytes + len(init_segment)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            bytes=self.bytes,
+            evictions=self.evictions,
+        )
+
+
+media_index_cache = MediaIndexCache()
+
+
+async def get_keyframe_index(video_id: int, info: StreamInfo) -> KeyframeIndex:
+    """
+    Индекс ключевых кадров: из памяти, из БД или разбором файла
+    с сохранением в БД, чтобы плейлист не требовал разбора moov.
+
+    Raises:
+        HlsUnavailable: Если файл нельзя упаковать в HLS.
+    """
+    index = media_index_cache.peek(info.etag)
+    if index is not None:
+        return index.keyframes
+    stored = await crud.get_keyframe_index(video_id)
+    if stored is not None and stored.etag == info.etag:
+        return KeyframeIndex.unpack(stored.timescale, stored.duration, stored.keyframes)
+
+    index, _ = await media_index_cache.get(info.etag, info.path)
+    keyframes = index.keyframes
+    await crud.save_keyframe_index(
+        video_id,
+        etag=info.etag,
+        timescale=keyframes.timescale,
+        duration=keyframes.duration,
+        keyframes=keyframes.pack(),
+    )
+    logger.info(
+        f"Keyframe index for video {video_id}: "
+        f"{len(keyframes.keyframes)} keyframes, {len(keyframes.segments())} segments"
+    )
+    return keyframes
@@ -1,26 +1,44 @@
+import asyncio
+import base64
+import hashlib
+import ipaddress
+import json
 import logging
-import mimetypes
 import os
+import stat
 import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
+from urllib.parse import quote
 
-import aiofiles
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import (
     get_redoc_html,
     get_swagger_ui_html,
     get_swagger_ui_oauth2_redirect_html,
 )
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from tortoise import Tortoise
 from tortoise.contrib.fastapi import register_tortoise
 
-from app.backend import crud
+from app.backend import (
+    bandwidth,
+    catalog,
+    crud,
+    faststart,
+    fingerprint,
+    hls,
+    probe,
+    ranges,
+    scan_jobs,
+    streaming,
+    watcher,
+)
 from app.backend.auth import CurrentUserDep, create_access_token, verify_password
+from app.backend.block_cache import block_cache
 from app.backend.config import cfg
 from app.backend.database import (
     TORTOISE_ORM,
@@ -28,31 +46,59 @@ from app.backend.database import (
     ensure_database_exists,
 )
 from app.backend.schemas import (
+    CacheStats,
+    CatalogDelta,
+    CatalogSnapshot,
     LoginRequest,
-    PlaylistCreate,
     PlaylistInDB,
     PlaylistWithVideos,
+    ScanJobInDB,
+    ScanStatus,
+    SearchPage,
     SearchResult,
+    StreamStats,
+    Suggestion,
     TokenResponse,
-    VideoCreate,
     VideoInDB,
+    VideoSummary,
     VideoUpdate,
 )
+from app.backend.search_cache import normalize_query, search_cache
+from app.backend.stream_cache import StreamInfo, stream_cache
+from app.backend.streaming import FileRangeResponse
+from app.backend.suggest import get_suggestions, suggest_index
 
 logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler(sys.stdout)])
 logger = logging.getLogger(__name__)
 
 
+# Курсор следующей страницы списков (тело ответа остаётся массивом)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Прокси, которым разрешено передавать адрес клиента (TRUSTED_PROXIES)
+TRUSTED_PROXY_NETWORKS = [
+    ipaddress.ip_network(item.strip(), strict=False)
+    for item in cfg.TRUSTED_PROXIES.split(",")
+    if item.strip()
+]
+
+
+def videos_dir_relative(filepath: Path) -> Path | None:
+    """
+    Возвращает путь файла относительно VIDEOS_DIR (после разрешения ссылок)
+    или None, если файл лежит вне этой директории.
+    """
+    try:
+        return filepath.resolve().relative_to(cfg.videos_dir_absolute)
+    except (ValueError, OSError):
+        return None
+
+
 def is_path_allowed(filepath: Path) -> bool:
     """
     Проверяет, что путь находится внутри разрешённой директории (VIDEOS_DIR).
     Возвращает True, если путь разрешён, иначе False.
     """
-    try:
-        resolved = filepath.resolve()
-        return resolved.is_relative_to(cfg.videos_dir_absolute)
-    except (ValueError, OSError):
-        return False
+    return videos_dir_relative(filepath) is not None
 
 
 @asynccontextmanager
@@ -61,7 +107,8 @@ async def lifespan(app: FastAPI):
     Контекстный менеджер жизненного цикла приложения FastAPI.
 
     Выполняет инициализацию базы данных, применяет миграции и создаёт суперпользователя
-    при запуске приложения. При завершении выводит сообщение о завершении работы.
+    при запуске приложения. Если включён WATCH_VIDEOS, запускает наблюдение за папкой
+    с видео. При завершении выводит сообщение о завершении работы.
 
     Args:
         app (FastAPI): Экземпляр приложения FastAPI.
@@ -72,8 +119,15 @@ async def lifespan(app: FastAPI):
     await ensure_database_exists()
     await apply_migrations()
     await crud.ensure_superuser_exists(cfg.username, cfg.password)
+    if cfg.WATCH_VIDEOS:
+        watcher.start()
     yield
     print("[LIFESPAN] Shutting down")
+    await watcher.stop()
+    await scan_jobs.shutdown()
+    probe.shutdown()
+    fingerprint.shutdown()
+    streaming.shutdown()
     await Tortoise.close_connections()
 
 
@@ -86,6 +140,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Register Tortoise ORM with FastAPI (adds middleware and ensures context)
@@ -166,146 +221,366 @@ def health_check():
     return {"status": "ok"}
 
 
-@app.post("/videos/scan-and-load/", response_model=list[VideoInDB])
+@app.post("/videos/scan-and-load/", response_model=ScanJobInDB, status_code=202)
 async def scan_and_load_videos():
     """
-    Сканирует папки с видео и транскрипциями и загружает их метаданные в БД.
-    Обновляет существующие записи, если транскрипция изменилась.
-    """
-    loaded_videos: list[VideoInDB] = []
-
-    # Сначала создаем плейлисты из папок
-    await create_playlists_from_folders()
-
-    video_files = [
-        f
-        for f in Path(cfg.VIDEOS_DIR).rglob("*")
-        if f.is_file() and f.suffix in (".mp4", ".mkv", ".webm")
-    ]
-
-    for video_path in video_files:
-        # Используем полный путь к видео как filepath в БД
-        filepath = str(video_path)
-
-        # Для транскрипции ищем файл с тем же именем в той же папке
-        transcription_path = video_path.with_suffix(".md")
-        title = transcription_path.stem
-
-        transcription_content = None
-        if transcription_path.is_file():
-            async with aiofiles.open(transcription_path, "r", encoding="utf-8") as f:
-                transcription_content = await f.read()
-
-        db_video = await crud.get_video_by_filepath(filepath=filepath)
-
-        # Определяем плейлист по папке видео
-        folder_path = str(video_path.parent)
-        db_playlist = await crud.get_playlist_by_folder(folder_path=folder_path)
-        playlist_id = db_playlist.id if db_playlist else None
-
-        if db_video:
-            if (
-                db_video.transcription != transcription_content
-                or db_video.playlist_id != playlist_id
-            ):
-                video_update = VideoUpdate(
-                    title=title,
-                    filepath=filepath,
-                    transcription=transcription_content,
-                    playlist_id=playlist_id,
-                )
-                db_video = await crud.update_video(
-                    db_video.id,  # type: ignore
-                    video_update,
-                )
-            if db_video:
-                loaded_videos.append(VideoInDB.model_validate(db_video))
-        else:
-            video_create = VideoCreate(
-                title=title,
-                filepath=filepath,
-                transcription=transcription_content,
-                playlist_id=playlist_id,
-            )
-            db_video = await crud.create_video(video_create)
-            if db_video:
-                loaded_videos.append(VideoInDB.model_validate(db_video))
+    Запускает фоновое сканирование папок с видео и транскрипциями.
 
-    return loaded_videos
+    Перечитываются только новые и изменившиеся файлы (по размеру, mtime и inode),
+    записи о файлах, которых больше нет на диске, удаляются. Одновременно
+    выполняется не больше одного сканирования на все процессы приложения.
 
+    Raises:
+        HTTPException: 409, если сканирование уже выполняется.
 
-async def create_playlists_from_folders():
+    Returns:
+        ScanJobInDB: Запущенное задание; прогресс — в /scan-jobs/{job_id}/events.
     """
-    Создает плейлисты на основе папок с видео.
+    try:
+        job = await scan_jobs.start_scan_job()
+    except scan_jobs.ScanAlreadyRunning as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Scan is already running", "job_id": e.job_id},
+        )
+    return ScanJobInDB.model_validate(job)
+
+
+@app.get("/scan-jobs/{job_id}", response_model=ScanJobInDB)
+async def read_scan_job(job_id: int):
+    """
+    Возвращает состояние задания сканирования.
+
+    Raises:
+        HTTPException: 404, если задание не найдено.
     """
-    video_folders: set[str] = set()
-    video_files = [
-        f
-        for f in Path(cfg.VIDEOS_DIR).rglob("*")
-        if f.is_file() and f.suffix in (".mp4", ".mkv", ".webm")
-    ]
+    job = await crud.get_scan_job(job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return ScanJobInDB.model_validate(job)
 
-    # Собираем все уникальные папки с видео
-    for video_path in video_files:
-        video_folders.add(str(video_path.parent))
 
-    # Создаем плейлисты для каждой папки
-    for folder_path in video_folders:
-        db_playlist = await crud.get_playlist_by_folder(folder_path=folder_path)
-        if not db_playlist:
-            playlist_name = Path(folder_path).name
-            playlist_create = PlaylistCreate(
-                name=playlist_name,
-                folder_path=folder_path,
-                description=f"Плейлист для папки {playlist_name}",
-            )
-            await crud.create_playlist(playlist_create)
+@app.get("/scan-jobs/{job_id}/events")
+async def scan_job_events(job_id: int, request: Request):
+    """
+    Поток Server-Sent Events с прогрессом задания сканирования.
+
+    Раз в секунду отправляет событие `progress` с ScanJobInDB (просмотрено файлов,
+    файлов в секунду, записей в БД, оценка оставшегося времени). После
+    завершения задания отправляет событие `end` и закрывает поток.
+
+    Raises:
+        HTTPException: 404, если задание не найдено.
+    """
+    if await crud.get_scan_job(job_id=job_id) is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+
+    async def event_stream():
+        while not await request.is_disconnected():
+            job = await crud.get_scan_job(job_id=job_id)
+            if job is None:
+                return
+            payload = ScanJobInDB.model_validate(job).model_dump_json()
+            if job.status != ScanStatus.RUNNING:
+                yield f"event: end\ndata: {payload}\n\n"
+                return
+            yield f"event: progress\ndata: {payload}\n\n"
+            await asyncio.sleep(scan_jobs.PROGRESS_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # nginx не должен буферизовать поток событий
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/scan-jobs/{job_id}/cancel", response_model=ScanJobInDB)
+async def cancel_scan_job(job_id: int):
+    """
+    Запрашивает отмену задания сканирования.
+
+    Задание останавливается после текущей пачки записей (в пределах секунды),
+    уже записанные изменения сохраняются, записи о пропавших файлах не удаляются.
+
+    Raises:
+        HTTPException: 404, если задание не найдено.
+    """
+    job = await crud.request_scan_job_cancel(job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return ScanJobInDB.model_validate(job)
+
+
+def _catalog_cache_headers(version: int, variant: str = "") -> dict[str, str]:
+    """
+    ETag и Cache-Control ответа каталога поколения version; variant отличает
+    в ETag разные представления одного поколения.
+    """
+    return {
+        "ETag": f'"catalog-{version}{variant}"',
+        "Cache-Control": (
+            f"public, max-age={cfg.CATALOG_CACHE_MAX_AGE}"
+            if cfg.CATALOG_CACHE_MAX_AGE > 0
+            else "no-cache"
+        ),
+    }
+
+
+async def check_catalog_etag(request: Request, response: Response) -> None:
+    """
+    Условный GET для JSON каталога. ETag — поколение каталога (catalog_state,
+    растёт при любой записи в videos и playlists, в том числе сканером): пока
+    оно не изменилось, ответы списков и карточек те же. При совпадении
+    If-None-Match отвечает 304 до обращения к таблицам каталога.
+
+    Raises:
+        HTTPException: 304, если у клиента актуальная версия.
+    """
+    headers = _catalog_cache_headers(await crud.get_catalog_version())
+    if ranges.not_modified(request.headers, headers["ETag"]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+CatalogCacheDep = Depends(check_catalog_etag)
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    """
+    Разбирает проекцию fields=id,title,... для списков видео.
+
+    Raises:
+        HTTPException: 400, если запрошено поле, которого нет в VideoSummary.
+    """
+    if fields is None:
+        return tuple(crud.VIDEO_SUMMARY_COLUMNS)
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in crud.VIDEO_SUMMARY_COLUMNS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields",
+        )
+    return names
+
+
+def _projected(rows: Any, fields: str | None, response: Response) -> Any:
+    """
+    С проекцией строки отдаются как есть (схема ответа требует всех полей)
+    с заголовками, выставленными в response.
+    """
+    return rows if fields is None else JSONResponse(rows, headers=response.headers)
+
+
+def _list_page(
+    rows: Any, fields: str | None, response: Response, after: tuple | None
+) -> Any:
+    """
+    Страница списка: курсор следующей страницы (ключ сортировки её последней
+    строки) передаётся в заголовке X-Next-Cursor, на последней странице его нет.
+    """
+    if after:
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(*after)
+    return _projected(rows, fields, response)
 
 
-@app.get("/videos/", response_model=list[VideoInDB])
-async def read_videos(skip: int = 0, limit: int = 100):
+@app.get("/videos/", response_model=list[VideoSummary], dependencies=[CatalogCacheDep])
+async def read_videos(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    fields: str | None = None,
+    cursor: str | None = None,
+):
     """
     Возвращает список видео с пагинацией.
 
+    Транскрипция в список не входит (см. /videos/{id}/transcript): из БД
+    читаются только колонки сводки, а с fields — только перечисленные.
+    Следующая страница запрашивается с cursor из заголовка X-Next-Cursor:
+    страница с курсором читается диапазоном первичного ключа, без OFFSET.
+
     Args:
-        skip (int): Количество видео для пропуска (по умолчанию 0).
+        skip (int): Количество видео для пропуска без курсора (по умолчанию 0;
+            для старых клиентов, на глубоких страницах медленно).
         limit (int): Максимальное количество видео для возврата (по умолчанию 100).
+        fields (str | None): Поля VideoSummary через запятую (по умолчанию все).
+        cursor (str | None): Курсор из X-Next-Cursor предыдущей страницы.
+
+    Raises:
+        HTTPException: 400, если в fields есть неизвестное поле или курсор
+            повреждён.
 
     Returns:
-        list[VideoInDB]: Список объектов видео.
+        list[VideoSummary]: Список сводок видео.
     """
-    videos = await crud.get_videos(skip=skip, limit=limit)
-    return [VideoInDB.model_validate(video) for video in videos]
+    after = _parse_cursor(cursor, int)
+    videos, next_after = await crud.get_video_summaries(
+        skip=skip,
+        limit=limit,
+        fields=_parse_fields(fields),
+        after=after[0] if after else None,
+    )
+    return _list_page(
+        videos, fields, response, (next_after,) if next_after is not None else None
+    )
 
 
-@app.get("/videos/{video_id}", response_model=VideoInDB)
-async def read_video(video_id: int):
+@app.get(
+    "/videos/{video_id}", response_model=VideoSummary, dependencies=[CatalogCacheDep]
+)
+async def read_video(video_id: int, response: Response, fields: str | None = None):
     """
     Возвращает видео по его идентификатору.
 
     Args:
         video_id (int): Идентификатор видео.
+        fields (str | None): Поля VideoSummary через запятую (по умолчанию все).
 
     Raises:
+        HTTPException: 400, если в fields есть неизвестное поле.
         HTTPException: 404, если видео не найдено.
 
     Returns:
-        VideoInDB: Объект видео.
+        VideoSummary: Сводка видео без транскрипции.
     """
-    db_video = await crud.get_video(video_id=video_id)
+    db_video = await crud.get_video_summary(video_id, fields=_parse_fields(fields))
     if db_video is None:
         raise HTTPException(status_code=404, detail="Video not found")
-    return VideoInDB.model_validate(db_video)
+    return _projected(db_video, fields, response)
+
+
+@app.get("/videos/{video_id}/transcript")
+async def read_transcript(video_id: int, request: Request):
+    """
+    Возвращает текст транскрипции видео (Markdown).
+
+    Ответ кэшируется: ETag — хеш текста, клиент перепроверяет его
+    с If-None-Match и при совпадении получает 304 без тела.
+
+    Args:
+        video_id (int): Идентификатор видео.
+
+    Raises:
+        HTTPException: 404, если видео или транскрипция не найдены.
+
+    Returns:
+        Response: Текст транскрипции или 304.
+    """
+    row = await crud.get_video_transcription(video_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if row["transcription"] is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    body = row["transcription"].encode("utf-8")
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if ranges.not_modified(request.headers, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=body, media_type="text/markdown; charset=utf-8", headers=headers
+    )
+
+
+def _from_trusted_proxy(request: Request) -> bool:
+    """Пришёл ли запрос от прокси из TRUSTED_PROXIES (nginx)."""
+    if request.client is None:
+        return False
+    try:
+        address = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXY_NETWORKS)
+
+
+def _client_address(request: Request) -> str:
+    """
+    Адрес клиента: за доверенным прокси берётся из X-Real-IP, иначе — адрес
+    соединения (заголовок от самого клиента не учитывается).
+    """
+    if _from_trusted_proxy(request) and (real_ip := request.headers.get("X-Real-IP")):
+        return real_ip
+    return request.client.host if request.client else "unknown"
+
+
+async def _get_stream_info(video_id: int) -> StreamInfo:
+    """
+    Метаданные файла для стриминга: из кэша или из БД и ФС.
+
+    Raises:
+        HTTPException: 404, если видео или файл не найдены.
+        HTTPException: 403, если доступ к файлу запрещён.
+    """
+    info = stream_cache.get(video_id)
+    if info is None:
+        db_video = await crud.get_video(video_id=video_id)
+        if db_video is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        video_path = Path(db_video.filepath)
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            raise HTTPException(
+                status_code=404, detail="Video file not found on server"
+            )
+        # Проверяем, что путь находится внутри разрешённой директории
+        info = StreamInfo.from_stat(video_path, st, videos_dir_relative(video_path))
+        stream_cache.put(video_id, info)
+    if not info.allowed:
+        raise HTTPException(status_code=403, detail="Access to this file is forbidden")
+    return info
+
+
+def _stream_rejected() -> HTTPException:
+    """Ответ 503 с Retry-After для потока сверх лимитов планировщика."""
+    return HTTPException(
+        status_code=503,
+        detail="Too many active streams",
+        headers={"Retry-After": str(cfg.STREAM_RETRY_AFTER)},
+    )
+
+
+def _open_stream_session(request: Request, video_id: int) -> bandwidth.StreamSession:
+    """
+    Регистрирует поток в планировщике полосы.
+
+    Raises:
+        HTTPException: 503, если превышен лимит одновременных потоков.
+    """
+    try:
+        return bandwidth.scheduler.open(_client_address(request), video_id)
+    except bandwidth.StreamRejected:
+        raise _stream_rejected()
 
 
 @app.get("/videos/{video_id}/stream")
 async def stream_video(video_id: int, request: Request):
     """
-    Потоковая передача видеофайла с поддержкой диапазонов (Range requests).
+    Потоковая передача видеофайла с поддержкой диапазонов (RFC 7233)
+    и условных запросов (RFC 7232).
+
+    Поддерживаются диапазоны "bytes=a-b", "bytes=a-", "bytes=-N" и списки
+    диапазонов (ответ multipart/byteranges), а также If-Range. Ответ несёт
+    сильный ETag (inode, размер, mtime) и Last-Modified; If-None-Match
+    и If-Modified-Since дают 304, If-Match и If-Unmodified-Since — 412.
+
+    При STREAM_OFFLOAD=true и запросе от прокси из TRUSTED_PROXIES (nginx)
+    бэкенд только проверяет доступ и лимиты потоков и отвечает
+    X-Accel-Redirect на внутренний location nginx, который и отдаёт файл.
+    Такой поток учитывается арендой на STREAM_OFFLOAD_LEASE секунд, а доля
+    полосы передаётся в X-Accel-Limit-Rate один раз на ответ: nginx не
+    замедляет уже идущие ответы при подключении новых клиентов.
+
+    При STREAM_FASTSTART=true MP4 с moov в конце отдаётся в виртуальной
+    раскладке faststart: moov с пересчитанными смещениями чанков перед mdat.
+    Файл на диске не меняется, диапазоны отображаются на него по таблице
+    кусков (см. faststart); ETag такого представления отличается от ETag файла.
 
-    Поддерживает HTTP Range заголовки для возобновляемой загрузки и стриминга.
-    Если запрос содержит заголовок Range, возвращает часть файла (код 206).
-    Иначе возвращает весь файл (код 200).
+    Потоки проходят через планировщик полосы (см. bandwidth): лимиты числа
+    потоков и скорости, общая скорость делится поровну между клиентами.
 
     Args:
         video_id (int): Идентификатор видео в базе данных.
@@ -314,121 +589,329 @@ async def stream_video(video_id: int, request: Request):
     Raises:
         HTTPException: 404, если видео или файл не найдены.
         HTTPException: 403, если доступ к файлу запрещён.
-        HTTPException: 416, если диапазон некорректен.
+        HTTPException: 416, если ни один диапазон не попадает в файл.
+        HTTPException: 503, если превышен лимит одновременных потоков.
 
     Returns:
-        StreamingResponse: Потоковый ответ с видеофайлом.
+        FileRangeResponse: Файл (200) или его диапазоны (206), отдаётся через
+            sendfile, если сервер это поддерживает; Response без тела для
+            304, 412 и X-Accel-Redirect.
     """
-    db_video = await crud.get_video(video_id=video_id)
-    if db_video is None:
-        raise HTTPException(status_code=404, detail="Video not found")
+    info = await _get_stream_info(video_id)
+    if cfg.STREAM_OFFLOAD and _from_trusted_proxy(request):
+        # Байты, диапазоны и условные запросы обслуживает nginx
+        offload_headers = {
+            "X-Accel-Redirect": cfg.STREAM_OFFLOAD_PREFIX
+            + quote(info.relative_path.as_posix())
+        }
+        try:
+            client_rate = bandwidth.scheduler.open_offloaded(
+                _client_address(request), video_id
+            )
+        except bandwidth.StreamRejected:
+            raise _stream_rejected()
+        if client_rate:
+            offload_headers["X-Accel-Limit-Rate"] = str(int(client_rate))
+        return Response(media_type=info.mime_type, headers=offload_headers)
+
+    etag, layout = info.etag, None
+    if cfg.STREAM_FASTSTART and info.mime_type == "video/mp4":
+        layout = await faststart.layout_cache.get(info.etag, info.path, info.size)
+        if layout is not None:
+            etag = faststart.faststart_etag(info.etag)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": info.last_modified,
+    }
+    status_code = ranges.evaluate_preconditions(request.headers, etag, info.mtime)
+    if status_code is not None:
+        return Response(status_code=status_code, headers=headers)
+
+    range_header = request.headers.get("Range")
+    byte_ranges = None
+    # При несовпадающем If-Range клиент получает новую версию файла целиком
+    if range_header and ranges.if_range_matches(request.headers, etag, info.mtime):
+        try:
+            byte_ranges = ranges.parse_range(range_header, info.size)
+        except ranges.RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested Range Not Satisfiable",
+                headers={"Content-Range": f"bytes */{info.size}"},
+            )
 
-    video_path = Path(db_video.filepath)
-    if not video_path.is_file():
-        raise HTTPException(status_code=404, detail="Video file not found on server")
+    session = _open_stream_session(request, video_id)
+    return FileRangeResponse(
+        info.path,
+        info.size,
+        ranges=byte_ranges,
+        status_code=200 if byte_ranges is None else 206,
+        media_type=info.mime_type,
+        headers=headers,
+        cache_key=info.etag,
+        session=session,
+        layout=layout,
+    )
 
-    # Проверяем, что путь находится внутри разрешённой директории
-    if not is_path_allowed(video_path):
-        raise HTTPException(status_code=403, detail="Access to this file is forbidden")
 
-    # Получаем размер файла
-    file_size = os.stat(video_path).st_size
-    mime_type, _ = mimetypes.guess_type(video_path)
-    if not mime_type or not mime_type.startswith("video/"):
-        mime_type = "application/octet-stream"  # Fallback
+async def _get_hls_index(info: StreamInfo) -> tuple[hls.MediaIndex, bytes]:
+    """
+    Разобранный индекс MP4 и init-сегмент из кэша.
 
-    range_header = request.headers.get("Range")
+    Raises:
+        HTTPException: 415, если файл нельзя упаковать в HLS.
+    """
+    try:
+        return await hls.media_index_cache.get(info.etag, info.path)
+    except hls.HlsUnavailable as e:
+        raise HTTPException(
+            status_code=415, detail=f"HLS is not available for this video: {e}"
+        )
 
-    if range_header:
-        # Обрабатываем Range-запрос
-        try:
-            # Парсим заголовок Range, например "bytes=0-1023"
-            byte1, byte2 = 0, file_size - 1
-            range_parts = range_header.replace("bytes=", "").split("-")
-
-            byte1 = int(range_parts[0])
-            if len(range_parts) > 1 and range_parts[1]:
-                byte2 = int(range_parts[1])
-
-            # Убеждаемся, что диапазон корректен
-            if byte1 >= file_size or byte2 >= file_size or byte1 > byte2:
-                raise HTTPException(
-                    status_code=416, detail="Requested Range Not Satisfiable"
-                )
-
-        except ValueError:
-            raise HTTPException(status_code=416, detail="Invalid Range header")
-
-        start, end = byte1, byte2
-        length = end - start + 1
-
-        # Открываем файл и переходим к нужной позиции
-        async def stream_in_chunks():
-            async with aiofiles.open(video_path, mode="rb") as f:
-                await f.seek(start)
-                bytes_read = 0
-                while bytes_read < length:
-                    # Читаем чанками, например по 64KB
-                    chunk_size = min(length - bytes_read, 65536)
-                    chunk = await f.read(chunk_size)
-                    if not chunk:
-                        break  # Конец файла
-                    yield chunk
-                    bytes_read += len(chunk)
-
-        # Формируем ответ для частичного контента
-        response = StreamingResponse(
-            stream_in_chunks(),
-            media_type=mime_type,
-            status_code=206,  # 206 Partial Content
+
+@app.get("/videos/{video_id}/hls/index.m3u8")
+async def read_hls_playlist(video_id: int, request: Request):
+    """
+    Медиаплейлист HLS (VOD) для MP4-видео без перекодирования.
+
+    Сегменты режутся по ключевым кадрам (около HLS_SEGMENT_SECONDS);
+    индекс ключевых кадров строится по таблицам сэмплов MP4 один раз
+    и хранится в БД, пока файл не изменится.
+
+    Args:
+        video_id (int): Идентификатор видео в базе данных.
+        request (Request): Объект запроса FastAPI.
+
+    Raises:
+        HTTPException: 404, если видео или файл не найдены.
+        HTTPException: 403, если доступ к файлу запрещён.
+        HTTPException: 415, если файл не MP4 или в нём нет видеодорожки.
+
+    Returns:
+        Response: Плейлист application/vnd.apple.mpegurl.
+    """
+    info = await _get_stream_info(video_id)
+    headers = {"ETag": info.etag, "Last-Modified": info.last_modified}
+    status_code = ranges.evaluate_preconditions(request.headers, info.etag, info.mtime)
+    if status_code is not None:
+        return Response(status_code=status_code, headers=headers)
+    try:
+        keyframes = await hls.get_keyframe_index(video_id, info)
+    except hls.HlsUnavailable as e:
+        raise HTTPException(
+            status_code=415, detail=f"HLS is not available for this video: {e}"
         )
-        response.headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-        response.headers["Content-Length"] = str(
-            length
-        )  # Длина только отправляемой части
-        response.headers["Accept-Ranges"] = "bytes"  # Всегда отправляем этот заголовок
-        return response
+    return Response(
+        content=hls.build_playlist(keyframes),
+        media_type=hls.PLAYLIST_MEDIA_TYPE,
+        headers=headers,
+    )
 
-    else:
-        # Если Range-заголовка нет, отправляем весь файл
-        def iterfile():
-            with open(video_path, mode="rb") as file_like:
-                yield from file_like
 
-        response = StreamingResponse(iterfile(), media_type=mime_type)
-        response.headers["Content-Length"] = str(file_size)  # Общая длина файла
-        response.headers["Accept-Ranges"] = "bytes"  # Всегда отправляем этот заголовок
-        return response
+@app.get("/videos/{video_id}/hls/init.mp4")
+async def read_hls_init_segment(video_id: int, request: Request):
+    """
+    Init-сегмент fMP4: описания дорожек исходного файла без сэмплов.
+
+    Args:
+        video_id (int): Идентификатор видео в базе данных.
+        request (Request): Объект запроса FastAPI.
+
+    Raises:
+        HTTPException: 404, если видео или файл не найдены.
+        HTTPException: 403, если доступ к файлу запрещён.
+        HTTPException: 415, если файл нельзя упаковать в HLS.
+
+    Returns:
+        Response: Init-сегмент video/mp4.
+    """
+    info = await _get_stream_info(video_id)
+    headers = {"ETag": info.etag, "Last-Modified": info.last_modified}
+    status_code = ranges.evaluate_preconditions(request.headers, info.etag, info.mtime)
+    if status_code is not None:
+        return Response(status_code=status_code, headers=headers)
+    _, init_segment = await _get_hls_index(info)
+    return Response(
+        content=init_segment, media_type=hls.SEGMENT_MEDIA_TYPE, headers=headers
+    )
+
+
+@app.get("/videos/{video_id}/hls/{segment:int}.m4s")
+async def read_hls_segment(video_id: int, segment: int, request: Request):
+    """
+    Медиасегмент fMP4 (moof + mdat): сэмплы исходного файла без изменений.
+
+    Сегмент собирается из кэшированного индекса: чтение его байтов
+    и небольшой заголовок moof. Отдача учитывается планировщиком полосы
+    так же, как /stream.
+
+    Args:
+        video_id (int): Идентификатор видео в базе данных.
+        segment (int): Номер сегмента в плейлисте (с нуля).
+        request (Request): Объект запроса FastAPI.
+
+    Raises:
+        HTTPException: 404, если видео, файл или сегмент не найдены.
+        HTTPException: 403, если доступ к файлу запрещён.
+        HTTPException: 415, если файл нельзя упаковать в HLS.
+        HTTPException: 503, если превышен лимит одновременных потоков.
+
+    Returns:
+        Response: Сегмент video/mp4.
+    """
+    info = await _get_stream_info(video_id)
+    headers = {"ETag": info.etag, "Last-Modified": info.last_modified}
+    status_code = ranges.evaluate_preconditions(request.headers, info.etag, info.mtime)
+    if status_code is not None:
+        return Response(status_code=status_code, headers=headers)
+    index, _ = await _get_hls_index(info)
+    if not 0 <= segment < len(index.keyframes.segments()):
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    session = _open_stream_session(request, video_id)
+    try:
+        try:
+            content = await hls.build_segment(index, info.path, segment)
+        except (hls.HlsUnavailable, OSError) as e:
+            logger.error(f"Cannot build HLS segment {segment} of video {video_id}: {e}")
+            raise HTTPException(status_code=500, detail="Cannot read video file")
+        await session.consume(len(content))
+    finally:
+        session.close()
+    return Response(content=content, media_type=hls.SEGMENT_MEDIA_TYPE, headers=headers)
+
+
+def _encode_cursor(*values: Any) -> str:
+    """Непрозрачный курсор страницы из значений ключа сортировки последней строки."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> list[Any]:
+    """
+    Raises:
+        HTTPException: 400, если курсор повреждён.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, UnicodeError):
+        values = None
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
 
+def _parse_cursor(cursor: str | None, *types: type) -> tuple | None:
+    """
+    Значения курсора, приведённые к types (None без курсора).
 
-@app.get("/search/", response_model=list[SearchResult])
-async def search_videos(query: str):
+    Raises:
+        HTTPException: 400, если курсор повреждён.
     """
-    Поиск видео по тексту транскрипции.
+    if cursor is None:
+        return None
+    values = _decode_cursor(cursor)
+    try:
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(cast(value) for cast, value in zip(types, values))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/search/", response_model=SearchPage)
+async def search_videos(
+    query: str,
+    limit: int = Query(cfg.SEARCH_PAGE_SIZE, ge=1, le=cfg.SEARCH_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    """
+    Поиск видео по тексту транскрипции, лучшие совпадения первыми.
+
+    Совпадение в субтитрах .vtt возвращается отдельным результатом
+    с началом реплики start_seconds, чтобы плеер открылся на этом месте.
+    Возвращает страницу из limit результатов; сниппеты строятся только для неё.
+    Следующая страница запрашивается с cursor из next_cursor. Страницы
+    кэшируются по нормализованному запросу до изменения каталога (см.
+    search_cache).
 
     Args:
         query (str): Поисковый запрос (не может быть пустым).
+        limit (int): Размер страницы (до SEARCH_MAX_PAGE_SIZE).
+        cursor (str | None): Курсор из next_cursor предыдущей страницы.
 
     Raises:
-        HTTPException: 400, если запрос пустой.
+        HTTPException: 400, если запрос пустой или курсор повреждён.
         HTTPException: 500, если произошла внутренняя ошибка при поиске.
 
     Returns:
-        list[SearchResult]: Список результатов поиска с информацией о видео.
+        SearchPage: Результаты страницы, общее число совпадений и курсор.
     """
+    query = normalize_query(query)
     if not query:
         raise HTTPException(status_code=400, detail="Search query cannot be empty")
 
-    logger.info(f"Search request received: query='{query}'")
+    after = _parse_cursor(cursor, float, int, int)
+
+    logger.info(f"Search request received: query='{query}', limit={limit}")
+    key = (query, limit, cursor)
     try:
-        results: list[dict[str, Any]] = await crud.search_videos_by_transcription(query)
-        logger.info(f"Search returned {len(results)} results")
-        return [SearchResult(**result) for result in results]
+        version = await crud.get_catalog_version()
+        page = search_cache.get(version, key)
+        if page is not None:
+            return page
+        results, total = await crud.search_videos_by_transcription(query, limit, after)
     except Exception as e:
         logger.exception(f"Search failed for query '{query}': {e}")
         raise HTTPException(
             status_code=500, detail="Internal server error during search"
         )
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = _encode_cursor(last["rank"], last["id"], last["cue_id"])
+    logger.info(f"Search returned {len(results)} of {total} results")
+    page = SearchPage(
+        results=[SearchResult(**result) for result in results],
+        total=total,
+        next_cursor=next_cursor,
+    )
+    search_cache.put(version, key, page)
+    return page
+
+
+@app.get("/suggest/", response_model=list[Suggestion])
+async def suggest(
+    query: str,
+    limit: int = Query(cfg.SUGGEST_LIMIT, ge=1, le=cfg.SUGGEST_MAX_LIMIT),
+):
+    """
+    Подсказки к строке поиска: видео и плейлисты, слово названия которых
+    начинается с query.
+
+    Ответ строится по префиксному индексу в памяти процесса без обращения
+    к БД; индекс догоняет изменения каталога в фоне. Если по префиксу
+    ничего не нашлось, ищутся похожие названия с опечатками (pg_trgm).
+
+    Args:
+        query (str): Начало названия, набранное пользователем.
+        limit (int): Сколько подсказок вернуть (до SUGGEST_MAX_LIMIT).
+
+    Raises:
+        HTTPException: 500, если индекс или нечёткий поиск недоступны.
+
+    Returns:
+        list[Suggestion]: Подсказки, совпадения с началом названия первыми.
+    """
+    try:
+        return await get_suggestions(query, limit)
+    except Exception:
+        logger.exception(f"Suggest failed for query '{query}'")
+        raise HTTPException(
+            status_code=500, detail="Internal server error during suggest"
+        )
 
 
 @app.put("/videos/{video_id}")
@@ -501,46 +984,170 @@ async def clear_database():
 # Playlist endpoints
 
 
-@app.get("/playlists/", response_model=list[PlaylistInDB])
-async def read_playlists(skip: int = 0, limit: int = 100):
+@app.get(
+    "/playlists/", response_model=list[PlaylistInDB], dependencies=[CatalogCacheDep]
+)
+async def read_playlists(
+    response: Response, skip: int = 0, limit: int = 100, cursor: str | None = None
+):
     """
-    Возвращает список плейлистов с пагинацией.
+    Возвращает список плейлистов в естественном порядке названий.
+
+    Порядок сквозной для всех страниц; следующая страница запрашивается
+    с cursor из заголовка X-Next-Cursor и читается диапазоном индекса.
 
     Args:
-        skip (int): Количество плейлистов для пропуска (по умолчанию 0).
+        skip (int): Количество плейлистов для пропуска без курсора (по
+            умолчанию 0; для старых клиентов).
         limit (int): Максимальное количество плейлистов для возврата (по умолчанию 100).
+        cursor (str | None): Курсор из X-Next-Cursor предыдущей страницы.
+
+    Raises:
+        HTTPException: 400, если курсор повреждён.
 
     Returns:
         list[PlaylistInDB]: Список объектов плейлистов.
     """
-    return await crud.get_playlists(skip=skip, limit=limit)
+    playlists, next_after = await crud.get_playlists(
+        skip=skip, limit=limit, after=_parse_cursor(cursor, str, int)
+    )
+    return _list_page(playlists, None, response, next_after)
 
 
-@app.get("/playlists/{playlist_id}", response_model=PlaylistWithVideos)
-async def read_playlist(playlist_id: int):
+@app.get(
+    "/playlists/{playlist_id}",
+    response_model=PlaylistWithVideos,
+    dependencies=[CatalogCacheDep],
+)
+async def read_playlist(
+    playlist_id: int, response: Response, fields: str | None = None
+):
     """
     Возвращает плейлист по его идентификатору вместе с видео.
 
     Args:
         playlist_id (int): Идентификатор плейлиста.
+        fields (str | None): Поля VideoSummary для видео плейлиста через запятую
+            (по умолчанию все).
 
     Raises:
+        HTTPException: 400, если в fields есть неизвестное поле.
         HTTPException: 404, если плейлист не найден.
 
     Returns:
-        PlaylistWithVideos: Объект плейлиста с вложенным списком видео.
+        PlaylistWithVideos: Объект плейлиста с вложенным списком сводок видео.
     """
+    columns = _parse_fields(fields)
     db_playlist = await crud.get_playlist(playlist_id=playlist_id)
     if db_playlist is None:
         raise HTTPException(status_code=404, detail="Playlist not found")
 
-    # Получаем видео для плейлиста
-    videos = await crud.get_videos_by_playlist(playlist_id=playlist_id)
-    playlist_with_videos = PlaylistWithVideos(
-        **PlaylistInDB.model_validate(db_playlist).model_dump(),
-        videos=[VideoInDB.model_validate(video) for video in videos],
+    # Получаем сводки видео плейлиста (без транскрипций)
+    videos = await crud.get_playlist_video_summaries(
+        playlist_id=playlist_id, fields=columns
     )
-    return playlist_with_videos
+    playlist = PlaylistInDB.model_validate(db_playlist)
+    if fields is not None:
+        return JSONResponse(
+            {**playlist.model_dump(mode="json"), "videos": videos},
+            headers=response.headers,
+        )
+    return PlaylistWithVideos(
+        **playlist.model_dump(),
+        videos=[VideoSummary.model_validate(video) for video in videos],
+    )
+
+
+# Catalog sync endpoints
+
+
+@app.get("/catalog/snapshot", response_model=CatalogSnapshot)
+async def read_catalog_snapshot(request: Request, fields: str | None = None):
+    """
+    Возвращает весь каталог одним ответом: поколение, сводки всех видео
+    и все плейлисты.
+
+    JSON без пробелов, при Accept-Encoding: gzip — сжатый; тело собирается
+    один раз на поколение каталога и раздаётся из памяти процесса. ETag —
+    поколение снимка, набор полей и сжатие (у gzip и несжатого тела, у разных
+    fields теги разные), при совпадении If-None-Match ответ 304 без тела.
+    Дальше клиент догоняет каталог через /catalog/changes?since=version.
+
+    Args:
+        fields (str | None): Поля VideoSummary через запятую (по умолчанию все;
+            id передаётся всегда).
+
+    Raises:
+        HTTPException: 400, если в fields есть неизвестное поле.
+
+    Returns:
+        Response: Снимок каталога (CatalogSnapshot) или 304.
+    """
+    columns = _parse_fields(fields)
+    compress = catalog.accepts_gzip(request.headers)
+    variant = catalog.variant_tag(columns, compress)
+    version = await crud.get_catalog_version()
+    headers = {**_catalog_cache_headers(version, variant), "Vary": "Accept-Encoding"}
+    if ranges.not_modified(request.headers, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    version, body = await catalog.snapshot_cache.get(version, columns, compress)
+    headers.update(_catalog_cache_headers(version, variant))
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get(
+    "/catalog/changes", response_model=CatalogDelta, dependencies=[CatalogCacheDep]
+)
+async def read_catalog_changes(
+    response: Response, since: int = Query(ge=0), fields: str | None = None
+):
+    """
+    Возвращает изменения каталога после поколения since: новые и изменённые
+    видео и плейлисты целиком, удалённые — списками id.
+
+    Изменения берутся из журнала catalog_changes, который заполняют триггеры
+    при каждой записи в videos и playlists; если since == version, списки
+    пусты.
+
+    Args:
+        since (int): Поколение из снимка или предыдущего ответа.
+        fields (str | None): Поля VideoSummary через запятую (те же, что
+            у снимка; id передаётся всегда).
+
+    Raises:
+        HTTPException: 400, если в fields есть неизвестное поле.
+        HTTPException: 410, если журнал не покрывает since (устарел или
+            очищен): клиенту нужен новый снимок.
+
+    Returns:
+        CatalogDelta: Изменения и новое поколение.
+    """
+    delta = await crud.get_catalog_changes(since, fields=_parse_fields(fields))
+    if delta is None:
+        raise HTTPException(status_code=410, detail="Catalog changes expired")
+    return _projected(delta, fields, response)
+
+
+@app.get("/admin/cache-stats", response_model=dict[str, CacheStats])
+async def admin_cache_stats(current_user: CurrentUserDep):
+    """Счётчики кэшей стриминга и поиска (для процесса uvicorn, принявшего запрос)"""
+    return {
+        "stream_metadata": stream_cache.stats(),
+        "blocks": block_cache.stats(),
+        "faststart": faststart.layout_cache.stats(),
+        "hls_index": hls.media_index_cache.stats(),
+        "search": search_cache.stats(),
+        "suggest": suggest_index.stats(),
+        "catalog_snapshot": catalog.snapshot_cache.stats(),
+    }
+
+
+@app.get("/admin/streams", response_model=StreamStats)
+async def admin_active_streams(current_user: CurrentUserDep):
+    """Активные потоки видео (для процесса uvicorn, принявшего запрос)"""
+    return bandwidth.scheduler.stats()
 
 
 @app.post("/admin/login", response_model=TokenResponse)
@@ -574,15 +1181,26 @@ async def register(request: LoginRequest):
     return user
 
 
-@app.get("/admin/videos/", response_model=list[VideoInDB])
+@app.get("/admin/videos/", response_model=list[VideoSummary])
 async def admin_read_videos(
     current_user: CurrentUserDep,  # Требует валидный токен!
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    fields: str | None = None,
+    cursor: str | None = None,
 ):
-    """Получить список видео (только для авторизованных)"""
-    videos = await crud.get_videos(skip=skip, limit=limit)
-    return [VideoInDB.model_validate(video) for video in videos]
+    """Получить список видео без транскрипций (только для авторизованных)"""
+    after = _parse_cursor(cursor, int)
+    videos, next_after = await crud.get_video_summaries(
+        skip=skip,
+        limit=limit,
+        fields=_parse_fields(fields),
+        after=after[0] if after else None,
+    )
+    return _list_page(
+        videos, fields, response, (next_after,) if next_after is not None else None
+    )
 
 
 @app.put("/admin/videos/{video_id}", response_model=VideoInDB)
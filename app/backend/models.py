@@ -20,10 +20,28 @@ class Video(models.Model):
     filepath = fields.CharField(max_length=1000, unique=True, index=True)
     duration_seconds = fields.IntField(null=True)
     transcription = fields.TextField(null=True)
-    # PostgreSQL-specific tsvector column for full‑text index
-    # search_vector = TSVectorField(
-    #     source_fields=["transcription"], config="russian", null=True
-    # )
+    # Сигнатура файла на момент последнего сканирования (манифест сканера)
+    file_size = fields.BigIntField(null=True)
+    file_mtime_ns = fields.BigIntField(null=True)
+    file_inode = fields.BigIntField(null=True)
+    transcription_size = fields.BigIntField(null=True)
+    transcription_mtime_ns = fields.BigIntField(null=True)
+    # Сигнатура файла субтитров .vtt, реплики которого лежат в video_cues
+    cues_size = fields.BigIntField(null=True)
+    cues_mtime_ns = fields.BigIntField(null=True)
+    # Данные контейнера (заполняются пробой заголовков при сканировании)
+    width = fields.IntField(null=True)
+    height = fields.IntField(null=True)
+    video_codec = fields.CharField(max_length=32, null=True)
+    audio_codec = fields.CharField(max_length=32, null=True)
+    bitrate = fields.BigIntField(null=True)
+    probe_version = fields.SmallIntField(null=True)
+    # Выборочный отпечаток содержимого: по нему находятся перемещённые файлы
+    fingerprint = fields.CharField(max_length=32, null=True)
+    # Когда файл пропал с диска (мягкое удаление, см. PRUNE_RETENTION_DAYS)
+    deleted_at = fields.DatetimeField(null=True, index=True)
+    # search_vector — генерируемая колонка tsvector с GIN-индексом
+    # (миграция 0009): её заполняет PostgreSQL, поэтому в модели её нет
 
     playlist: fields.ForeignKeyNullableRelation["Playlist"] = fields.ForeignKeyField(
         "models.Playlist", related_name="videos", null=True
@@ -31,7 +49,59 @@ class Video(models.Model):
 
     class Meta:
         table = "videos"
-        # indexes = [("search_vector",)]
+
+
+class VideoKeyframeIndex(models.Model):
+    """Ключевые кадры MP4 для упаковки в HLS (см. hls.py)."""
+
+    id = fields.IntField(pk=True)
+    video: fields.OneToOneRelation["Video"] = fields.OneToOneField(
+        "models.Video", related_name="keyframe_index", on_delete=fields.CASCADE
+    )
+    # ETag файла, по которому построен индекс: другой файл — новый индекс
+    etag = fields.CharField(max_length=64)
+    timescale = fields.IntField()
+    duration = fields.BigIntField()
+    # Пары (номер сэмпла, DTS) в int64 little-endian
+    keyframes = fields.BinaryField()
+
+    class Meta:
+        table = "video_keyframe_indexes"
+
+
+class VideoCue(models.Model):
+    """Реплика субтитров .vtt: поиск по ней ведёт к нужной секунде видео."""
+
+    id = fields.BigIntField(pk=True)
+    video: fields.ForeignKeyRelation["Video"] = fields.ForeignKeyField(
+        "models.Video", related_name="cues", on_delete=fields.CASCADE
+    )
+    start_seconds = fields.FloatField()
+    end_seconds = fields.FloatField()
+    text = fields.TextField()
+    # search_vector — генерируемая колонка с GIN-индексом (миграция 0011)
+
+    class Meta:
+        table = "video_cues"
+
+
+class ScanJob(models.Model):
+    id = fields.IntField(pk=True)
+    status = fields.CharField(max_length=16, index=True)
+    cancel_requested = fields.BooleanField(default=False)
+    files_expected = fields.IntField(default=0)
+    added = fields.IntField(default=0)
+    changed = fields.IntField(default=0)
+    unchanged = fields.IntField(default=0)
+    removed = fields.IntField(default=0)
+    moved = fields.IntField(default=0)
+    db_writes = fields.IntField(default=0)
+    error = fields.TextField(null=True)
+    started_at = fields.DatetimeField()
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "scan_jobs"
 
 
 class User(models.Model):
@@ -42,4 +112,4 @@ class User(models.Model):
     disabled = fields.BooleanField(default=False)
 
     class Meta:
-        table = "users"
\ No newline at end of file
+        table = "users"
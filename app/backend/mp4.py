@@ -0,0 +1,61 @@
+import struct
+from collections.abc import Iterator
+from typing import BinaryIO
+
+# Типы боксов верхнего уровня, по которым файл опознаётся как ISO BMFF (MP4)
+TOP_LEVEL_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+
+
+def is_mp4(head: bytes) -> bool:
+    return len(head) >= 8 and head[4:8] in TOP_LEVEL_BOXES
+
+
+def iter_boxes(
+    f: BinaryIO, start: int, end: int
+) -> Iterator[tuple[bytes, int, int, int]]:
+    """
+    Перебирает боксы в диапазоне [start, end), читая только их заголовки.
+    Отдаёт (тип, начало бокса, начало данных, конец бокса).
+    """
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack(">Q", large)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield box_type, pos, pos + header_size, min(pos + size, end)
+        pos += size
+
+
+def find_box(
+    f: BinaryIO, start: int, end: int, path: list[bytes]
+) -> tuple[int, int] | None:
+    """Ищет вложенный бокс по пути типов; возвращает (начало данных, конец)."""
+    for box_type, _, data_start, box_end in iter_boxes(f, start, end):
+        if box_type != path[0]:
+            continue
+        if len(path) == 1:
+            return data_start, box_end
+        found = find_box(f, data_start, box_end, path[1:])
+        if found:
+            return found
+    return None
+
+
+def read_payload(f: BinaryIO, start: int, end: int, limit: int | None = None) -> bytes:
+    """Читает данные бокса, не больше limit байт."""
+    length = end - start if limit is None else min(end - start, limit)
+    f.seek(start)
+    return f.read(length)
@@ -0,0 +1,370 @@
+import asyncio
+import io
+import logging
+import os
+import struct
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from app.backend import mp4
+from app.backend.config import cfg
+
+logger = logging.getLogger(__name__)
+
+# Версия парсера: записи, пробированные старой версией, пробируются заново
+PROBE_VERSION = 1
+
+MP4_CODECS = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "hevc",
+    b"hev1": "hevc",
+    b"av01": "av1",
+    b"vp08": "vp8",
+    b"vp09": "vp9",
+    b"mp4v": "mpeg4",
+    b"mp4a": "aac",
+    b"Opus": "opus",
+    b"fLaC": "flac",
+    b"ac-3": "ac3",
+    b"ec-3": "eac3",
+    b".mp3": "mp3",
+}
+MATROSKA_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "V_AV1": "av1",
+    "V_VP8": "vp8",
+    "V_VP9": "vp9",
+    "A_AAC": "aac",
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_FLAC": "flac",
+    "A_AC3": "ac3",
+    "A_EAC3": "eac3",
+    "A_MPEG/L3": "mp3",
+}
+
+# Идентификаторы элементов EBML (Matroska/WebM)
+EBML_HEADER = 0x1A45DFA3
+EBML_SEGMENT = 0x18538067
+EBML_SEEK_HEAD = 0x114D9B74
+EBML_SEEK = 0x4DBB
+EBML_SEEK_ID = 0x53AB
+EBML_SEEK_POSITION = 0x53AC
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_TRACK_TYPE = 0x83
+EBML_CODEC_ID = 0x86
+EBML_VIDEO = 0xE0
+EBML_PIXEL_WIDTH = 0xB0
+EBML_PIXEL_HEIGHT = 0xBA
+EBML_CLUSTER = 0x1F43B675
+
+# Предел чтения одного бокса или элемента заголовка: медиаданные не читаются
+MAX_HEADER_READ = 4 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeResult:
+    duration: float | None = None
+    width: int | None = None
+    height: int | None = None
+    video_codec: str | None = None
+    audio_codec: str | None = None
+
+    def columns(self, file_size: int) -> dict[str, int | str | None]:
+        """Колонки таблицы videos; битрейт — средний по размеру файла."""
+        bitrate = None
+        if self.duration:
+            bitrate = round(file_size * 8 / self.duration)
+        return {
+            "duration_seconds": round(self.duration) if self.duration else None,
+            "width": self.width,
+            "height": self.height,
+            "video_codec": self.video_codec,
+            "audio_codec": self.audio_codec,
+            "bitrate": bitrate,
+            "probe_version": PROBE_VERSION,
+        }
+
+
+EMPTY_PROBE_COLUMNS = {
+    "duration_seconds": None,
+    "width": None,
+    "height": None,
+    "video_codec": None,
+    "audio_codec": None,
+    "bitrate": None,
+    "probe_version": PROBE_VERSION,
+}
+
+
+# MP4: moov/mvhd, moov/trak/tkhd, trak/mdia/hdlr, trak/mdia/minf/stbl/stsd
+
+
+def _parse_mvhd(data: bytes) -> float | None:
+    if data[0] == 1:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    return duration / timescale if timescale and duration else None
+
+
+def _parse_trak(f: BinaryIO, start: int, end: int) -> dict:
+    track: dict = {}
+    tkhd = mp4.find_box(f, start, end, [b"tkhd"])
+    if tkhd:
+        data = mp4.read_payload(f, *tkhd, limit=128)
+        # Ширина и высота в формате 16.16 — последние 8 байт tkhd
+        width, height = struct.unpack(">II", data[-8:])
+        track["width"], track["height"] = width >> 16, height >> 16
+    hdlr = mp4.find_box(f, start, end, [b"mdia", b"hdlr"])
+    if hdlr:
+        track["handler"] = mp4.read_payload(f, *hdlr, limit=12)[8:12]
+    stsd = mp4.find_box(f, start, end, [b"mdia", b"minf", b"stbl", b"stsd"])
+    if stsd:
+        data = mp4.read_payload(f, *stsd, limit=64)
+        fourcc = data[12:16]
+        track["codec"] = MP4_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+        if track.get("handler") == b"vide" and len(data) >= 44:
+            # Визуальная запись образца: ширина и высота после 24 байт служебных полей
+            width, height = struct.unpack(">HH", data[40:44])
+            if width and height:
+                track["width"], track["height"] = width, height
+    return track
+
+
+def _probe_mp4(f: BinaryIO, file_size: int) -> ProbeResult | None:
+    moov = mp4.find_box(f, 0, file_size, [b"moov"])
+    if moov is None:
+        return None
+    duration = None
+    video: dict = {}
+    audio: dict = {}
+    for box_type, _, data_start, box_end in mp4.iter_boxes(f, *moov):
+        if box_type == b"mvhd":
+            duration = _parse_mvhd(mp4.read_payload(f, data_start, box_end, limit=32))
+        elif box_type == b"trak":
+            track = _parse_trak(f, data_start, box_end)
+            if track.get("handler") == b"vide" and not video:
+                video = track
+            elif track.get("handler") == b"soun" and not audio:
+                audio = track
+    return ProbeResult(
+        duration=duration,
+        width=video.get("width") or None,
+        height=video.get("height") or None,
+        video_codec=video.get("codec"),
+        audio_codec=audio.get("codec"),
+    )
+
+
+# Matroska/WebM: EBML/Segment/{SeekHead, Info, Tracks}
+
+
+def _read_vint(f: BinaryIO, keep_marker: bool) -> tuple[int | None, bool]:
+    """Читает целое переменной длины EBML. Возвращает (значение, неизвестный размер)."""
+    first = f.read(1)
+    if not first or first[0] == 0:
+        return None, False
+    length = 9 - first[0].bit_length()
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        return None, False
+    if keep_marker:
+        return int.from_bytes(first + rest, "big"), False
+    value = first[0] & ((1 << (8 - length)) - 1)
+    for byte in rest:
+        value = (value << 8) | byte
+    return value, value == (1 << (7 * length)) - 1
+
+
+def _iter_elements(
+    f: BinaryIO, start: int, end: int
+) -> Iterator[tuple[int, int, int | None]]:
+    """Перебирает элементы EBML: (id, начало данных, размер или None)."""
+    pos = start
+    while pos < end:
+        f.seek(pos)
+        element_id, _ = _read_vint(f, keep_marker=True)
+        size, unknown = _read_vint(f, keep_marker=False)
+        if element_id is None or size is None:
+            return
+        data_start = f.tell()
+        yield element_id, data_start, None if unknown else size
+        if unknown:
+            return
+        pos = data_start + size
+
+
+def _read_element(f: BinaryIO, start: int, size: int | None) -> io.BytesIO | None:
+    if size is None or size > MAX_HEADER_READ:
+        return None
+    f.seek(start)
+    return io.BytesIO(f.read(size))
+
+
+def _uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def _parse_info(buf: io.BytesIO) -> float | None:
+    data = buf.getvalue()
+    scale, duration = 1_000_000, None
+    for element_id, start, size in _iter_elements(buf, 0, len(data)):
+        value = data[start : start + (size or 0)]
+        if element_id == EBML_TIMECODE_SCALE:
+            scale = _uint(value)
+        elif element_id == EBML_DURATION and size in (4, 8):
+            duration = struct.unpack(">f" if size == 4 else ">d", value)[0]
+    return duration * scale / 1e9 if duration else None
+
+
+def _parse_tracks(buf: io.BytesIO) -> tuple[dict, dict]:
+    data = buf.getvalue()
+    video: dict = {}
+    audio: dict = {}
+    for element_id, start, size in _iter_elements(buf, 0, len(data)):
+        if element_id != EBML_TRACK_ENTRY or size is None:
+            continue
+        track: dict = {}
+        for child_id, child_start, child_size in _iter_elements(
+            buf, start, start + size
+        ):
+            value = data[child_start : child_start + (child_size or 0)]
+            if child_id == EBML_TRACK_TYPE:
+                track["type"] = _uint(value)
+            elif child_id == EBML_CODEC_ID:
+                codec = value.decode("ascii", "replace").rstrip("\x00")
+                track["codec"] = MATROSKA_CODECS.get(codec, codec)
+            elif child_id == EBML_VIDEO and child_size is not None:
+                for video_id, video_start, video_size in _iter_elements(
+                    buf, child_start, child_start + child_size
+                ):
+                    pixels = _uint(data[video_start : video_start + (video_size or 0)])
+                    if video_id == EBML_PIXEL_WIDTH:
+                        track["width"] = pixels
+                    elif video_id == EBML_PIXEL_HEIGHT:
+                        track["height"] = pixels
+        if track.get("type") == 1 and not video:
+            video = track
+        elif track.get("type") == 2 and not audio:
+            audio = track
+    return video, audio
+
+
+def _parse_seek_head(buf: io.BytesIO) -> dict[int, int]:
+    data = buf.getvalue()
+    positions: dict[int, int] = {}
+    for element_id, start, size in _iter_elements(buf, 0, len(data)):
+        if element_id != EBML_SEEK or size is None:
+            continue
+        seek_id = seek_position = None
+        for child_id, child_start, child_size in _iter_elements(
+            buf, start, start + size
+        ):
+            value = data[child_start : child_start + (child_size or 0)]
+            if child_id == EBML_SEEK_ID:
+                seek_id = _uint(value)
+            elif child_id == EBML_SEEK_POSITION:
+                seek_position = _uint(value)
+        if seek_id is not None and seek_position is not None:
+            positions[seek_id] = seek_position
+    return positions
+
+
+def _probe_matroska(f: BinaryIO, file_size: int) -> ProbeResult | None:
+    elements = _iter_elements(f, 0, file_size)
+    header = next(elements, None)
+    if header is None or header[0] != EBML_HEADER:
+        return None
+    segment = next(elements, None)
+    if segment is None or segment[0] != EBML_SEGMENT:
+        return None
+    segment_start, segment_size = segment[1], segment[2]
+    segment_end = file_size if segment_size is None else segment_start + segment_size
+
+    found: dict[int, io.BytesIO] = {}
+    seeks: dict[int, int] = {}
+    for element_id, start, size in _iter_elements(f, segment_start, segment_end):
+        if element_id in (EBML_INFO, EBML_TRACKS, EBML_SEEK_HEAD):
+            buf = _read_element(f, start, size)
+            if buf is not None:
+                found[element_id] = buf
+        if element_id == EBML_SEEK_HEAD and element_id in found:
+            seeks = _parse_seek_head(found[element_id])
+        # Начались медиаданные: дальше заголовков нет
+        if element_id == EBML_CLUSTER or size is None:
+            break
+        if EBML_INFO in found and EBML_TRACKS in found:
+            break
+
+    for element_id in (EBML_INFO, EBML_TRACKS):
+        if element_id in found or element_id not in seeks:
+            continue
+        element = next(
+            _iter_elements(f, segment_start + seeks[element_id], segment_end), None
+        )
+        if element and element[0] == element_id:
+            buf = _read_element(f, element[1], element[2])
+            if buf is not None:
+                found[element_id] = buf
+
+    duration = _parse_info(found[EBML_INFO]) if EBML_INFO in found else None
+    video, audio = (
+        _parse_tracks(found[EBML_TRACKS]) if EBML_TRACKS in found else ({}, {})
+    )
+    return ProbeResult(
+        duration=duration,
+        width=video.get("width"),
+        height=video.get("height"),
+        video_codec=video.get("codec"),
+        audio_codec=audio.get("codec"),
+    )
+
+
+def probe_file(path: str) -> ProbeResult | None:
+    """
+    Определяет длительность, разрешение и кодеки по заголовкам контейнера.
+    Читаются только заголовки (боксы moov у MP4, Info/Tracks у Matroska/WebM).
+    """
+    try:
+        with open(path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            head = f.read(8)
+            if mp4.is_mp4(head):
+                return _probe_mp4(f, file_size)
+            if head[:4] == EBML_HEADER.to_bytes(4, "big"):
+                return _probe_matroska(f, file_size)
+    except (OSError, ValueError, IndexError, struct.error) as e:
+        logger.warning(f"Cannot probe '{path}': {e}")
+    return None
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+async def probe_files(paths: list[str]) -> list[ProbeResult | None]:
+    """Пробирует файлы параллельно в пуле процессов (PROBE_WORKERS)."""
+    global _executor
+    if not paths:
+        return []
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=cfg.PROBE_WORKERS)
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(loop.run_in_executor(_executor, probe_file, path) for path in paths)
+    )
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
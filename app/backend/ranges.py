@@ -0,0 +1,153 @@
+import os
+from collections.abc import Mapping
+from email.utils import formatdate, parsedate_to_datetime
+
+# Больше диапазонов в одном запросе не обслуживаем: отдаём файл целиком
+MAX_RANGES = 16
+
+ByteRange = tuple[int, int]
+
+
+class RangeNotSatisfiable(Exception):
+    """Ни один из запрошенных диапазонов не попадает в файл (416)."""
+
+
+def make_etag(st: os.stat_result) -> str:
+    """Сильный ETag из inode, размера и mtime: меняется при любой замене файла."""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def _parse_http_date(value: str) -> float | None:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _etag_list(value: str) -> list[str]:
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+def _weak_match(value: str, etag: str) -> bool:
+    if value.strip() == "*":
+        return True
+    return any(tag.removeprefix("W/") == etag for tag in _etag_list(value))
+
+
+def _strong_match(value: str, etag: str) -> bool:
+    if value.strip() == "*":
+        return True
+    return any(tag == etag for tag in _etag_list(value))
+
+
+def not_modified(headers: Mapping[str, str], etag: str) -> bool:
+    """If-None-Match совпадает с etag (слабое сравнение): можно ответить 304."""
+    value = headers.get("if-none-match")
+    return value is not None and _weak_match(value, etag)
+
+
+def evaluate_preconditions(
+    headers: Mapping[str, str], etag: str, mtime: float
+) -> int | None:
+    """
+    Проверяет условные заголовки GET-запроса в порядке RFC 7232, раздел 6.
+    Возвращает 412 или 304, если ответ должен быть без тела, иначе None.
+    """
+    if_match = headers.get("if-match")
+    if if_match is not None:
+        if not _strong_match(if_match, etag):
+            return 412
+    else:
+        since = headers.get("if-unmodified-since")
+        timestamp = _parse_http_date(since) if since else None
+        if timestamp is not None and int(mtime) > timestamp:
+            return 412
+
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if _weak_match(if_none_match, etag):
+            return 304
+    else:
+        since = headers.get("if-modified-since")
+        timestamp = _parse_http_date(since) if since else None
+        if timestamp is not None and int(mtime) <= timestamp:
+            return 304
+    return None
+
+
+def if_range_matches(headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    """
+    Проверяет If-Range: диапазон отдаётся, только если у клиента та же версия
+    файла (сильное сравнение ETag или точное совпадение Last-Modified).
+    """
+    value = headers.get("if-range")
+    if value is None:
+        return True
+    value = value.strip()
+    if value.startswith(('"', "W/")):
+        return value == etag
+    timestamp = _parse_http_date(value)
+    return timestamp is not None and timestamp == int(mtime)
+
+
+def parse_range(header: str, size: int) -> list[ByteRange] | None:
+    """
+    Разбирает заголовок Range (RFC 7233): "bytes=0-99", "bytes=500-",
+    "bytes=-500" и списки через запятую.
+
+    Возвращает отсортированные диапазоны [start, end] с объединёнными
+    пересечениями или None, если заголовок нужно проигнорировать
+    (синтаксическая ошибка, другая единица, слишком много диапазонов).
+
+    Raises:
+        RangeNotSatisfiable: Если ни один диапазон не попадает в файл.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    specs = spec.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges: list[ByteRange] = []
+    for part in specs:
+        first, dash, last = part.strip().partition("-")
+        if not dash:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if not first:
+                # Суффикс: последние N байт
+                length = int(last)
+                if length < 0:
+                    return None
+                if length == 0 or size == 0:
+                    continue
+                ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
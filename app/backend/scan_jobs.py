@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+
+from tortoise import Tortoise
+
+from app.backend import crud
+from app.backend.models import ScanJob
+from app.backend.scanner import scan_library
+from app.backend.schemas import ScanReport, ScanStatus
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-лока PostgreSQL: одно сканирование на все процессы uvicorn
+SCAN_LOCK_KEY = 0x4C46_5343
+# Сколько секунд ждать лок, если его держит наблюдатель (одна пачка изменений)
+SCAN_LOCK_WAIT = 10.0
+# Как часто задание сохраняет прогресс и проверяет запрос отмены (секунды)
+PROGRESS_INTERVAL = 1.0
+
+# Задания, выполняющиеся в текущем процессе
+_tasks: dict[int, asyncio.Task] = {}
+
+
+class ScanAlreadyRunning(Exception):
+    def __init__(self, job_id: int | None):
+        super().__init__(f"Scan job {job_id} is already running")
+        self.job_id = job_id
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+class _ProgressTracker:
+    """Колбэк сканера: раз в PROGRESS_INTERVAL сохраняет прогресс в scan_jobs."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.report = ScanReport()
+        self.last_flush = time.monotonic()
+
+    async def __call__(self, report: ScanReport) -> None:
+        self.report = report
+        now = time.monotonic()
+        if now - self.last_flush < PROGRESS_INTERVAL:
+            return
+        self.last_flush = now
+        if await crud.update_scan_job_progress(self.job_id, report):
+            raise ScanCancelled()
+
+
+async def _execute(job: ScanJob) -> None:
+    tracker = _ProgressTracker(job.id)
+    try:
+        report = await scan_library(on_progress=tracker)
+    except ScanCancelled:
+        logger.info(f"Scan job {job.id} cancelled")
+        await crud.finish_scan_job(job.id, ScanStatus.CANCELLED, tracker.report)
+    except Exception as e:
+        logger.exception(f"Scan job {job.id} failed")
+        await crud.finish_scan_job(
+            job.id, ScanStatus.FAILED, tracker.report, error=str(e)
+        )
+    else:
+        await crud.finish_scan_job(job.id, ScanStatus.FINISHED, report)
+
+
+async def _try_lock(conn) -> bool:
+    """
+    Захватывает advisory-лок сканирования. Если его держит не задание
+    сканирования, а наблюдатель (watcher) на время пачки изменений,
+    ждёт освобождения до SCAN_LOCK_WAIT секунд.
+    """
+    deadline = time.monotonic() + SCAN_LOCK_WAIT
+    while True:
+        if await conn.fetchval("SELECT pg_try_advisory_lock($1)", SCAN_LOCK_KEY):
+            return True
+        if time.monotonic() >= deadline or await crud.get_running_scan_job():
+            return False
+        await asyncio.sleep(0.2)
+
+
+async def _run(started: asyncio.Future) -> None:
+    """
+    Держит advisory-лок на выделенном соединении всё время сканирования.
+    Результат захвата лока передаётся через started: задание или None.
+    """
+    connection = Tortoise.get_connection("default")
+    try:
+        async with connection.acquire_connection() as conn:
+            locked = await _try_lock(conn)
+            if not locked:
+                started.set_result(None)
+                return
+            try:
+                # Лок у нас, значит незавершённые задания остались от упавших процессов
+                await crud.interrupt_running_scan_jobs()
+                job = await crud.create_scan_job(
+                    files_expected=await crud.count_videos()
+                )
+                started.set_result(job)
+                await _execute(job)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", SCAN_LOCK_KEY)
+    except Exception as e:
+        if not started.done():
+            started.set_exception(e)
+        else:
+            logger.exception("Scan job runner failed")
+
+
+async def start_scan_job() -> ScanJob:
+    """
+    Запускает фоновое сканирование библиотеки.
+
+    Raises:
+        ScanAlreadyRunning: Если сканирование уже идёт в любом из процессов.
+    """
+    loop = asyncio.get_running_loop()
+    started: asyncio.Future[ScanJob | None] = loop.create_future()
+    task = asyncio.create_task(_run(started))
+    job = await started
+    if job is None:
+        running = await crud.get_running_scan_job()
+        raise ScanAlreadyRunning(running.id if running else None)
+    _tasks[job.id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job.id, None))
+    logger.info(f"Scan job {job.id} started")
+    return job
+
+
+async def shutdown() -> None:
+    """Прерывает задания текущего процесса при остановке приложения."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+import aiofiles
+
+from app.backend import crud, cues
+from app.backend.config import cfg
+from app.backend.fingerprint import fingerprint_files
+from app.backend.probe import EMPTY_PROBE_COLUMNS, PROBE_VERSION, probe_files
+from app.backend.schemas import PlaylistCreate, ScanReport
+from app.backend.walker import FileSignature, WalkedVideo, walk_library
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[ScanReport], Awaitable[None]]
+
+# Колонки манифеста, описывающие сам видеофайл (без транскрипции)
+VIDEO_SIGNATURE_FIELDS = ("file_size", "file_mtime_ns", "file_inode")
+
+
+def manifest_columns(
+    signature: FileSignature, transcription: FileSignature | None
+) -> dict[str, int | None]:
+    """Раскладывает сигнатуры видео и его транскрипции по колонкам манифеста."""
+    return {
+        "file_size": signature.size,
+        "file_mtime_ns": signature.mtime_ns,
+        "file_inode": signature.inode,
+        "transcription_size": transcription.size if transcription else None,
+        "transcription_mtime_ns": transcription.mtime_ns if transcription else None,
+    }
+
+
+async def create_playlists_from_folders(
+    folders: set[str], playlist_ids: dict[str, int]
+) -> None:
+    """
+    Создает плейлисты на основе папок с видео.
+    Дополняет playlist_ids идентификаторами новых плейлистов.
+    """
+    missing = [
+        PlaylistCreate(
+            name=Path(folder_path).name,
+            folder_path=folder_path,
+            description=f"Плейлист для папки {Path(folder_path).name}",
+        )
+        for folder_path in folders
+        if folder_path not in playlist_ids
+    ]
+    playlist_ids.update(await crud.bulk_create_playlists(missing))
+
+
+async def _read_transcription(path: Path | None) -> str | None:
+    if path is None:
+        return None
+    async with aiofiles.open(path, "r", encoding="utf-8") as f:
+        return await f.read()
+
+
+async def _flush(
+    pending: list[tuple[dict[str, Any], WalkedVideo]], playlist_ids: dict[str, int]
+) -> int:
+    """
+    Дочитывает транскрипции пачки, пробирует заголовки контейнеров и считает
+    отпечатки тех видео, для которых их нет в строке (см. _reuse_stored),
+    и записывает пачку в БД одним COPY.
+    Возвращает количество записанных строк.
+    """
+    if not pending:
+        return 0
+    await create_playlists_from_folders(
+        {row["folder"] for row, _ in pending}, playlist_ids
+    )
+    unprobed = [item for item in pending if "probe_version" not in item[0]]
+    unfingerprinted = [item for item in pending if "fingerprint" not in item[0]]
+    transcriptions, probes, fingerprints = await asyncio.gather(
+        asyncio.gather(
+            *(_read_transcription(video.transcription_path) for _, video in pending)
+        ),
+        probe_files([str(video.path) for _, video in unprobed]),
+        fingerprint_files([str(video.path) for _, video in unfingerprinted]),
+    )
+    for (row, _), fingerprint in zip(unfingerprinted, fingerprints):
+        row["fingerprint"] = fingerprint
+    for (row, video), result in zip(unprobed, probes):
+        if result is None:
+            row.update(EMPTY_PROBE_COLUMNS)
+        else:
+            row.update(result.columns(video.signature.size))
+    rows = []
+    for (row, _), transcription in zip(pending, transcriptions):
+        row["playlist_id"] = playlist_ids.get(row.pop("folder"))
+        row["transcription"] = transcription
+        rows.append(row)
+    written = await crud.bulk_upsert_videos(rows)
+    pending.clear()
+    return written
+
+
+def _ingest_row(video: WalkedVideo) -> dict[str, Any]:
+    return {
+        "title": video.path.stem,
+        "filepath": str(video.path),
+        "folder": str(video.path.parent),
+        **manifest_columns(video.signature, video.transcription_signature),
+    }
+
+
+def _reuse_stored(ingest_row: dict[str, Any], row: dict[str, Any]) -> None:
+    """
+    Если сам видеофайл не менялся (изменились только транскрипция или
+    плейлист), переносит в строку загрузки сохранённые результаты пробы
+    и отпечаток из манифеста: _flush не будет читать файл заново.
+    """
+    if any(row[name] != ingest_row[name] for name in VIDEO_SIGNATURE_FIELDS):
+        return
+    if row["probe_version"] == PROBE_VERSION:
+        ingest_row.update((name, row[name]) for name in crud.PROBE_FIELDS)
+    if row["fingerprint"] is not None:
+        ingest_row["fingerprint"] = row["fingerprint"]
+
+
+async def _relocate(
+    pending: list[tuple[dict[str, Any], WalkedVideo]],
+    orphans: Iterable[dict[str, Any]],
+) -> set[int]:
+    """
+    Находит среди новых файлов перемещённые: размер и выборочный отпечаток
+    совпадают с записью, чей файл пропал. Такая запись переносится на новый
+    путь с прежним id. Посчитанные отпечатки остаются в строках pending,
+    чтобы _flush не читал файлы повторно. Возвращает id перенесённых записей.
+    """
+    sources: dict[tuple[int, str], list[int]] = defaultdict(list)
+    for row in orphans:
+        if row["fingerprint"] is not None:
+            sources[(row["file_size"], row["fingerprint"])].append(row["id"])
+    sizes = {size for size, _ in sources}
+    candidates = [
+        (row, video) for row, video in pending if video.signature.size in sizes
+    ]
+    missing = [(row, video) for row, video in candidates if "fingerprint" not in row]
+    fingerprints = await fingerprint_files([str(video.path) for _, video in missing])
+    for (row, _), fingerprint in zip(missing, fingerprints):
+        row["fingerprint"] = fingerprint
+    moves: dict[int, str] = {}
+    for row, video in candidates:
+        ids = sources.get((video.signature.size, row["fingerprint"]))
+        if ids:
+            moves[ids.pop()] = row["filepath"]
+    return await crud.move_videos(moves)
+
+
+async def _flush_all(
+    pending: list[tuple[dict[str, Any], WalkedVideo]], playlist_ids: dict[str, int]
+) -> int:
+    written = 0
+    for start in range(0, len(pending), cfg.SCAN_BATCH_SIZE):
+        batch = pending[start : start + cfg.SCAN_BATCH_SIZE]
+        written += await _flush(batch, playlist_ids)
+    return written
+
+
+async def ingest_videos(
+    videos: list[WalkedVideo], orphans: Iterable[dict[str, Any]] = ()
+) -> tuple[int, set[int]]:
+    """
+    Записывает отдельные видео (и плейлисты их папок) без обхода библиотеки.
+    Используется наблюдателем за файловой системой.
+
+    Args:
+        videos: Новые или изменившиеся файлы.
+        orphans: Записи пропавших файлов (см. crud.get_videos_by_path):
+            если среди videos есть их перемещённые копии, записи переносятся.
+
+    Returns:
+        Количество записанных строк и id перенесённых записей.
+    """
+    playlist_ids = await crud.get_playlist_ids_by_folder()
+    manifest = await crud.get_video_manifest([str(video.path) for video in videos])
+    pending = [(_ingest_row(video), video) for video in videos]
+    for ingest_row, _ in pending:
+        row = manifest.get(ingest_row["filepath"])
+        if row is not None:
+            _reuse_stored(ingest_row, row)
+    moved = await _relocate(pending, orphans)
+    return await _flush_all(pending, playlist_ids), moved
+
+
+async def scan_library(on_progress: ProgressCallback | None = None) -> ScanReport:
+    """
+    Сканирует VIDEOS_DIR и синхронизирует таблицу videos с диском.
+
+    Дерево обходится за один проход (см. walker.walk_library), папки с видео
+    становятся плейлистами. Для каждого файла сигнатура (размер, mtime, inode)
+    видео и его транскрипции сравнивается с манифестом в БД. Транскрипция
+    читается и запись обновляется только для новых и изменившихся файлов.
+    Существующие видео и плейлисты загружаются одним запросом, изменения
+    записываются пачками по SCAN_BATCH_SIZE.
+
+    Новые файлы, совпадающие по размеру и выборочному отпечатку с пропавшими,
+    считаются перемещёнными: запись переносится на новый путь с прежним id.
+    Остальные видео, файлы которых не встретились за этот проход, удаляются (или
+    помечаются удалёнными при PRUNE_RETENTION_DAYS > 0) пачками по
+    PRUNE_BATCH_SIZE; затем удаляются просроченные помеченные записи
+    и опустевшие плейлисты. В конце перечитываются изменившиеся субтитры
+    .vtt из TRANSCRIPTIONS_DIR (см. cues.sync_cues).
+
+    Args:
+        on_progress: Вызывается с текущим отчётом после каждой папки и каждой
+            записанной пачки. Исключение из колбэка прерывает сканирование,
+            записи исчезнувших файлов при этом не удаляются.
+    """
+    report = ScanReport()
+    playlist_ids = await crud.get_playlist_ids_by_folder()
+    manifest = await crud.get_video_manifest()
+    pending: list[tuple[dict[str, Any], WalkedVideo]] = []
+    # Новые файлы того же размера, что и записи в манифесте: возможно, перемещённые
+    deferred: list[tuple[dict[str, Any], WalkedVideo]] = []
+    orphan_sizes = {
+        row["file_size"] for row in manifest.values() if row["fingerprint"] is not None
+    }
+
+    async for folder in walk_library():
+        playlist_id = playlist_ids.get(folder.path)
+        for video in folder.videos:
+            ingest_row = _ingest_row(video)
+            row = manifest.pop(ingest_row["filepath"], None)
+            if (
+                row is not None
+                and playlist_id is not None
+                and row["playlist_id"] == playlist_id
+                and row["probe_version"] == PROBE_VERSION
+                and row["deleted_at"] is None
+                and row["fingerprint"] is not None
+                and all(row[name] == ingest_row[name] for name in crud.MANIFEST_FIELDS)
+            ):
+                report.unchanged += 1
+                continue
+
+            if row is None and video.signature.size in orphan_sizes:
+                # Решаем в конце обхода, когда станет известно, какие файлы пропали
+                deferred.append((ingest_row, video))
+                continue
+            if row is None:
+                report.added += 1
+            else:
+                _reuse_stored(ingest_row, row)
+                report.changed += 1
+            pending.append((ingest_row, video))
+            if len(pending) >= cfg.SCAN_BATCH_SIZE:
+                report.db_writes += await _flush(pending, playlist_ids)
+        if on_progress:
+            await on_progress(report)
+
+    report.db_writes += await _flush(pending, playlist_ids)
+
+    # Всё, что осталось в манифесте, за этот проход на диске не найдено
+    moved = await _relocate(deferred, manifest.values())
+    report.moved = len(moved)
+    report.added += len(deferred) - report.moved
+    report.db_writes += await _flush_all(deferred, playlist_ids)
+    orphans = [
+        row["id"]
+        for row in manifest.values()
+        if row["deleted_at"] is None and row["id"] not in moved
+    ]
+    if orphans and report.files_seen == 0:
+        # Пустой VIDEOS_DIR скорее означает неподключённый том, чем удалённую
+        # библиотеку: не трогаем каталог
+        logger.warning(
+            f"No videos found in '{cfg.VIDEOS_DIR}', skipping prune "
+            f"of {len(orphans)} videos"
+        )
+        orphans = []
+    report.removed = await crud.prune_videos(orphans)
+    purged = await crud.purge_deleted_videos()
+    playlists_deleted = await crud.delete_empty_playlists()
+    changes_pruned = await crud.prune_catalog_changes()
+    report.db_writes += report.removed + purged + playlists_deleted + changes_pruned
+    cues_updated = await cues.sync_cues(await crud.get_cue_manifest())
+    report.db_writes += cues_updated
+    if on_progress:
+        await on_progress(report)
+
+    logger.info(
+        f"Scan finished: added={report.added} changed={report.changed} "
+        f"unchanged={report.unchanged} moved={report.moved} "
+        f"removed={report.removed} "
+        f"purged={purged} playlists_deleted={playlists_deleted} "
+        f"changes_pruned={changes_pruned} "
+        f"cues_updated={cues_updated}"
+    )
+    return report
@@ -1,6 +1,8 @@
 # from typing import Optional
+from datetime import datetime
+from enum import StrEnum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 
 class VideoBase(BaseModel):
@@ -9,6 +11,11 @@ class VideoBase(BaseModel):
     duration_seconds: int | None = None
     transcription: str | None = None
     playlist_id: int | None = None
+    width: int | None = None
+    height: int | None = None
+    video_codec: str | None = None
+    audio_codec: str | None = None
+    bitrate: int | None = None
 
 
 class VideoCreate(VideoBase):
@@ -30,11 +37,138 @@ class VideoInDB(VideoBase):
         from_attributes = True
 
 
+class VideoSummary(BaseModel):
+    """Видео в списках каталога: без текста транскрипции (см. /transcript)."""
+
+    id: int
+    title: str
+    filepath: str
+    duration_seconds: int | None = None
+    playlist_id: int | None = None
+    width: int | None = None
+    height: int | None = None
+    video_codec: str | None = None
+    audio_codec: str | None = None
+    bitrate: int | None = None
+    has_transcription: bool = False
+
+
+class ScanReport(BaseModel):
+    """Итог сканирования библиотеки: количество файлов по типу изменения."""
+
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    moved: int = 0
+    db_writes: int = 0
+
+    @computed_field
+    @property
+    def files_seen(self) -> int:
+        return self.added + self.changed + self.unchanged + self.moved
+
+
+class ScanStatus(StrEnum):
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ScanJobInDB(ScanReport):
+    """Фоновое задание сканирования и его прогресс."""
+
+    id: int
+    status: ScanStatus
+    cancel_requested: bool = False
+    files_expected: int = 0
+    error: str | None = None
+    started_at: datetime
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+    @computed_field
+    @property
+    def files_per_second(self) -> float:
+        finished_at = self.finished_at or datetime.now(self.started_at.tzinfo)
+        elapsed = (finished_at - self.started_at).total_seconds()
+        return round(self.files_seen / elapsed, 1) if elapsed > 0 else 0.0
+
+    @computed_field
+    @property
+    def eta_seconds(self) -> int | None:
+        """Оценка по числу видео в БД на момент запуска; None, если неизвестна."""
+        remaining = self.files_expected - self.files_seen
+        if self.status != ScanStatus.RUNNING or remaining <= 0:
+            return None
+        if not self.files_per_second:
+            return None
+        return round(remaining / self.files_per_second)
+
+
+class CacheStats(BaseModel):
+    """Счётчики кэша одного процесса uvicorn."""
+
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+    bytes: int | None = None
+    evictions: int = 0
+
+    @computed_field
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else 0.0
+
+
+class ActiveStream(BaseModel):
+    client: str
+    video_id: int
+    started_at: datetime
+    bytes_sent: int
+    bytes_per_second: int
+
+
+class StreamStats(BaseModel):
+    """Активные потоки видео одного процесса uvicorn."""
+
+    active: int
+    offloaded: int = 0  # Потоки, которые отдаёт nginx (по аренде, см. bandwidth)
+    clients: int
+    rejected: int
+    client_rate: float  # Текущая доля полосы клиента, байт/с (0 — без ограничения)
+    streams: list[ActiveStream] = Field(default_factory=list)
+
+
 class SearchResult(BaseModel):
     id: int
     title: str
     filepath: str
     snippet: str | None = None  # Кусочек текста с совпадением
+    start_seconds: float | None = None  # Начало реплики субтитров с совпадением
+
+
+class SearchPage(BaseModel):
+    results: list[SearchResult]
+    total: int  # Сколько всего совпадений (реплик и видео) нашлось
+    next_cursor: str | None = None  # Передать в cursor за следующей страницей
+
+
+class SuggestionKind(StrEnum):
+    VIDEO = "video"
+    PLAYLIST = "playlist"
+
+
+class Suggestion(BaseModel):
+    """Подсказка к строке поиска: видео или плейлист."""
+
+    kind: SuggestionKind
+    id: int
+    title: str
 
 
 class PlaylistBase(BaseModel):
@@ -60,7 +194,22 @@ class PlaylistInDB(PlaylistBase):
 
 
 class PlaylistWithVideos(PlaylistInDB):
-    videos: list[VideoInDB] = Field(default_factory=list)
+    videos: list[VideoSummary] = Field(default_factory=list)
+
+
+class CatalogSnapshot(BaseModel):
+    """Весь каталог: видео в порядке id, плейлисты в естественном порядке."""
+
+    version: int  # Поколение каталога: передать в since за изменениями
+    videos: list[VideoSummary]
+    playlists: list[PlaylistInDB]
+
+
+class CatalogDelta(CatalogSnapshot):
+    """Изменения каталога после поколения since: новые и изменённые строки."""
+
+    deleted_videos: list[int]
+    deleted_playlists: list[int]
 
 
 class LoginRequest(BaseModel):
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats, SearchPage
+
+# Ключ страницы поиска: нормализованный запрос, размер страницы, курсор
+SearchKey = tuple[str, int, str | None]
+
+
+def normalize_query(query: str) -> str:
+    """Запрос без различий в регистре и пробелах: так же его видит plainto_tsquery."""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    LRU-кэш страниц поиска на SEARCH_CACHE_SIZE записей.
+
+    Записи действительны для одного поколения каталога (catalog_state,
+    растёт при любом изменении видео и плейлистов в любом процессе) и
+    не дольше SEARCH_CACHE_TTL секунд. При смене поколения кэш очищается.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[SearchKey, tuple[float, SearchPage]] = OrderedDict()
+        self._version: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _sync(self, version: int) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version: int, key: SearchKey) -> SearchPage | None:
+        self._sync(version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, page = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return page
+
+    def put(self, version: int, key: SearchKey, page: SearchPage) -> None:
+        if cfg.SEARCH_CACHE_SIZE <= 0:
+            return
+        self._sync(version)
+        self._entries[key] = (time.monotonic() + cfg.SEARCH_CACHE_TTL, page)
+        self._entries.move_to_end(key)
+        while len(self._entries) > cfg.SEARCH_CACHE_SIZE:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            evictions=self.evictions,
+        )
+
+
+search_cache = SearchCache()
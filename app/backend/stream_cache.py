@@ -0,0 +1,102 @@
+import mimetypes
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.backend import ranges
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats
+
+
+@dataclass(frozen=True, slots=True)
+class StreamInfo:
+    """Всё, что нужно для ответа на Range-запрос, без обращения к БД и ФС."""
+
+    path: Path
+    size: int
+    mtime: float
+    etag: str
+    last_modified: str
+    mime_type: str
+    # Путь относительно VIDEOS_DIR; None, если файл вне неё (доступ запрещён)
+    relative_path: Path | None
+
+    @property
+    def allowed(self) -> bool:
+        return self.relative_path is not None
+
+    @classmethod
+    def from_stat(
+        cls, path: Path, st: os.stat_result, relative_path: Path | None
+    ) -> "StreamInfo":
+        mime_type, _ = mimetypes.guess_type(path)
+        if not mime_type or not mime_type.startswith("video/"):
+            mime_type = "application/octet-stream"
+        return cls(
+            path=path,
+            size=st.st_size,
+            mtime=st.st_mtime,
+            etag=ranges.make_etag(st),
+            last_modified=ranges.http_date(st.st_mtime),
+            mime_type=mime_type,
+            relative_path=relative_path,
+        )
+
+
+class StreamMetadataCache:
+    """
+    LRU-кэш StreamInfo по id видео на STREAM_CACHE_SIZE записей.
+
+    Записи сбрасываются при изменении видео в этом процессе (см. вызовы
+    invalidate в crud), а изменения из других процессов uvicorn видны
+    не позже чем через STREAM_CACHE_TTL секунд.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[int, tuple[float, StreamInfo]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, video_id: int) -> StreamInfo | None:
+        entry = self._entries.get(video_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, info = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[video_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(video_id)
+        self.hits += 1
+        return info
+
+    def put(self, video_id: int, info: StreamInfo) -> None:
+        if cfg.STREAM_CACHE_SIZE <= 0:
+            return
+        self._entries[video_id] = (time.monotonic() + cfg.STREAM_CACHE_TTL, info)
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > cfg.STREAM_CACHE_SIZE:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, video_id: int | None = None) -> None:
+        """Сбрасывает запись видео или, без аргумента, весь кэш."""
+        if video_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(video_id, None)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            evictions=self.evictions,
+        )
+
+
+stream_cache = StreamMetadataCache()
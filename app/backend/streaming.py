@@ -0,0 +1,331 @@
+import asyncio
+import contextlib
+import os
+import secrets
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.backend.bandwidth import StreamSession
+from app.backend.block_cache import Region, block_cache
+from app.backend.config import cfg
+from app.backend.faststart import VirtualLayout
+from app.backend.ranges import ByteRange
+
+# Расширения ASGI, через которые сервер сам отдаёт файл с диска
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=cfg.STREAM_READ_WORKERS, thread_name_prefix="stream-read"
+        )
+    return _executor
+
+
+class FileRangeResponse(Response):
+    """
+    Отдаёт файл целиком или набор диапазонов байт [start, end].
+
+    Один диапазон отдаётся с Content-Range, несколько — телом
+    multipart/byteranges. Если сервер поддерживает расширение ASGI
+    zerocopysend, байты файла передаются ядром (sendfile) без копирования
+    в Python; целый файл без лимитов скорости может быть отдан и через
+    pathsend. Иначе файл читается os.pread блоками по STREAM_CHUNK_SIZE
+    в пуле потоков, причём следующий блок читается, пока отправляется
+    текущий; начало файла и индекс MP4 при заданном cache_key (ETag файла)
+    берутся из block_cache. Файл открывается тоже в пуле потоков.
+    Поток с session выдерживает лимиты полосы планировщика и закрывает
+    сессию по завершении ответа.
+
+    С layout диапазоны относятся к виртуальной раскладке файла
+    (см. faststart): куски из исходного файла читаются как обычно,
+    переписанный moov отдаётся из памяти.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        file_size: int,
+        ranges: list[ByteRange] | None = None,
+        status_code: int = 200,
+        media_type: str | None = None,
+        headers: Mapping[str, str] | None = None,
+        cache_key: str | None = None,
+        session: StreamSession | None = None,
+        layout: VirtualLayout | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.layout = layout
+        self.cache_key = cache_key
+        self.session = session
+        self.file_size = file_size
+        self.status_code = status_code
+        self.background = None
+        headers = dict(headers or {})
+
+        # Части тела: (заголовок части multipart, начало, длина)
+        self.parts: list[tuple[bytes, int, int]] = []
+        self.epilogue = b""
+        if ranges is None:
+            self.parts.append((b"", 0, file_size))
+            self.media_type = media_type
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.parts.append((b"", start, end - start + 1))
+            headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+            self.media_type = media_type
+        else:
+            boundary = secrets.token_hex(16)
+            for start, end in ranges:
+                part_header = (
+                    f"--{boundary}\r\n"
+                    f"Content-Type: {media_type or 'application/octet-stream'}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+                )
+                prefix = part_header.encode("latin-1")
+                if self.parts:
+                    prefix = b"\r\n" + prefix
+                self.parts.append((prefix, start, end - start + 1))
+            self.epilogue = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            self.media_type = f"multipart/byteranges; boundary={boundary}"
+
+        content_length = len(self.epilogue) + sum(
+            len(prefix) + length for prefix, _, length in self.parts
+        )
+        headers["content-length"] = str(content_length)
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        extensions = scope.get("extensions") or {}
+        whole_file = self.parts == [(b"", 0, self.file_size)]
+        throttled = self.session is not None and self.session.scheduler.throttled
+        try:
+            if ZEROCOPY_EXTENSION in extensions:
+                loop = asyncio.get_running_loop()
+                # open на медленном или сетевом диске может надолго блокировать
+                file = await loop.run_in_executor(
+                    _get_executor(), open, self.path, "rb"
+                )
+                try:
+                    await self._send_parts(send, partial(self._send_zerocopy, file))
+                finally:
+                    file.close()
+            elif (
+                PATHSEND_EXTENSION in extensions
+                and whole_file
+                and not throttled
+                and self.layout is None
+            ):
+                # Без лимитов сессия только считает байты и держит место потока
+                await self._throttle(self.file_size)
+                await send({"type": PATHSEND_EXTENSION, "path": str(self.path)})
+            else:
+                async with anyio.create_task_group() as task_group:
+
+                    async def wrap(func) -> None:
+                        await func()
+                        task_group.cancel_scope.cancel()
+
+                    task_group.start_soon(wrap, partial(self._send_chunked_parts, send))
+                    await wrap(partial(self._listen_for_disconnect, receive))
+        finally:
+            if self.session is not None:
+                self.session.close()
+
+    async def _throttle(self, amount: int) -> None:
+        if self.session is not None:
+            await self.session.consume(amount)
+
+    async def _send_parts(self, send: Send, send_range) -> None:
+        """Отправляет части тела; send_range(send, start, length, more_body)."""
+        for index, (prefix, start, length) in enumerate(self.parts):
+            if prefix:
+                await send(
+                    {"type": "http.response.body", "body": prefix, "more_body": True}
+                )
+            last = index == len(self.parts) - 1 and not self.epilogue
+            if self.layout is None:
+                await send_range(send, start, length, not last)
+            else:
+                await self._send_mapped(send, send_range, start, length, not last)
+        if self.epilogue:
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": self.epilogue,
+                    "more_body": False,
+                }
+            )
+
+    async def _send_mapped(
+        self, send: Send, send_range, start: int, length: int, more_body: bool
+    ) -> None:
+        """Отправляет диапазон виртуальной раскладки по кускам layout.map."""
+        pieces = list(self.layout.map(start, length))
+        if not pieces and not more_body:
+            await send({"type": "http.response.body", "more_body": False})
+        for index, (source, size) in enumerate(pieces):
+            piece_more = more_body or index < len(pieces) - 1
+            if isinstance(source, bytes):
+                await self._throttle(size)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": source,
+                        "more_body": piece_more,
+                    }
+                )
+            else:
+                await send_range(send, source, size, piece_more)
+
+    async def _send_zerocopy(
+        self, file: BinaryIO, send: Send, start: int, length: int, more_body: bool
+    ) -> None:
+        # С лимитом полосы файл отдаётся кусками по STREAM_CHUNK_SIZE
+        step = length if self.session is None else cfg.STREAM_CHUNK_SIZE
+        offset, end = start, start + length
+        while True:
+            count = min(step, end - offset)
+            await self._throttle(count)
+            await send(
+                {
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": more_body or offset + count < end,
+                }
+            )
+            offset += count
+            if offset >= end:
+                return
+
+    async def _listen_for_disconnect(self, receive: Receive) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    async def _send_chunked_parts(self, send: Send) -> None:
+        regions: list[Region] = []
+        if self.cache_key is not None and block_cache.enabled:
+            regions = await block_cache.hot_regions(
+                self.cache_key, self.path, self.file_size
+            )
+        loop = asyncio.get_running_loop()
+        fd = await loop.run_in_executor(
+            _get_executor(), os.open, self.path, os.O_RDONLY
+        )
+        # Последнее чтение: дескриптор закрывается только после его завершения
+        reading: Future[bytes] | None = None
+
+        async def send_cached(start: int, end: int, more_body: bool) -> None:
+            block = cfg.BLOCK_CACHE_BLOCK_SIZE
+            pos = start
+            while pos < end:
+                index = pos // block
+                data = await block_cache.read(self.cache_key, self.path, index)
+                chunk = data[pos - index * block : end - index * block]
+                if not chunk:
+                    # Файл укоротился: дочитываем остаток напрямую
+                    await send_direct(pos, end, more_body)
+                    return
+                pos += len(chunk)
+                await self._throttle(len(chunk))
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body or pos < end,
+                    }
+                )
+
+        async def send_direct(start: int, end: int, more_body: bool) -> None:
+            nonlocal reading
+            if hasattr(os, "posix_fadvise"):
+                with contextlib.suppress(OSError):
+                    os.posix_fadvise(fd, start, end - start, os.POSIX_FADV_SEQUENTIAL)
+            executor = _get_executor()
+            chunk_size = cfg.STREAM_CHUNK_SIZE
+            offset, remaining = start, end - start
+            reading = executor.submit(os.pread, fd, min(chunk_size, remaining), offset)
+            while remaining > 0:
+                data = await asyncio.wrap_future(reading)
+                if not data:
+                    # Файл укоротился после ответа с Content-Length
+                    break
+                offset += len(data)
+                remaining -= len(data)
+                if remaining > 0:
+                    reading = executor.submit(
+                        os.pread, fd, min(chunk_size, remaining), offset
+                    )
+                await self._throttle(len(data))
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": data,
+                        "more_body": more_body or remaining > 0,
+                    }
+                )
+            if not more_body and remaining > 0:
+                await send({"type": "http.response.body", "more_body": False})
+
+        async def send_range(
+            send: Send, start: int, length: int, more_body: bool
+        ) -> None:
+            """Делит диапазон на отрезки из кэша блоков и чтение с диска."""
+            end = start + length
+            if length == 0:
+                if not more_body:
+                    await send({"type": "http.response.body", "more_body": False})
+                return
+            pos = start
+            while pos < end:
+                region = next((r for r in regions if r[1] > pos), None)
+                if region is not None and region[0] <= pos:
+                    segment_end, cached = min(end, region[1]), True
+                else:
+                    segment_end = min(end, region[0]) if region else end
+                    cached = False
+                segment_more = more_body or segment_end < end
+                if cached:
+                    await send_cached(pos, segment_end, segment_more)
+                else:
+                    await send_direct(pos, segment_end, segment_more)
+                pos = segment_end
+
+        try:
+            await self._send_parts(send, send_range)
+        finally:
+            if reading is None:
+                os.close(fd)
+            else:
+                # Срабатывает и при отключении клиента посреди чтения
+                reading.add_done_callback(lambda _: os.close(fd))
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,203 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+
+from app.backend import crud
+from app.backend.config import cfg
+from app.backend.schemas import CacheStats, Suggestion, SuggestionKind
+
+logger = logging.getLogger(__name__)
+
+# Ключ — название от начала слова до конца, но не длиннее этого: более
+# длинный префикс сравнивается по первым MAX_KEY_CHARS символам
+MAX_KEY_CHARS = 64
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Запись индекса: (ключ, вид, id)
+IndexKey = tuple[str, str, int]
+EntryKey = tuple[str, int]
+
+
+def normalize_title(text: str) -> str:
+    """Название без регистра, ё и знаков препинания: слова через один пробел."""
+    return _NON_WORD.sub(" ", text.casefold().replace("ё", "е")).strip()
+
+
+def _title_keys(title: str) -> tuple[str, list[str]]:
+    """Ключ от начала названия и ключи от начала остальных слов."""
+    text = normalize_title(title)
+    starts = [index + 1 for index, char in enumerate(text) if char == " "]
+    return text[:MAX_KEY_CHARS], [text[i : i + MAX_KEY_CHARS] for i in starts]
+
+
+class SuggestIndex:
+    """
+    Префиксный индекс названий видео и плейлистов одного процесса uvicorn.
+
+    Ключи названий (от начала названия и от начала каждого следующего слова)
+    лежат в двух отсортированных списках, префикс запроса ищется двоичным
+    поиском; совпадения с началом названия идут первыми. Индекс сверяется
+    с поколением каталога (catalog_state) в фоне, не чаще раза
+    в SUGGEST_REFRESH_SECONDS, так что подсказка не ждёт БД; при изменениях
+    из БД читаются и перестраиваются только изменившиеся названия (по журналу
+    catalog_changes).
+    """
+
+    def __init__(self) -> None:
+        self._titles: dict[EntryKey, str] = {}
+        self._starts: list[IndexKey] = []
+        self._words: list[IndexKey] = []
+        self._version: int | None = None
+        self._checked = 0.0
+        self._refreshing: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, entry: EntryKey, title: str) -> None:
+        start, words = _title_keys(title)
+        for keys, key in [(self._starts, start)] + [(self._words, w) for w in words]:
+            index = bisect.bisect_left(keys, (key, *entry))
+            if index < len(keys) and keys[index] == (key, *entry):
+                del keys[index]
+
+    def _insert(self, entry: EntryKey, title: str) -> None:
+        start, words = _title_keys(title)
+        bisect.insort(self._starts, (start, *entry))
+        for key in words:
+            bisect.insort(self._words, (key, *entry))
+
+    def _rebuild(self, titles: dict[EntryKey, str]) -> None:
+        starts: list[IndexKey] = []
+        words: list[IndexKey] = []
+        for entry, title in titles.items():
+            start, word_keys = _title_keys(title)
+            starts.append((start, *entry))
+            words.extend((key, *entry) for key in word_keys)
+        starts.sort()
+        words.sort()
+        self._titles, self._starts, self._words = titles, starts, words
+
+    def apply(self, titles: dict[EntryKey, str]) -> int:
+        """
+        Приводит индекс к названиям titles. Если изменилось больше десятой
+        части записей, индекс строится заново. Возвращает число изменений.
+        """
+        changed = [
+            entry
+            for entry in self._titles.keys() | titles.keys()
+            if self._titles.get(entry) != titles.get(entry)
+        ]
+        if len(changed) > len(self._titles) // 10:
+            self._rebuild(titles)
+            return len(changed)
+        for entry in changed:
+            old, new = self._titles.get(entry), titles.get(entry)
+            if old is not None:
+                self._remove(entry, old)
+            if new is not None:
+                self._insert(entry, new)
+        self._titles = titles
+        return len(changed)
+
+    async def refresh(self) -> None:
+        """
+        Если поколение каталога изменилось, перечитывает названия, изменившиеся
+        с прошлой проверки. Все названия читаются заново только при первой
+        сборке и когда журнал изменений уже очищен дальше поколения индекса.
+        """
+        version = await crud.get_catalog_version()
+        if version == self._version:
+            return
+        delta = None
+        if self._version is not None:
+            delta = await crud.get_suggest_changes(self._version)
+        if delta is not None:
+            version, rows = delta
+            titles = dict(self._titles)
+            for row in rows:
+                entry = (row["kind"], row["id"])
+                if row["title"] is None:
+                    titles.pop(entry, None)
+                else:
+                    titles[entry] = row["title"]
+        else:
+            # Поколение читается до названий: изменение между запросами
+            # подхватит следующая проверка
+            rows = await crud.get_suggest_titles()
+            titles = {(row["kind"], row["id"]): row["title"] for row in rows}
+        changed = self.apply(titles)
+        self._version = version
+        logger.info(f"Suggest index at catalog version {version}: {changed} changes")
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Failed to refresh suggest index")
+
+    async def ensure_fresh(self) -> None:
+        """
+        Первый вызов строит индекс; дальше проверка поколения запускается
+        в фоне, а ответ строится по текущему индексу.
+        """
+        now = time.monotonic()
+        if self._refreshing is not None and not self._refreshing.done():
+            if self._version is None:
+                await asyncio.shield(self._refreshing)
+            return
+        if (
+            self._version is not None
+            and now - self._checked < cfg.SUGGEST_REFRESH_SECONDS
+        ):
+            return
+        self._checked = now
+        self._refreshing = asyncio.create_task(self._refresh_in_background())
+        if self._version is None:
+            await asyncio.shield(self._refreshing)
+
+    def search(self, query: str, limit: int) -> list[Suggestion]:
+        """Названия, одно из слов которых начинается с query (до limit штук)."""
+        prefix = normalize_title(query)[:MAX_KEY_CHARS]
+        if not prefix:
+            return []
+        found: dict[EntryKey, Suggestion] = {}
+        for keys in (self._starts, self._words):
+            index = bisect.bisect_left(keys, (prefix,))
+            while index < len(keys) and len(found) < limit:
+                key, kind, item_id = keys[index]
+                if not key.startswith(prefix):
+                    break
+                if (kind, item_id) not in found:
+                    found[kind, item_id] = Suggestion(
+                        kind=kind, id=item_id, title=self._titles[kind, item_id]
+                    )
+                index += 1
+        return list(found.values())
+
+    def stats(self) -> CacheStats:
+        return CacheStats(hits=self.hits, misses=self.misses, entries=len(self._titles))
+
+
+suggest_index = SuggestIndex()
+
+
+async def get_suggestions(query: str, limit: int) -> list[Suggestion]:
+    """
+    Подсказки к запросу по префиксному индексу процесса. Если префикс не
+    нашёлся (скорее всего, опечатка) и в запросе не меньше
+    SUGGEST_FUZZY_MIN_CHARS символов, ищутся нечёткие совпадения
+    по триграммам (pg_trgm) в БД.
+    """
+    await suggest_index.ensure_fresh()
+    suggestions = suggest_index.search(query, limit)
+    if suggestions or len(normalize_title(query)) < cfg.SUGGEST_FUZZY_MIN_CHARS:
+        suggest_index.hits += 1
+        return suggestions
+    suggest_index.misses += 1
+    return [
+        Suggestion(kind=SuggestionKind(row["kind"]), id=row["id"], title=row["title"])
+        for row in await crud.suggest_titles_fuzzy(query, limit)
+    ]
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import stat
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.backend.config import cfg
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm")
+TRANSCRIPTION_SUFFIX = ".md"
+
+
+def _to_int64(value: int) -> int:
+    """Приводит беззнаковое 64-битное значение (inode) к диапазону BIGINT."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+@dataclass(frozen=True, slots=True)
+class FileSignature:
+    """Сигнатура файла: если она не изменилась, файл не перечитывается."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def from_stat(cls, st: os.stat_result) -> "FileSignature":
+        return cls(size=st.st_size, mtime_ns=st.st_mtime_ns, inode=_to_int64(st.st_ino))
+
+
+def stat_file(path: Path) -> FileSignature | None:
+    """Возвращает сигнатуру обычного файла или None, если файла нет."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return FileSignature.from_stat(st)
+
+
+@dataclass(frozen=True, slots=True)
+class WalkedVideo:
+    """Видеофайл, найденный обходом, вместе с транскрипцией из той же папки."""
+
+    path: Path
+    signature: FileSignature
+    transcription_path: Path | None = None
+    transcription_signature: FileSignature | None = None
+
+
+@dataclass(slots=True)
+class WalkedFolder:
+    """Папка с видео: из неё получается плейлист."""
+
+    path: str
+    videos: list[WalkedVideo] = field(default_factory=list)
+
+
+def describe_video(path: Path) -> WalkedVideo | None:
+    """Описание одного видеофайла для точечного обновления (без обхода папки)."""
+    if path.suffix not in VIDEO_EXTENSIONS:
+        return None
+    signature = stat_file(path)
+    if signature is None:
+        return None
+    transcription_path = path.with_suffix(TRANSCRIPTION_SUFFIX)
+    transcription_signature = stat_file(transcription_path)
+    return WalkedVideo(
+        path=path,
+        signature=signature,
+        transcription_path=transcription_path if transcription_signature else None,
+        transcription_signature=transcription_signature,
+    )
+
+
+def _entry_signature(entry: os.DirEntry) -> FileSignature | None:
+    """Сигнатура обычного файла по DirEntry без повторного обращения по пути."""
+    try:
+        if not entry.is_file():
+            return None
+        return FileSignature.from_stat(entry.stat())
+    except OSError:
+        return None
+
+
+def _scan_directory(path: str) -> tuple[WalkedFolder, list[str]]:
+    """
+    Читает одну директорию: видео с транскрипциями и список подпапок.
+    Выполняется в пуле потоков, чтобы не блокировать event loop.
+    """
+    folder = WalkedFolder(path=path)
+    subdirs: list[str] = []
+    videos: list[tuple[os.DirEntry, FileSignature]] = []
+    transcriptions: dict[str, os.DirEntry] = {}
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                except OSError:
+                    continue
+                stem, suffix = os.path.splitext(entry.name)
+                if suffix == TRANSCRIPTION_SUFFIX:
+                    transcriptions[stem] = entry
+                elif suffix in VIDEO_EXTENSIONS:
+                    signature = _entry_signature(entry)
+                    if signature is not None:
+                        videos.append((entry, signature))
+    except OSError as e:
+        logger.warning(f"Cannot read directory '{path}': {e}")
+        return folder, subdirs
+
+    for entry, signature in videos:
+        transcription = transcriptions.get(os.path.splitext(entry.name)[0])
+        transcription_signature = (
+            _entry_signature(transcription) if transcription else None
+        )
+        folder.videos.append(
+            WalkedVideo(
+                path=Path(entry.path),
+                signature=signature,
+                transcription_path=(
+                    Path(transcription.path) if transcription_signature else None
+                ),
+                transcription_signature=transcription_signature,
+            )
+        )
+    return folder, subdirs
+
+
+async def walk_library(root: Path | None = None) -> AsyncIterator[WalkedFolder]:
+    """
+    Обходит дерево видео за один проход и отдаёт папки с видео по мере чтения.
+
+    Каждая поддиректория читается os.scandir в отдельной задаче пула потоков
+    (SCAN_WALK_WORKERS), данные stat берутся из DirEntry. Папки без видео
+    не отдаются.
+    """
+    root = root or Path(cfg.VIDEOS_DIR)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(
+        max_workers=cfg.SCAN_WALK_WORKERS, thread_name_prefix="scan-walk"
+    )
+    pending = {loop.run_in_executor(executor, _scan_directory, str(root))}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                folder, subdirs = future.result()
+                for subdir in subdirs:
+                    pending.add(loop.run_in_executor(executor, _scan_directory, subdir))
+                if folder.videos:
+                    yield folder
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+from tortoise import Tortoise
+from watchfiles import Change, awatch
+
+from app.backend import crud, cues
+from app.backend.config import cfg
+from app.backend.scan_jobs import SCAN_LOCK_KEY
+from app.backend.scanner import ingest_videos
+from app.backend.walker import (
+    TRANSCRIPTION_SUFFIX,
+    VIDEO_EXTENSIONS,
+    FileSignature,
+    WalkedVideo,
+    describe_video,
+    stat_file,
+    walk_library,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-лока PostgreSQL: наблюдатель работает только в одном процессе uvicorn
+WATCH_LOCK_KEY = 0x4C46_5754
+# Как часто процесс без лока пытается стать наблюдателем (секунды)
+WATCH_LOCK_RETRY = 30.0
+# Период, с которым проверяется стабильность изменённых файлов (миллисекунды)
+WATCH_TICK_MS = 1000
+# Как часто наблюдатель чистит журнал изменений каталога между сканированиями
+# (секунды)
+CHANGES_PRUNE_INTERVAL = 3600.0
+
+
+def _is_relevant(change: Change, path: str) -> bool:
+    suffix = Path(path).suffix
+    if suffix in VIDEO_EXTENSIONS or suffix == TRANSCRIPTION_SUFFIX:
+        return True
+    # Папки: появление или исчезновение целого каталога (перенос сезона и т.п.).
+    # Фильтр работает в цикле событий, поэтому в ФС не ходит: берутся все
+    # появления и удаления, а папка это или нет, выясняет _apply в пуле потоков
+    return change != Change.modified
+
+
+def _describe_paths(
+    paths: list[str],
+) -> tuple[dict[Path, WalkedVideo], list[Path], list[str]]:
+    """
+    Разбирает пачку изменённых путей (в пуле потоков: здесь обращения к ФС):
+    описания видео, папки для обхода и пропавшие пути.
+    """
+    videos: dict[Path, WalkedVideo] = {}
+    folders: list[Path] = []
+    removed: list[str] = []
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            folders.append(path)
+            continue
+        if path.suffix == TRANSCRIPTION_SUFFIX:
+            # Изменилась транскрипция: перезаписываем видео с тем же именем
+            candidates = [path.with_suffix(ext) for ext in VIDEO_EXTENSIONS]
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            video = describe_video(candidate)
+            if video is not None:
+                videos[candidate] = video
+        if not path.exists():
+            # Удалён файл или целая папка: убираем видео по пути и под ним
+            removed.append(raw_path)
+    return videos, folders, removed
+
+
+class _PendingPath:
+    """Изменённый путь, ожидающий, пока файл перестанет меняться."""
+
+    __slots__ = ("changed_at", "checked", "signature")
+
+    def __init__(self) -> None:
+        self.signature: FileSignature | None = None
+        self.checked = False
+        self.changed_at = time.monotonic()
+
+
+class LibraryWatcher:
+    """
+    Следит за VIDEOS_DIR и точечно обновляет видео и плейлисты в БД.
+
+    События inotify (через watchfiles) накапливаются по путям; путь
+    обрабатывается, когда с последнего события прошло WATCH_STABLE_SECONDS
+    и сигнатура файла (размер, mtime, inode) не изменилась между проверками —
+    так копирование большого файла даёт одну запись в БД, а не сотни.
+    """
+
+    def __init__(self) -> None:
+        self.root = Path(cfg.VIDEOS_DIR)
+        self.pending: dict[str, _PendingPath] = {}
+        self.stop_event = asyncio.Event()
+        self.pruned_at: float | None = None
+
+    def _collect(self, changes: set[tuple[Change, str]]) -> None:
+        for change, path in changes:
+            if _is_relevant(change, path):
+                entry = self.pending.setdefault(path, _PendingPath())
+                entry.changed_at = time.monotonic()
+
+    def _take_stable(self) -> list[str]:
+        """Возвращает пути, которые не менялись последние WATCH_STABLE_SECONDS."""
+        now = time.monotonic()
+        stable: list[str] = []
+        for path, entry in list(self.pending.items()):
+            if now - entry.changed_at < cfg.WATCH_STABLE_SECONDS:
+                continue
+            signature = stat_file(Path(path))
+            if not entry.checked or signature != entry.signature:
+                # Файл ещё пишется (или проверяется впервые): ждём следующего периода.
+                # Удалённые пути тоже ждут, чтобы попасть в одну пачку с новым путём
+                # при переименовании
+                entry.signature = signature
+                entry.checked = True
+                entry.changed_at = now
+                continue
+            stable.append(path)
+            del self.pending[path]
+        return stable
+
+    async def _apply(self, paths: list[str]) -> None:
+        loop = asyncio.get_running_loop()
+        videos, folders, removed = await loop.run_in_executor(
+            None, _describe_paths, paths
+        )
+        for folder_path in folders:
+            async for folder in walk_library(folder_path):
+                videos.update((video.path, video) for video in folder.videos)
+
+        # Переименование приходит как удаление и создание: если новый файл
+        # совпадает по отпечатку с удалённым, запись переносится с прежним id
+        orphans = await crud.get_videos_by_path(removed)
+        written, moved = await ingest_videos(list(videos.values()), orphans)
+        deleted = await crud.prune_videos(
+            [row["id"] for row in orphans if row["id"] not in moved]
+        )
+        playlists_deleted = (
+            await crud.delete_empty_playlists() if deleted or moved else 0
+        )
+        # Субтитры новых и изменившихся видео; правки одних .vtt в
+        # TRANSCRIPTIONS_DIR подхватит следующее сканирование
+        cues_updated = await cues.sync_cues(
+            await crud.get_cue_manifest([str(path) for path in videos])
+        )
+        logger.info(
+            f"Watcher applied changes: upserted={written} moved={len(moved)} "
+            f"deleted={deleted} playlists_deleted={playlists_deleted} "
+            f"cues_updated={cues_updated}"
+        )
+
+    async def _prune_changes(self) -> None:
+        """
+        Раз в CHANGES_PRUNE_INTERVAL удаляет старые записи журнала изменений
+        каталога: без полного сканирования их больше некому чистить.
+        """
+        now = time.monotonic()
+        if self.pruned_at is not None and now - self.pruned_at < CHANGES_PRUNE_INTERVAL:
+            return
+        self.pruned_at = now
+        try:
+            pruned = await crud.prune_catalog_changes()
+        except Exception:
+            logger.exception("Watcher failed to prune catalog changes")
+            return
+        if pruned:
+            logger.info(f"Watcher pruned {pruned} catalog changes")
+
+    async def _watch(self) -> None:
+        async for changes in awatch(
+            self.root,
+            watch_filter=_is_relevant,
+            stop_event=self.stop_event,
+            rust_timeout=WATCH_TICK_MS,
+            yield_on_timeout=True,
+            force_polling=cfg.WATCH_FORCE_POLLING,
+        ):
+            self._collect(changes)
+            await self._prune_changes()
+            stable = self._take_stable()
+            if not stable:
+                continue
+            try:
+                await self._apply_exclusive(stable)
+            except Exception:
+                logger.exception("Watcher failed to apply changes")
+
+    async def _apply_exclusive(self, paths: list[str]) -> None:
+        """
+        Применяет пачку под advisory-локом сканирования: сканер строит манифест
+        заранее и не должен пересекаться с правками наблюдателя. Пока идёт
+        сканирование, пути возвращаются в очередь и повторяются позже.
+        """
+        connection = Tortoise.get_connection("default")
+        async with connection.acquire_connection() as conn:
+            locked = await conn.fetchval(
+                "SELECT pg_try_advisory_lock($1)", SCAN_LOCK_KEY
+            )
+            if not locked:
+                logger.info(f"Scan in progress, postponing {len(paths)} changes")
+                for path in paths:
+                    self.pending.setdefault(path, _PendingPath())
+                return
+            try:
+                await self._apply(paths)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", SCAN_LOCK_KEY)
+
+    async def run(self) -> None:
+        """
+        Пытается захватить advisory-лок и, захватив, следит за файлами
+        до остановки. Процессы без лока периодически повторяют попытку.
+        """
+        connection = Tortoise.get_connection("default")
+        while not self.stop_event.is_set():
+            try:
+                async with connection.acquire_connection() as conn:
+                    locked = await conn.fetchval(
+                        "SELECT pg_try_advisory_lock($1)", WATCH_LOCK_KEY
+                    )
+                    if locked:
+                        logger.info(f"Watching '{self.root}' for changes")
+                        try:
+                            await self._watch()
+                        finally:
+                            await conn.execute(
+                                "SELECT pg_advisory_unlock($1)", WATCH_LOCK_KEY
+                            )
+            except Exception:
+                logger.exception("Watcher stopped with error")
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), WATCH_LOCK_RETRY)
+            except TimeoutError:
+                pass
+
+
+_watcher: LibraryWatcher | None = None
+_task: asyncio.Task | None = None
+
+
+def start() -> None:
+    """Запускает наблюдателя в фоне (вызывается из lifespan)."""
+    global _watcher, _task
+    _watcher = LibraryWatcher()
+    _task = asyncio.create_task(_watcher.run())
+
+
+async def stop() -> None:
+    if _watcher is None or _task is None:
+        return
+    _watcher.stop_event.set()
+    await asyncio.gather(_task, return_exceptions=True)
@@ -89,17 +89,47 @@ let previewTimeout = null;
 let currentPreviewVideo = null;
 
 /**
- * Количество пропущенных видео при пагинации.
+ * Пауза в наборе (мс), после которой запрашиваются подсказки поиска.
+ * @constant {number}
+ */
+const SUGGEST_DELAY_MS = 150;
+
+/**
+ * Таймер отложенного запроса подсказок.
+ * @type {number|null}
+ */
+let suggestTimer = null;
+
+/**
+ * Контроллер отмены текущего запроса подсказок.
+ * @type {AbortController|null}
+ */
+let suggestController = null;
+
+/**
+ * Сколько видео из allVideos уже отрисовано во вкладке «Все видео».
  * @type {number}
  */
-let skip=0;
+let renderedCount = 0;
 
 /**
- * Лимит видео за один запрос.
+ * Сколько видео дорисовывать за раз при прокрутке.
  * @constant {number}
  */
 const limit=20;
 
+/**
+ * Ключ localStorage с копией каталога: { version, fields, videos, playlists }.
+ * @constant {string}
+ */
+const CATALOG_STORAGE_KEY = 'catalog';
+
+/**
+ * Поля видео, которые нужны карточкам и фильтру (параметр fields каталога).
+ * @constant {string}
+ */
+const CATALOG_FIELDS = 'id,title,playlist_id';
+
 /**
  * Флаг загрузки видео.
  * @type {boolean}
@@ -133,8 +163,8 @@ document.addEventListener('DOMContentLoaded', function() {
     if (params.playlist) {
         console.log('Playlist param detected, setting currentView to playlist_detail');
         currentView = 'playlist_detail';
-        // Загружаем плейлисты, затем показываем нужный
-        fetchPlaylists().then(() => {
+        // Загружаем каталог, затем показываем нужный плейлист
+        loadCatalog().then(() => {
             console.log('Playlists fetched, calling showPlaylistVideos for', params.playlist);
             // Небольшая задержка для гарантии, что DOM готов
             setTimeout(() => showPlaylistVideos(params.playlist), 0);
@@ -145,9 +175,8 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     } else {
         console.log('No playlist param, loading videos and playlists as usual');
-        // Нет playlist, загружаем видео и плейлисты как обычно
-        fetchVideos();
-        fetchPlaylists();
+        // Нет playlist, загружаем каталог как обычно
+        loadCatalog();
         // Обрабатываем параметр video (если есть)
         if (params.video) {
             setTimeout(() => playVideo(params.video, params.t), 500);
@@ -175,7 +204,7 @@ function initInfiniteScroll() {
     const observer = new IntersectionObserver((entries) => {
 
         if (entries[0].isIntersecting && !isLoading && hasMore && currentView=='all')  {
-            fetchVideos();
+            renderMoreVideos();
         }
     }, options);
     observer.observe(loaderAnchor);
@@ -198,64 +227,65 @@ function closeScanModal() {
 }
 
 /**
- * Сканирует и загружает видео с сервера.
- * Показывает индикатор загрузки, отправляет POST-запрос и обновляет интерфейс.
+ * Запускает фоновое сканирование видео на сервере.
+ * Показывает прогресс из потока событий задания и обновляет интерфейс по завершении.
+ * Если сканирование уже идёт, подключается к выполняющемуся заданию.
  * @async
  */
 async function scanAndLoadVideos() {
     closeScanModal();
     const container = document.getElementById('video-container');
     if (container) {
-        container.innerHTML = '<div class="loader"></div>';
+        container.innerHTML = '<div class="loader"></div><p class="scan-progress"></p>';
     }
-    
+
     try {
         const response = await fetch(`${BACKEND_URL}/videos/scan-and-load/`, { method: 'POST' });
         const data = await response.json();
-        alert(t('messages.videosLoaded', { count: data.length }));
-        fetchVideos();
-        fetchPlaylists();
+        const jobId = response.status === 409 ? data.detail.job_id : data.id;
+        if (!jobId) throw new Error(`Unexpected scan response: ${response.status}`);
+        followScanJob(jobId);
     } catch (error) {
         console.error(t('errors.scanLoad'), error);
         alert(t('errors.scanLoadDetails'));
-        fetchVideos();
+        loadCatalog();
     }
 }
 
 /**
- * Загружает видео с сервера с пагинацией.
- * Обновляет состояние загрузки, добавляет новые видео в allVideos и отрисовывает их.
- * @async
+ * Подписывается на поток событий задания сканирования.
+ * @param {number} jobId - ID задания сканирования.
  */
-async function fetchVideos() {
-    if (isLoading || !hasMore || currentView !== 'all') return;
-    isLoading=true;
-    
-    const loader = document.getElementById('row-loader');
-    if (loader) loader.classList.add('loading');
-    
-    try {
-        const response = await fetch(`${BACKEND_URL}/videos/?skip=${skip}&limit=${limit}`);
-        const newVideos = await response.json();
-        
-        if (newVideos.length < limit) {
-            hasMore = false;
-        }
-        if (newVideos.length > 0) {
-            renderItems(newVideos, 'video', true);
-            allVideos.push(...newVideos);
-            skip += newVideos.length;
-        }
-    } catch (error) {
-        console.error(t('errors.loadVideos'), error);
-        const row = document.getElementById('video-row');
-        if (row && skip === 0) {
-            row.innerHTML = `<p class="no-videos">${t('errors.loadVideos')}</p>`;
+function followScanJob(jobId) {
+    const events = new EventSource(`${BACKEND_URL}/scan-jobs/${jobId}/events`);
+    events.addEventListener('progress', (event) => {
+        const job = JSON.parse(event.data);
+        const progress = document.querySelector('.scan-progress');
+        if (progress) progress.textContent = t('messages.scanProgress', { ...job, eta_seconds: job.eta_seconds ?? '?' });
+    });
+    events.addEventListener('end', (event) => {
+        events.close();
+        const job = JSON.parse(event.data);
+        if (job.status === 'finished') {
+            alert(t('messages.videosLoaded', job));
+        } else {
+            console.error(t('errors.scanLoad'), job.status, job.error);
+            alert(t('errors.scanLoadDetails'));
         }
-    } finally {
-        isLoading=false;
-        if(loader) loader.classList.remove('loading');
-    }
+        loadCatalog();
+    });
+}
+
+/**
+ * Дорисовывает во вкладке «Все видео» следующие limit видео из allVideos.
+ * Каталог уже в памяти, поэтому прокрутка не обращается к серверу.
+ */
+function renderMoreVideos() {
+    if (currentView !== 'all') return;
+    const page = allVideos.slice(renderedCount, renderedCount + limit);
+    renderItems(page, 'video', renderedCount > 0);
+    renderedCount += page.length;
+    hasMore = renderedCount < allVideos.length;
 }
 
 /**
@@ -277,15 +307,151 @@ async function fetchVideo(videoId) {
 }
 
 /**
- * Загружает список плейлистов с сервера и сохраняет в allPlaylists.
+ * Загружает текст транскрипции видео (браузер перепроверяет его по ETag).
  * @async
+ * @param {number} videoId - ID видео.
+ * @returns {Promise<string|null>} Текст транскрипции или null.
  */
-async function fetchPlaylists() {
+async function fetchTranscript(videoId) {
     try {
-        const response = await fetch(`${BACKEND_URL}/playlists/`);
-        allPlaylists = await response.json();
+        const response = await fetch(`${BACKEND_URL}/videos/${videoId}/transcript`);
+        return response.ok ? await response.text() : null;
     } catch (error) {
-        console.error('Error fetching playlists:', error);
+        console.error(t('errors.loadVideo'), error);
+        return null;
+    }
+}
+
+/**
+ * Ключ естественной сортировки названия: числа дополняются нулями до одной
+ * ширины, как в SQL-функции natural_sort_key (колонка sort_key на сервере).
+ * @param {string} name - Название.
+ * @returns {string} Ключ для посимвольного сравнения.
+ */
+function naturalSortKey(name) {
+    return name.replace(/[0-9]+/g, (digits) => {
+        const value = digits.replace(/^0+/, '');
+        return value.padStart(Math.max(20, value.length), '0');
+    });
+}
+
+/**
+ * Сортирует плейлисты в том же естественном порядке, что и сервер.
+ * @param {Array<Object>} playlists - Плейлисты.
+ * @returns {Array<Object>} Отсортированный массив.
+ */
+function sortPlaylists(playlists) {
+    return playlists
+        .map(playlist => [naturalSortKey(playlist.name), playlist])
+        .sort(([a, p], [b, q]) => (a < b ? -1 : a > b ? 1 : p.id - q.id))
+        .map(([, playlist]) => playlist);
+}
+
+/**
+ * Применяет к копии каталога ответ /catalog/changes.
+ * @param {Object} catalog - Копия каталога { version, videos, playlists }.
+ * @param {Object} delta - Изменения: новые и изменённые строки, id удалённых.
+ */
+function applyCatalogChanges(catalog, delta) {
+    const merge = (items, changed, deleted) => {
+        const byId = new Map(items.map(item => [item.id, item]));
+        deleted.forEach(id => byId.delete(id));
+        changed.forEach(item => byId.set(item.id, item));
+        return [...byId.values()];
+    };
+    catalog.videos = merge(catalog.videos, delta.videos, delta.deleted_videos)
+        .sort((a, b) => a.id - b.id);
+    catalog.playlists = sortPlaylists(
+        merge(catalog.playlists, delta.playlists, delta.deleted_playlists)
+    );
+    catalog.version = delta.version;
+}
+
+/**
+ * Читает копию каталога из localStorage.
+ * @returns {Object|null} Каталог или null, если копии нет или она с другими полями.
+ */
+function readStoredCatalog() {
+    try {
+        const catalog = JSON.parse(localStorage.getItem(CATALOG_STORAGE_KEY));
+        return catalog && catalog.fields === CATALOG_FIELDS ? catalog : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+/**
+ * Сохраняет копию каталога в localStorage (если хватает места).
+ * @param {Object} catalog - Каталог { version, fields, videos, playlists }.
+ */
+function storeCatalog(catalog) {
+    try {
+        localStorage.setItem(CATALOG_STORAGE_KEY, JSON.stringify(catalog));
+    } catch (error) {
+        // Квота исчерпана: при следующем визите каталог придёт снимком
+        localStorage.removeItem(CATALOG_STORAGE_KEY);
+        console.warn('Catalog is too large for localStorage:', error);
+    }
+}
+
+/**
+ * Загружает каталог (все видео и плейлисты) в allVideos и allPlaylists.
+ * При первом визите запрашивается сжатый снимок /catalog/snapshot, дальше —
+ * только изменения после сохранённого поколения (/catalog/changes); если
+ * сервер их уже не помнит (410), снова запрашивается снимок.
+ * @async
+ */
+async function loadCatalog() {
+    isLoading = true;
+    const loader = document.getElementById('row-loader');
+    if (loader) loader.classList.add('loading');
+
+    let catalog = readStoredCatalog();
+    try {
+        if (catalog) {
+            const response = await fetch(
+                `${BACKEND_URL}/catalog/changes?since=${catalog.version}&fields=${CATALOG_FIELDS}`
+            );
+            if (response.status === 410) {
+                catalog = null;
+            } else if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            } else {
+                const delta = await response.json();
+                if (delta.version !== catalog.version) {
+                    applyCatalogChanges(catalog, delta);
+                    storeCatalog(catalog);
+                }
+            }
+        }
+        if (!catalog) {
+            const response = await fetch(`${BACKEND_URL}/catalog/snapshot?fields=${CATALOG_FIELDS}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            catalog = { ...await response.json(), fields: CATALOG_FIELDS };
+            storeCatalog(catalog);
+        }
+    } catch (error) {
+        // Без сети показываем сохранённую копию, если она есть
+        console.error(t('errors.loadVideos'), error);
+    } finally {
+        isLoading = false;
+        if (loader) loader.classList.remove('loading');
+    }
+
+    if (!catalog) {
+        const row = document.getElementById('video-row');
+        if (row && allVideos.length === 0) {
+            row.innerHTML = `<p class="no-videos">${t('errors.loadVideos')}</p>`;
+        }
+        return;
+    }
+    allVideos = catalog.videos;
+    allPlaylists = catalog.playlists;
+    renderedCount = 0;
+    if (currentView === 'all') {
+        renderMoreVideos();
+    } else if (currentView === 'playlists') {
+        renderItems(allPlaylists, 'playlist', false);
     }
 }
 
@@ -550,7 +716,8 @@ async function playVideo(videoId, startTime = 0) {
     
     modal.classList.add('active');
     srt.innerHTML='';
-    if (video.transcription) {
+    const transcription = video.has_transcription ? await fetchTranscript(videoId) : null;
+    if (transcription) {
         const fragments = document.createDocumentFragment();
         /* Регулярное выражение:
         // (?:^|\n)  - начало строки ИЛИ перенос строки (чтобы поймать первый таймкод или последующие)
@@ -562,7 +729,7 @@ async function playVideo(videoId, startTime = 0) {
         // \s+       - один или более пробелов после времени
         */
         const regex = /(?:^|\n)(?=\d{1,2}:\d{2}(?::\d{2})?\s+)/;
-        video.transcription.split(regex).forEach(
+        transcription.split(regex).forEach(
             chapter => {
                 const timestamp = extractTimestamp(chapter);                
                 const paragraph = document.createElement('p');
@@ -878,10 +1045,16 @@ const heroSearchInput = document.getElementById('hero-search-input');
 if (heroSearchInput) {
     heroSearchInput.addEventListener('keypress', function(e) {
         if (e.key === 'Enter') {
+            closeHeroResults();
             heroSearch();
         }
     });
 
+    heroSearchInput.addEventListener('input', function() {
+        clearTimeout(suggestTimer);
+        suggestTimer = setTimeout(() => fetchSuggestions(heroSearchInput.value), SUGGEST_DELAY_MS);
+    });
+
     heroSearchInput.addEventListener('blur', function() {
         setTimeout(() => {
             const heroResults = document.getElementById('hero-results');
@@ -897,9 +1070,50 @@ if (heroSearchInput) {
     });
 }
 
+/**
+ * Загружает подсказки к строке поиска и показывает их под полем ввода.
+ * Предыдущий незавершённый запрос подсказок отменяется.
+ * @param {string} query - Набранный текст.
+ */
+function fetchSuggestions(query) {
+    const heroResults = document.getElementById('hero-results');
+    if (suggestController) suggestController.abort();
+    if (!query.trim()) {
+        heroResults.innerHTML = '';
+        closeHeroResults();
+        return;
+    }
+    suggestController = new AbortController();
+    fetch(`${BACKEND_URL}/suggest/?query=${encodeURIComponent(query)}`, { signal: suggestController.signal })
+        .then(response => response.json())
+        .then(suggestions => {
+            heroResults.innerHTML = '';
+            suggestions.forEach(suggestion => {
+                const item = document.createElement('div');
+                item.className = 'hero-result-item';
+                item.innerHTML = '<div class="hero-result-title"></div>';
+                item.querySelector('.hero-result-title').textContent =
+                    suggestion.kind === 'playlist' ? `📁 ${suggestion.title}` : suggestion.title;
+                item.addEventListener('mousedown', () => {
+                    closeHeroResults();
+                    if (suggestion.kind === 'playlist') {
+                        showPlaylistVideos(suggestion.id);
+                    } else {
+                        playVideo(suggestion.id);
+                    }
+                });
+                heroResults.appendChild(item);
+            });
+            heroResults.classList.toggle('active', suggestions.length > 0);
+        })
+        .catch(error => {
+            if (error.name !== 'AbortError') console.error('Suggest error:', error);
+        });
+}
+
 /**
  * Выполняет поиск видео по запросу и отображает результаты.
- * Уменьшает герой-секцию, показывает секцию результатов и загружает данные с сервера.
+ * Уменьшает герой-секцию, показывает секцию результатов и загружает первую страницу.
  */
 function heroSearch() {
     const query = document.getElementById('hero-search-input').value;
@@ -915,18 +1129,41 @@ function heroSearch() {
     resultsList.innerHTML = '<div style="padding: 20px; text-align: center;">Searching...</div>';
     resultsSection.classList.add('active');
 
-    fetch(`${BACKEND_URL}/search/?query=${encodeURIComponent(query)}`)
+    fetchSearchPage(query, null);
+}
+
+/**
+ * Загружает страницу результатов поиска и добавляет её в конец списка.
+ * Если есть следующая страница, в конце списка появляется кнопка «Показать ещё».
+ * @param {string} query - Поисковый запрос.
+ * @param {string|null} cursor - Курсор следующей страницы из ответа сервера.
+ */
+function fetchSearchPage(query, cursor) {
+    const resultsList = document.getElementById('search-results-list');
+    const resultsTitle = document.getElementById('search-results-title');
+    let url = `${BACKEND_URL}/search/?query=${encodeURIComponent(query)}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+
+    fetch(url)
         .then(response => response.json())
-        .then(results => {
-            if (results.length === 0) {
+        .then(page => {
+            if (!cursor) {
+                resultsList.innerHTML = '';
+                resultsTitle.textContent = `Search Results for "${query}" (${page.total})`;
+            }
+            resultsList.querySelector('.search-more')?.remove();
+            if (page.results.length === 0 && !cursor) {
                 resultsList.innerHTML = '<div style="padding: 20px; text-align: center; color: #aaa;">No results found</div>';
                 return;
             }
             
             const fragment = document.createDocumentFragment();
-            results.forEach(result => {
+            page.results.forEach(result => {
                 const snippet = result.snippet || '';
-                const timestamp = extractTimestamp(snippet);
+                // Совпадение в субтитрах приходит с началом реплики
+                const timestamp = result.start_seconds != null
+                    ? Math.floor(result.start_seconds)
+                    : extractTimestamp(snippet);
                 const searchResultCard = document.createElement('div');
                 searchResultCard.className = 'search-result-card';
                 searchResultCard.addEventListener('click', () => playVideo(result.id, timestamp || 0));
@@ -947,11 +1184,23 @@ function heroSearch() {
                 
                 fragment.appendChild(searchResultCard);
             });
+            if (page.next_cursor) {
+                const moreButton = document.createElement('button');
+                moreButton.className = 'search-more';
+                moreButton.textContent = t('search.more');
+                moreButton.addEventListener('click', () => {
+                    moreButton.disabled = true;
+                    fetchSearchPage(query, page.next_cursor);
+                });
+                fragment.appendChild(moreButton);
+            }
             resultsList.appendChild(fragment);
         })
         .catch(error => {
             console.error(t('errors.search'), error);
-            resultsList.innerHTML = `<div style="padding: 20px; text-align: center; color: #aaa;">${t('errors.search')}</div>`;
+            if (!cursor) {
+                resultsList.innerHTML = `<div style="padding: 20px; text-align: center; color: #aaa;">${t('errors.search')}</div>`;
+            }
         });
 }
 
@@ -987,15 +1236,9 @@ function filterCategory(category, element) {
     if (category === 'all') {
         currentView = 'all';
 
-        // Если видео уже были загружены ранее
-        if (allVideos.length > 0) {
-            renderItems(allVideos, 'video', false);
-        } else {
-            // Если массив пуст (первый запуск), вызываем загрузку
-            skip = 0;
-            hasMore = true;
-            fetchVideos();
-        }
+        // Каталог уже в памяти: начинаем отрисовку с первой порции
+        renderedCount = 0;
+        renderMoreVideos();
     } else {
         // Логика фильтрации по категориям
         currentView = 'filter';
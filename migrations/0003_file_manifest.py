@@ -0,0 +1,38 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0002_add_users")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.AddField(
+            model_name="Video",
+            name="file_size",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="file_mtime_ns",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="file_inode",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="transcription_size",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="transcription_mtime_ns",
+            field=fields.BigIntField(null=True),
+        ),
+    ]
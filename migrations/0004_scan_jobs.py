@@ -0,0 +1,37 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0003_file_manifest")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.CreateModel(
+            name="ScanJob",
+            fields=[
+                (
+                    "id",
+                    fields.IntField(
+                        generated=True, primary_key=True, unique=True, db_index=True
+                    ),
+                ),
+                ("status", fields.CharField(db_index=True, max_length=16)),
+                ("cancel_requested", fields.BooleanField(default=False)),
+                ("files_expected", fields.IntField(default=0)),
+                ("added", fields.IntField(default=0)),
+                ("changed", fields.IntField(default=0)),
+                ("unchanged", fields.IntField(default=0)),
+                ("removed", fields.IntField(default=0)),
+                ("db_writes", fields.IntField(default=0)),
+                ("error", fields.TextField(null=True, unique=False)),
+                ("started_at", fields.DatetimeField()),
+                ("finished_at", fields.DatetimeField(null=True)),
+            ],
+            options={"table": "scan_jobs", "app": "models", "pk_attr": "id"},
+            bases=["Model"],
+        ),
+    ]
@@ -0,0 +1,43 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0004_scan_jobs")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.AddField(
+            model_name="Video",
+            name="width",
+            field=fields.IntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="height",
+            field=fields.IntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="video_codec",
+            field=fields.CharField(null=True, max_length=32),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="audio_codec",
+            field=fields.CharField(null=True, max_length=32),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="bitrate",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="probe_version",
+            field=fields.SmallIntField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0005_probe_columns")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.AddField(
+            model_name="Video",
+            name="deleted_at",
+            field=fields.DatetimeField(null=True, db_index=True),
+        ),
+    ]
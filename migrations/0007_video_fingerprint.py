@@ -0,0 +1,23 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0006_video_deleted_at")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.AddField(
+            model_name="Video",
+            name="fingerprint",
+            field=fields.CharField(null=True, max_length=32),
+        ),
+        ops.AddField(
+            model_name="ScanJob",
+            name="moved",
+            field=fields.IntField(default=0),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.fields.base import OnDelete
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0007_video_fingerprint")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.CreateModel(
+            name="VideoKeyframeIndex",
+            fields=[
+                (
+                    "id",
+                    fields.IntField(
+                        generated=True, primary_key=True, unique=True, db_index=True
+                    ),
+                ),
+                (
+                    "video",
+                    fields.OneToOneField(
+                        "models.Video",
+                        source_field="video_id",
+                        db_constraint=True,
+                        to_field="id",
+                        related_name="keyframe_index",
+                        on_delete=OnDelete.CASCADE,
+                    ),
+                ),
+                ("etag", fields.CharField(max_length=64)),
+                ("timescale", fields.IntField()),
+                ("duration", fields.BigIntField()),
+                ("keyframes", fields.BinaryField()),
+            ],
+            options={
+                "table": "video_keyframe_indexes",
+                "app": "models",
+                "pk_attr": "id",
+            },
+            bases=["Model"],
+        ),
+    ]
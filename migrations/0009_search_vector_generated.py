@@ -0,0 +1,39 @@
+from typing import ClassVar
+
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0008_video_keyframe_index")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.RunSQL(
+            """
+                DROP TRIGGER IF EXISTS update_videos_search_vector_trigger ON videos;
+                DROP FUNCTION IF EXISTS update_video_search_vector();
+                """
+        ),
+        # Генерируемая колонка: вес A у названия, B у транскрипции.
+        # Таблица переписывается целиком, на большой библиотеке это займёт время
+        ops.RunSQL(
+            """
+                ALTER TABLE videos DROP COLUMN IF EXISTS search_vector;
+                ALTER TABLE videos ADD COLUMN search_vector TSVECTOR
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+                    || setweight(
+                        to_tsvector('russian', coalesce(transcription, '')), 'B'
+                    )
+                ) STORED;
+                """
+        ),
+        ops.RunSQL(
+            """
+                CREATE INDEX IF NOT EXISTS idx_videos_search_vector
+                ON videos USING GIN (search_vector);
+                """
+        ),
+    ]
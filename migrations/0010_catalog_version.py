@@ -0,0 +1,45 @@
+from typing import ClassVar
+
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0009_search_vector_generated")]
+
+    initial = False
+
+    operations: ClassVar = [
+        # Поколение каталога: растёт при любом изменении videos и playlists.
+        # По нему сбрасываются кэши всех процессов uvicorn
+        ops.RunSQL(
+            """
+                CREATE TABLE IF NOT EXISTS catalog_state (
+                    id SMALLINT PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0
+                );
+                INSERT INTO catalog_state (id, version) VALUES (1, 0)
+                ON CONFLICT (id) DO NOTHING;
+                """
+        ),
+        ops.RunSQL(
+            """
+                CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS TRIGGER AS $$
+                BEGIN
+                    UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+                """
+        ),
+        ops.RunSQL(
+            """
+                CREATE TRIGGER videos_catalog_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON videos
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+                CREATE TRIGGER playlists_catalog_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON playlists
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+                """
+        ),
+    ]
@@ -0,0 +1,73 @@
+from typing import ClassVar
+
+from tortoise import fields, migrations
+from tortoise.fields.base import OnDelete
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0010_catalog_version")]
+
+    initial = False
+
+    operations: ClassVar = [
+        ops.AddField(
+            model_name="Video",
+            name="cues_size",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.AddField(
+            model_name="Video",
+            name="cues_mtime_ns",
+            field=fields.BigIntField(null=True),
+        ),
+        ops.CreateModel(
+            name="VideoCue",
+            fields=[
+                (
+                    "id",
+                    fields.BigIntField(
+                        generated=True, primary_key=True, unique=True, db_index=True
+                    ),
+                ),
+                (
+                    "video",
+                    fields.ForeignKeyField(
+                        "models.Video",
+                        source_field="video_id",
+                        db_constraint=True,
+                        to_field="id",
+                        related_name="cues",
+                        on_delete=OnDelete.CASCADE,
+                    ),
+                ),
+                ("start_seconds", fields.FloatField()),
+                ("end_seconds", fields.FloatField()),
+                ("text", fields.TextField()),
+            ],
+            options={
+                "table": "video_cues",
+                "app": "models",
+                "pk_attr": "id",
+            },
+            bases=["Model"],
+        ),
+        # Реплики пачки удаляются по video_id, по нему же работает CASCADE
+        ops.RunSQL(
+            """
+                CREATE INDEX IF NOT EXISTS idx_video_cues_video_id
+                ON video_cues (video_id);
+                """
+        ),
+        # Вес B, как у транскрипции: ранги реплик и видео сравнимы
+        ops.RunSQL(
+            """
+                ALTER TABLE video_cues ADD COLUMN search_vector TSVECTOR
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('russian', text), 'B')
+                ) STORED;
+                CREATE INDEX IF NOT EXISTS idx_video_cues_search_vector
+                ON video_cues USING GIN (search_vector);
+                """
+        ),
+    ]
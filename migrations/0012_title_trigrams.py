@@ -0,0 +1,23 @@
+from typing import ClassVar
+
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0011_video_cues")]
+
+    initial = False
+
+    operations: ClassVar = [
+        # pg_trgm — доверенное расширение (PostgreSQL 13+), суперпользователь не нужен
+        ops.RunSQL("CREATE EXTENSION IF NOT EXISTS pg_trgm;"),
+        ops.RunSQL(
+            """
+                CREATE INDEX IF NOT EXISTS idx_videos_title_trgm
+                ON videos USING GIN (title gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS idx_playlists_name_trgm
+                ON playlists USING GIN (name gin_trgm_ops);
+                """
+        ),
+    ]
@@ -0,0 +1,52 @@
+from typing import ClassVar
+
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0012_title_trigrams")]
+
+    initial = False
+
+    operations: ClassVar = [
+        # Ключ натуральной сортировки: числа дополняются нулями до одной ширины,
+        # так что побайтовое сравнение (COLLATE "C") даёт "2" < "10"
+        ops.RunSQL(
+            """
+                CREATE OR REPLACE FUNCTION natural_sort_key(value TEXT)
+                RETURNS TEXT
+                LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+                    SELECT coalesce(string_agg(
+                        CASE WHEN part[1] ~ '^[0-9]'
+                            THEN lpad(
+                                ltrim(part[1], '0'),
+                                greatest(20, length(ltrim(part[1], '0'))),
+                                '0'
+                            )
+                            ELSE part[1]
+                        END, '' ORDER BY n
+                    ), '')
+                    FROM regexp_matches(value, '[0-9]+|[^0-9]+', 'g')
+                        WITH ORDINALITY AS t(part, n);
+                $$;
+                """
+        ),
+        # Генерируемые колонки переписывают таблицы целиком
+        ops.RunSQL(
+            """
+                ALTER TABLE playlists ADD COLUMN sort_key TEXT COLLATE "C"
+                GENERATED ALWAYS AS (natural_sort_key(name)) STORED;
+                ALTER TABLE videos ADD COLUMN sort_key TEXT COLLATE "C"
+                GENERATED ALWAYS AS (natural_sort_key(title)) STORED;
+                """
+        ),
+        ops.RunSQL(
+            """
+                CREATE INDEX IF NOT EXISTS idx_playlists_sort_key
+                ON playlists (sort_key, id);
+                CREATE INDEX IF NOT EXISTS idx_videos_playlist_sort_key
+                ON videos (playlist_id, sort_key, id) WHERE deleted_at IS NULL;
+                """
+        ),
+    ]
@@ -0,0 +1,141 @@
+from typing import ClassVar
+
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0013_natural_sort_key")]
+
+    initial = False
+
+    operations: ClassVar = [
+        # Журнал изменений каталога: какие видео и плейлисты менялись в каком
+        # поколении. changes_floor — поколение, начиная с которого журнал полон
+        # (старые записи удаляются, TRUNCATE журнал не заполняет)
+        ops.RunSQL(
+            """
+                ALTER TABLE catalog_state
+                ADD COLUMN IF NOT EXISTS changes_floor BIGINT NOT NULL DEFAULT 0;
+                UPDATE catalog_state SET changes_floor = version WHERE id = 1;
+                CREATE TABLE IF NOT EXISTS catalog_changes (
+                    version BIGINT NOT NULL,
+                    kind VARCHAR(8) NOT NULL,
+                    item_id INT NOT NULL,
+                    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+                CREATE INDEX IF NOT EXISTS idx_catalog_changes_version
+                ON catalog_changes (version);
+                """
+        ),
+        # Новое поколение и его записи журнала. Строка catalog_state остаётся
+        # заблокированной до конца транзакции, так что поколения фиксируются
+        # по порядку: читатель с поколением N видит все изменения до N
+        ops.RunSQL(
+            """
+                CREATE OR REPLACE FUNCTION record_catalog_changes(
+                    video_ids INT[], playlist_ids INT[]
+                ) RETURNS VOID AS $$
+                DECLARE
+                    new_version BIGINT;
+                BEGIN
+                    UPDATE catalog_state SET version = version + 1 WHERE id = 1
+                    RETURNING version INTO new_version;
+                    INSERT INTO catalog_changes (version, kind, item_id)
+                    SELECT new_version, 'video', unnest(video_ids)
+                    UNION ALL
+                    SELECT new_version, 'playlist', unnest(playlist_ids);
+                END;
+                $$ LANGUAGE plpgsql;
+                """
+        ),
+        # Изменение видео меняет и число видео его плейлиста (старого и нового)
+        ops.RunSQL(
+            """
+                CREATE OR REPLACE FUNCTION log_video_changes() RETURNS TRIGGER AS $$
+                DECLARE
+                    video_ids INT[];
+                    playlist_ids INT[];
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        SELECT array_agg(id), array_agg(DISTINCT playlist_id)
+                            FILTER (WHERE playlist_id IS NOT NULL)
+                        INTO video_ids, playlist_ids FROM new_rows;
+                    ELSIF TG_OP = 'UPDATE' THEN
+                        SELECT array_agg(DISTINCT id), array_agg(DISTINCT playlist_id)
+                            FILTER (WHERE playlist_id IS NOT NULL)
+                        INTO video_ids, playlist_ids FROM (
+                            SELECT id, playlist_id FROM new_rows
+                            UNION ALL
+                            SELECT id, playlist_id FROM old_rows
+                        ) AS t;
+                    ELSE
+                        SELECT array_agg(id), array_agg(DISTINCT playlist_id)
+                            FILTER (WHERE playlist_id IS NOT NULL)
+                        INTO video_ids, playlist_ids FROM old_rows;
+                    END IF;
+                    IF video_ids IS NOT NULL THEN
+                        PERFORM record_catalog_changes(video_ids, playlist_ids);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE OR REPLACE FUNCTION log_playlist_changes() RETURNS TRIGGER AS $$
+                DECLARE
+                    playlist_ids INT[];
+                BEGIN
+                    IF TG_OP = 'DELETE' THEN
+                        SELECT array_agg(id) INTO playlist_ids FROM old_rows;
+                    ELSE
+                        SELECT array_agg(id) INTO playlist_ids FROM new_rows;
+                    END IF;
+                    IF playlist_ids IS NOT NULL THEN
+                        PERFORM record_catalog_changes(NULL, playlist_ids);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE OR REPLACE FUNCTION reset_catalog_changes() RETURNS TRIGGER AS $$
+                BEGIN
+                    UPDATE catalog_state
+                    SET version = version + 1, changes_floor = version + 1
+                    WHERE id = 1;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+                """
+        ),
+        # Таблицы переходов разрешены только у триггеров на одно событие
+        ops.RunSQL(
+            """
+                DROP TRIGGER IF EXISTS videos_catalog_version ON videos;
+                DROP TRIGGER IF EXISTS playlists_catalog_version ON playlists;
+
+                CREATE TRIGGER videos_catalog_insert AFTER INSERT ON videos
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_video_changes();
+                CREATE TRIGGER videos_catalog_update AFTER UPDATE ON videos
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_video_changes();
+                CREATE TRIGGER videos_catalog_delete AFTER DELETE ON videos
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_video_changes();
+                CREATE TRIGGER videos_catalog_truncate AFTER TRUNCATE ON videos
+                FOR EACH STATEMENT EXECUTE FUNCTION reset_catalog_changes();
+
+                CREATE TRIGGER playlists_catalog_insert AFTER INSERT ON playlists
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_playlist_changes();
+                CREATE TRIGGER playlists_catalog_update AFTER UPDATE ON playlists
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_playlist_changes();
+                CREATE TRIGGER playlists_catalog_delete AFTER DELETE ON playlists
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_playlist_changes();
+                CREATE TRIGGER playlists_catalog_truncate AFTER TRUNCATE ON playlists
+                FOR EACH STATEMENT EXECUTE FUNCTION reset_catalog_changes();
+                """
+        ),
+    ]
@@ -0,0 +1,60 @@
+from typing import ClassVar
+
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [("models", "0014_catalog_changes")]
+
+    initial = False
+
+    operations: ClassVar = [
+        # Ключ повторяет прежнюю сортировку в Python по списку
+        # re.split(r"(\d+)", s): текстовые части сравниваются как строки,
+        # числа — как числа. Каждая текстовая часть закрывается символом \x01,
+        # который меньше любого символа названия, поэтому "a1" < "a-1", как
+        # и в Python ("a" < "a-"). Название, начинающееся с цифры, получает
+        # пустую текстовую часть в начале (в Python это "" первым элементом).
+        # Число записывается без ведущих нулей с длиной из трёх цифр впереди:
+        # названия не длиннее 255 символов, и порядок чисел любой длины
+        # совпадает с порядком int
+        ops.RunSQL(
+            """
+                CREATE OR REPLACE FUNCTION natural_sort_key(value TEXT)
+                RETURNS TEXT
+                LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+                    SELECT CASE WHEN value ~ '^[0-9]' THEN chr(1) ELSE '' END
+                        || coalesce(string_agg(
+                            CASE WHEN part[1] ~ '^[0-9]'
+                                THEN lpad(length(ltrim(part[1], '0'))::text, 3, '0')
+                                    || ltrim(part[1], '0')
+                                ELSE part[1] || chr(1)
+                            END, '' ORDER BY n
+                        ), '')
+                    FROM regexp_matches(value, '[0-9]+|[^0-9]+', 'g')
+                        WITH ORDINALITY AS t(part, n);
+                $$;
+                """
+        ),
+        # Сохранённые значения генерируемых колонок сами не пересчитываются:
+        # колонки и их индексы создаются заново
+        ops.RunSQL(
+            """
+                ALTER TABLE playlists DROP COLUMN IF EXISTS sort_key;
+                ALTER TABLE videos DROP COLUMN IF EXISTS sort_key;
+                ALTER TABLE playlists ADD COLUMN sort_key TEXT COLLATE "C"
+                GENERATED ALWAYS AS (natural_sort_key(name)) STORED;
+                ALTER TABLE videos ADD COLUMN sort_key TEXT COLLATE "C"
+                GENERATED ALWAYS AS (natural_sort_key(title)) STORED;
+                """
+        ),
+        ops.RunSQL(
+            """
+                CREATE INDEX IF NOT EXISTS idx_playlists_sort_key
+                ON playlists (sort_key, id);
+                CREATE INDEX IF NOT EXISTS idx_videos_playlist_sort_key
+                ON videos (playlist_id, sort_key, id) WHERE deleted_at IS NULL;
+                """
+        ),
+    ]
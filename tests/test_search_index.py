@@ -0,0 +1,119 @@
+"""
+План поискового запроса на настоящем PostgreSQL.
+
+Тест создаёт отдельную базу <DB_NAME>_test на сервере из настроек DB_* (.env
+или окружение), применяет к ней миграции и удаляет её в конце. Если сервер
+недоступен, тест пропускается.
+"""
+
+import asyncio
+import json
+import os
+from collections.abc import Iterator
+from typing import Any
+
+import asyncpg
+import pytest
+
+from app.backend import crud
+from app.backend.config import cfg
+from app.backend.database import apply_migrations
+
+TEST_DB_NAME = f"{cfg.db_name}_test"
+# Сколько видео положить в базу: на крошечной таблице планировщику дешевле
+# прочитать её целиком, чем идти по индексу
+SEED_VIDEOS = 5000
+# Слово, которое встречается в транскрипции каждого сотого видео
+RARE_WORD = "редкое"
+
+
+async def _connect(database: str) -> Any:
+    return await asyncpg.connect(
+        host=cfg.db_host,
+        port=cfg.db_port,
+        user=cfg.db_user,
+        password=cfg.db_pass,
+        database=database,
+    )
+
+
+async def _create_database() -> None:
+    sys_conn = await _connect("postgres")
+    try:
+        await sys_conn.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_NAME}"')
+        await sys_conn.execute(f'CREATE DATABASE "{TEST_DB_NAME}"')
+    finally:
+        await sys_conn.close()
+    # Миграции применяет tortoise в подпроцессе: он читает DB_NAME из окружения
+    previous = os.environ.get("DB_NAME")
+    os.environ["DB_NAME"] = TEST_DB_NAME
+    try:
+        await apply_migrations()
+    finally:
+        if previous is None:
+            del os.environ["DB_NAME"]
+        else:
+            os.environ["DB_NAME"] = previous
+
+
+async def _drop_database() -> None:
+    sys_conn = await _connect("postgres")
+    try:
+        await sys_conn.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_NAME}"')
+    finally:
+        await sys_conn.close()
+
+
+@pytest.fixture(scope="module")
+def search_db() -> Iterator[str]:
+    try:
+        asyncio.run(_create_database())
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"PostgreSQL недоступен: {e}")
+    try:
+        yield TEST_DB_NAME
+    finally:
+        asyncio.run(_drop_database())
+
+
+async def _explain_search(database: str, query: str) -> list[dict[str, Any]]:
+    conn = await _connect(database)
+    try:
+        await conn.execute(
+            """
+            INSERT INTO videos (title, filepath, transcription)
+            SELECT 'Видео ' || i, '/videos/' || i || '.mp4',
+                   'выпуск номер ' || i || CASE WHEN i % 100 = 0
+                       THEN ' ' || $2 || ' слово' ELSE ' обычный текст' END
+            FROM generate_series(1, $1::int) AS i
+            """,
+            SEED_VIDEOS,
+            RARE_WORD,
+        )
+        await conn.execute("ANALYZE videos")
+        plan = await conn.fetchval(
+            f"EXPLAIN (FORMAT JSON) {crud.SEARCH_QUERY}", query, None, None, None, 21
+        )
+    finally:
+        await conn.close()
+    return json.loads(plan)
+
+
+def _plan_nodes(node: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def test_search_uses_search_vector_index(search_db: str) -> None:
+    plan = asyncio.run(_explain_search(search_db, RARE_WORD))
+    nodes = list(_plan_nodes(plan[0]["Plan"]))
+    assert any(
+        node["Node Type"] == "Bitmap Index Scan"
+        and node.get("Index Name") == "idx_videos_search_vector"
+        for node in nodes
+    ), json.dumps(plan, ensure_ascii=False, indent=2)
+    assert not any(
+        node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "videos"
+        for node in nodes
+    ), json.dumps(plan, ensure_ascii=False, indent=2)